@@ -0,0 +1,256 @@
+'''
+Jack Miller
+January 2026
+'''
+
+
+''' Imports '''
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import polars as pl
+
+import sklearn
+
+import benchmarks
+import cluster_sweep
+import data_cache
+import prep_data
+import similarity
+import synthetic
+
+
+
+''' Parameters / Constants '''
+
+RESULTS_DIR = Path(__file__).parent / 'data' / 'benchmarks'
+BASELINE_PATH = RESULTS_DIR / 'baseline.json'
+
+# Seasons of synthetic data per run
+SIZES = [1, 5, 25]
+
+# A stage regresses when it is this much slower / uses this much more memory than the baseline...
+TIME_THRESHOLD = 0.25
+MEMORY_THRESHOLD = 0.5
+
+# ...and by more than these, so noise on tiny stages doesn't fail a run
+MIN_SECS = 0.05
+MIN_MB = 32
+
+
+
+''' Helpers '''
+
+def _shape(value) -> list[int] | None:
+    ''' (rows, cols) of a frame / matrix result, for the report '''
+
+    if isinstance(value, tuple):
+        value = value[0]
+    shape = getattr(value, 'shape', None)
+
+    return list(shape) if shape is not None else None
+
+
+def run_stage(func, *args, repeat: int = 1, **kwargs) -> tuple[object, dict]:
+    ''' Runs a stage `repeat` times; returns its result and the fastest run's wall / CPU time, peak RSS growth and output shape '''
+
+    runs = []
+    for _ in range(repeat):
+        result, cpu_secs = [], []
+
+        def stage():
+            cpu_start = time.process_time()
+            result.append(func(*args, **kwargs))
+            cpu_secs.append(time.process_time() - cpu_start)
+
+        runs.append({**benchmarks.measure(stage), 'cpu_secs': cpu_secs[0]})
+
+    best = min(runs, key=lambda run: run['secs'])
+    return result[0], {**best, 'peak_rss_mb': min(run['peak_rss_mb'] for run in runs), 'shape_out': _shape(result[0])}
+
+
+def environment() -> dict:
+    return {
+        'python': platform.python_version(),
+        'polars': pl.__version__,
+        'sklearn': sklearn.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def write_json(results: dict, path: str | Path) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    tmp_path = path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(results, f, indent=2)
+    os.replace(tmp_path, path)
+
+    return path
+
+
+def read_json(path: str | Path) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+
+''' Main Functions '''
+
+def bench_size(n_seasons: int, repeat: int = 1, seed: int = synthetic.SEED) -> dict:
+    '''
+    Times and memory-profiles each stage of the pipeline on `n_seasons` of synthetic data: raw frames -> enrichment and
+    personnel parsing -> season cache -> pbp / participation join -> pandas -> offensive and defensive tendencies ->
+    scaling / PCA -> clustering. Runs entirely offline against a temporary cache directory.
+
+    Peak RSS is the growth over the RSS before the stage, so it depends on what earlier stages left allocated; compare it
+    between runs of the same suite rather than as an absolute.
+    '''
+
+    seasons = synthetic.seasons_for(n_seasons)
+    stages = {}
+
+    pbp, stages['generate'] = run_stage(synthetic.synthetic_seasons, seasons, seed=seed, repeat=repeat)
+    pbp, participation = pbp
+
+    _, stages['enrich_pbp'] = run_stage(prep_data.enrich_pbp, pbp, repeat=repeat)
+    _, stages['parse_personnel'] = run_stage(prep_data.parse_personnel, participation, repeat=repeat)
+    _, stages['enrich_participation'] = run_stage(prep_data.enrich_participation, participation, repeat=repeat)
+
+    for stage, frame in [('enrich_pbp', pbp), ('parse_personnel', participation), ('enrich_participation', participation)]:
+        stages[stage]['shape_in'] = list(frame.shape)
+    del pbp, participation
+
+    cache_dir = data_cache.CACHE_DIR
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_cache.CACHE_DIR = Path(tmp_dir)
+        try:
+            _, stages['write_cache'] = run_stage(synthetic.write_synthetic_cache, seasons, seed=seed, repeat=repeat)
+
+            plays, stages['join'] = run_stage(prep_data.load_plays, seasons, columns=prep_data.PLAY_COLUMNS['tendencies'], repeat=repeat)
+
+            # Only the conversion is timed: the full-width play table is loaded first, outside the stage
+            all_plays = prep_data.load_plays(seasons)
+        finally:
+            data_cache.CACHE_DIR = cache_dir
+
+    _, stages['to_pandas'] = run_stage(lambda: prep_data.strings_for_pandas(all_plays).to_pandas(), repeat=repeat)
+    stages['to_pandas']['shape_in'] = list(all_plays.shape)
+    del all_plays
+
+    offense, stages['offense_tendencies'] = run_stage(lambda: prep_data.offense_tendencies_query(plays.lazy()).collect(), repeat=repeat)
+    _, stages['defense_tendencies'] = run_stage(lambda: prep_data.defense_tendencies_query(plays.lazy()).collect(), repeat=repeat)
+    stages['offense_tendencies']['shape_in'] = stages['defense_tendencies']['shape_in'] = list(plays.shape)
+    del plays
+
+    offense = prep_data._to_pandas_tendencies(offense, prep_data.OFFENSE_KEYS)
+    features = prep_data.TENDENCY_FEATURES['offense']
+    (matrix, _, _), stages['scale_pca'] = run_stage(similarity.feature_matrix, offense, features, n_components=cluster_sweep.PCA_N_COMPONENTS,
+                                                    repeat=repeat)
+
+    artifacts = cluster_sweep.build_artifacts(matrix)
+    for stage in ['kmeans', 'spectral']:
+        _, stages[stage] = run_stage(cluster_sweep.fit_labels, stage, {'n_clusters': 4}, artifacts, repeat=repeat)
+        stages[stage]['shape_in'] = list(matrix.shape)
+
+    return {'seasons': seasons, 'stages': stages}
+
+
+def run_suite(sizes: list[int] = SIZES, repeat: int = 1, seed: int = synthetic.SEED) -> dict:
+    ''' bench_size for every size, with the environment it ran in; sizes are keyed by their number of seasons '''
+
+    results = {'environment': environment(), 'repeat': repeat, 'seed': seed, 'sizes': {}}
+    for n_seasons in sizes:
+        results['sizes'][str(n_seasons)] = bench_size(n_seasons, repeat=repeat, seed=seed)
+        print_size(n_seasons, results['sizes'][str(n_seasons)])
+
+    return results
+
+
+def compare(results: dict, baseline: dict, time_threshold: float = TIME_THRESHOLD, memory_threshold: float = MEMORY_THRESHOLD,
+            min_secs: float = MIN_SECS, min_mb: float = MIN_MB) -> list[dict]:
+    '''
+    Stages slower (secs) or bigger (peak_rss_mb) than the baseline by more than the threshold ratio and the minimum
+    absolute difference. Only sizes / stages in both runs are compared.
+    '''
+
+    checks = [('secs', time_threshold, min_secs), ('peak_rss_mb', memory_threshold, min_mb)]
+
+    regressions = []
+    for size, size_results in results['sizes'].items():
+        baseline_stages = baseline['sizes'].get(size, {}).get('stages', {})
+
+        for stage, stats in size_results['stages'].items():
+            if stage not in baseline_stages:
+                continue
+
+            for metric, threshold, min_diff in checks:
+                current, previous = stats[metric], baseline_stages[stage][metric]
+                if current > previous * (1 + threshold) and current - previous > min_diff:
+                    regressions.append({'size': int(size), 'stage': stage, 'metric': metric, 'baseline': previous, 'current': current,
+                                        'ratio': current / previous if previous else float('inf')})
+
+    return regressions
+
+
+def print_size(n_seasons: int, size_results: dict):
+    print(f'Synthetic pipeline | {n_seasons} seasons')
+    for stage, stats in size_results['stages'].items():
+        shape = 'x'.join(str(dim) for dim in stats['shape_out']) if stats['shape_out'] else ''
+        print(f'    {stage:<22} {stats["secs"]:>8.3f}s  cpu {stats["cpu_secs"]:>8.3f}s  rss +{stats["peak_rss_mb"]:>7.1f} MB  {shape}')
+
+
+def print_regressions(regressions: list[dict]):
+    if not regressions:
+        print('No regressions against the baseline')
+        return
+
+    print(f'{len(regressions)} regression(s) against the baseline')
+    for r in regressions:
+        print(f'    {r["size"]} seasons, {r["stage"]}: {r["metric"]} {r["baseline"]:,.3f} -> {r["current"]:,.3f} ({r["ratio"]:,.2f}x)')
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Offline benchmark of the prep / clustering pipeline on synthetic seasons')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='numbers of seasons to run')
+    parser.add_argument('--repeat', type=int, default=1, help='runs per stage (the fastest is kept)')
+    parser.add_argument('--seed', type=int, default=synthetic.SEED)
+    parser.add_argument('--output', type=Path, default=None, help='results JSON (default: data/benchmarks/results_<time>.json)')
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH, help='baseline JSON to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='write the results as the new baseline')
+    parser.add_argument('--time-threshold', type=float, default=TIME_THRESHOLD)
+    parser.add_argument('--memory-threshold', type=float, default=MEMORY_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    results = run_suite(sizes=args.sizes, repeat=args.repeat, seed=args.seed)
+
+    output = args.output if args.output is not None else RESULTS_DIR / f'results_{time.strftime("%Y%m%d_%H%M%S")}.json'
+    print(f'Results: {write_json(results, output)}')
+
+    if args.save_baseline:
+        print(f'Baseline: {write_json(results, args.baseline)}')
+        return 0
+
+    if not args.baseline.exists():
+        print(f'No baseline at {args.baseline} (run with --save-baseline to create one)')
+        return 0
+
+    regressions = compare(results, read_json(args.baseline), time_threshold=args.time_threshold, memory_threshold=args.memory_threshold)
+    print_regressions(regressions)
+
+    return 1 if regressions else 0
+
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,1197 @@
+'''
+Jack Miller
+January 2026
+
+Timing / equivalence checks for the data prep pipeline. Run `python benchmarks.py`, or offline on synthetic seasons:
+`python benchmarks.py --synthetic 2023 2024 [--only bench_similarity ...]`.
+'''
+
+
+''' Imports '''
+
+import argparse
+import gc
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+import polars as pl
+import polars.testing as polars_testing
+import numpy as np
+
+from scipy.spatial import distance
+from scipy.stats import percentileofscore
+from sklearn.cluster import KMeans, SpectralClustering, DBSCAN, HDBSCAN, OPTICS
+from sklearn.manifold import TSNE
+from sklearn.metrics import silhouette_score, davies_bouldin_score
+from sklearn.preprocessing import StandardScaler
+
+import nflreadpy as nfl
+from nflreadpy.downloader import get_downloader
+
+import cluster_model
+import cluster_sweep
+import data_cache
+import embeddings
+import feature_store
+import instrument
+import partials_store
+import percentiles
+import prep_data
+import similarity
+import stability
+import synthetic
+
+
+
+''' Helpers '''
+
+def timed(func, *args, **kwargs) -> tuple[object, float]:
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def rss_mb() -> float:
+    ''' Current resident set size (Linux) '''
+
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+
+
+def measure(func, *args, **kwargs) -> dict:
+    '''
+    Runs `func` and returns its wall time and peak RSS growth (MB) over the RSS before the call.
+
+    RSS is sampled from a background thread, since most of the memory is allocated by Polars / Arrow outside
+    of Python's allocator (so tracemalloc can't see it).
+    '''
+
+    gc.collect()
+    start_rss = rss_mb()
+    peak = start_rss
+    done = threading.Event()
+
+    def sample():
+        nonlocal peak
+        while not done.is_set():
+            peak = max(peak, rss_mb())
+            done.wait(0.005)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    try:
+        _, secs = timed(func, *args, **kwargs)
+    finally:
+        done.set()
+        sampler.join()
+
+    return {'secs': secs, 'peak_rss_mb': max(peak, rss_mb()) - start_rss}
+
+
+def copy_play_cache(seasons: list[int], dest: str | Path) -> None:
+    ''' Copies the seasons' cached pbp / participation files (filling them first) into a cache directory at `dest` '''
+
+    for kind in data_cache.DATA_KINDS:
+        for season in seasons:
+            if kind == 'pbp' or season >= prep_data.PARTICIPATION_START_YEAR:
+                prep_data.load_season(kind, season)
+                path = data_cache.cache_path(kind, season)
+                target = Path(dest) / path.relative_to(data_cache.CACHE_DIR)
+                target.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(path, target)
+
+
+
+''' Benchmarks '''
+
+def bench_cache(seasons: list[int] = prep_data.SEASONS) -> dict:
+    ''' Cold (download + enrich + write cache) vs warm (read cache only) load of `seasons` '''
+
+    cold_df, cold_secs = timed(prep_data.load_pbp_participation_data, seasons=seasons, refresh=True)
+    warm_df, warm_secs = timed(prep_data.load_pbp_participation_data, seasons=seasons)
+
+    assert cold_df.shape == warm_df.shape
+
+    results = {
+        'seasons': seasons,
+        'rows': cold_df.shape[0],
+        'cold_secs': cold_secs,
+        'warm_secs': warm_secs,
+        'speedup': cold_secs / warm_secs,
+    }
+
+    print(f'Cache | {len(seasons)} seasons, {results["rows"]:,} plays')
+    print(f'    cold: {cold_secs:,.2f}s')
+    print(f'    warm: {warm_secs:,.2f}s ({results["speedup"]:,.1f}x)')
+    print(f'    dir:  {data_cache.CACHE_DIR}')
+
+    return results
+
+
+def legacy_personnel(participation: pl.DataFrame) -> pl.DataFrame:
+    ''' Row-wise map_elements personnel labels, as the loader built them before parse_personnel '''
+
+    participation = participation.with_columns(
+        OffensePositionsStr=pl.col('offense_personnel').map_elements(prep_data.clean_personnel, return_dtype=str),
+        DefensePositionsStr=pl.col('defense_personnel').map_elements(prep_data.clean_personnel, return_dtype=str),
+    )
+    participation = participation.with_columns(
+        OffensePersonnel=pl.col('OffensePositionsStr').map_elements(prep_data.offensive_personnel, return_dtype=str),
+        DefensePersonnel=pl.col('DefensePositionsStr').map_elements(prep_data.defensive_personnel, return_dtype=str),
+    )
+    return participation.with_columns(
+        OffensePersonnelGroup=pl.when(pl.col('OffensePersonnel').str.slice(0, 2).is_in(['11', '12', '13', '21', '22'])).then(pl.col('OffensePersonnel').str.slice(0, 2)).otherwise(pl.lit('Other')),
+        OffenseMultRBs=pl.when(pl.col('OffensePersonnel').str.slice(0, 1).is_in(['2', '3', '4'])).then(1).otherwise(0),
+        OffenseZeroRBs=pl.when(pl.col('OffensePersonnel').str.slice(0, 1) == '0').then(1).otherwise(0),
+        OffenseMultTEs=pl.when(pl.col('OffensePersonnel').str.slice(1, 1).is_in(['2', '3', '4'])).then(1).otherwise(0),
+        OffenseZeroTEs=pl.when(pl.col('OffensePersonnel').str.slice(1, 1) == '0').then(1).otherwise(0),
+        OffenseExtraOL=pl.when(pl.col('OffensePersonnel').str.tail(1) == '*').then(1).otherwise(0),
+        DefensePersonnelType=pl.col('DefensePersonnel').str.split(' ').list.get(0)
+    )
+
+
+def bench_personnel(participation: pl.DataFrame = None) -> dict:
+    ''' Row-wise map_elements vs vectorized personnel parsing; checks the labels match exactly '''
+
+    if participation is None:
+        participation = nfl.load_participation(seasons=prep_data.SEASONS)
+
+    label_cols = ['OffensePersonnel', 'OffensePersonnelGroup', 'OffenseMultRBs', 'OffenseZeroRBs', 'OffenseMultTEs', 'OffenseZeroTEs',
+                  'OffenseExtraOL', 'DefensePersonnel', 'DefensePersonnelType']
+
+    legacy, legacy_secs = timed(legacy_personnel, participation)
+    vectorized, vectorized_secs = timed(prep_data.parse_personnel, participation)
+
+    # Compare row by row, ignoring the (unordered) join output order
+    sort_cols = ['nflverse_game_id', 'play_id']
+    assert legacy.sort(sort_cols).select(label_cols).equals(vectorized.sort(sort_cols).select(label_cols)), 'Personnel labels differ'
+
+    results = {
+        'rows': participation.shape[0],
+        'distinct_strings': participation['offense_personnel'].n_unique() + participation['defense_personnel'].n_unique(),
+        'legacy_secs': legacy_secs,
+        'vectorized_secs': vectorized_secs,
+        'speedup': legacy_secs / vectorized_secs,
+    }
+
+    print(f'Personnel | {results["rows"]:,} plays, {results["distinct_strings"]:,} distinct strings')
+    print(f'    map_elements: {legacy_secs:,.2f}s')
+    print(f'    vectorized:   {vectorized_secs:,.2f}s ({results["speedup"]:,.1f}x)')
+
+    return results
+
+
+def legacy_offense_tendencies(pbp_df: pd.DataFrame) -> pd.DataFrame:
+    ''' Pandas groupby / lambda-mask offensive tendencies, as prep_data built them before offense_tendencies_query '''
+
+ 
+    ## Base Stats ##
+    offense_team_tendencies = pbp_df.groupby(['posteam', 'season']).aggregate(
+        # General
+        Games=('game_id', 'nunique'),
+        Drives=('DriveID', 'nunique'),
+        Plays=('posteam', 'size'),
+        Neutral_Down_Plays=('posteam', lambda x: x[pbp_df['NeutralDown'] == 1].shape[0]),
+
+        # Play Types
+        Pass_Plays=('pass', 'sum'),
+        Neutral_Down_Pass=('pass', lambda x: x[pbp_df['NeutralDown'] == 1].sum()),
+        Pass_Attempts=('pass_attempt', 'sum'),
+        
+        QBScrambles=('qb_scramble', 'sum'),
+
+        # Passing
+        IAY=('air_yards', 'sum'),
+        IAY_ToSticks=('AirYardsToSticks', 'sum'),
+        TotalTimeToThrow=('time_to_throw', 'sum'),
+        Pass_BehindLOS=('pass_attempt', lambda x: x[pbp_df['PassDepth'] == 'Behind LOS'].sum()),
+        Pass_Short=('pass_attempt', lambda x: x[pbp_df['PassDepth'] == 'Short'].sum()),
+        Pass_Medium=('pass_attempt', lambda x: x[pbp_df['PassDepth'] == 'Medium'].sum()),
+        Pass_Deep=('pass_attempt', lambda x: x[pbp_df['PassDepth'] == 'Long'].sum()),
+        Sacks=('sack', 'sum'),
+
+        # Rushing
+        Rush_Plays=('rush', 'sum'),
+        Rush_Attempts=('rush_attempt', 'sum'),
+        Rush_Inside=('rush', lambda x: x[pbp_df['RunLocation'] == 'Inside'].sum()),
+        Rush_Outside=('rush', lambda x: x[pbp_df['RunLocation'] == 'Outside'].sum()),
+
+        # Personnel
+        Plays_11_Personnel=('posteam', lambda x: x[pbp_df['OffensePersonnel'] == '11'].shape[0]),
+        Plays_Heavy_Personnel=('OffenseHeavyPersonnel', 'sum'),
+        Plays_Mult_RBs=('OffenseMultRBs', 'sum'),
+        Plays_Zero_RBs=('OffenseZeroRBs', 'sum'),
+        Plays_Mult_TEs=('OffenseMultTEs', 'sum'),
+        Plays_Zero_TEs=('OffenseZeroTEs', 'sum'),
+        Plays_Extra_OL=('OffenseExtraOL', 'sum')
+    )
+
+    # Overall numbers
+    offense_team_tendencies['Plays / Game'] = offense_team_tendencies['Plays'] / offense_team_tendencies['Games']
+    offense_team_tendencies['Drives / Game'] = offense_team_tendencies['Drives'] / offense_team_tendencies['Games']
+
+    # Play Types
+    offense_team_tendencies['% Pass'] = offense_team_tendencies['Pass_Plays'] / offense_team_tendencies['Plays']
+    offense_team_tendencies['% Pass Neutral Downs'] = offense_team_tendencies['Neutral_Down_Pass'] / offense_team_tendencies['Neutral_Down_Plays']
+
+    offense_team_tendencies['Scrambles / Game'] = offense_team_tendencies['QBScrambles'] / offense_team_tendencies['Games']
+
+    # Passing numbers
+    offense_team_tendencies['ADOT'] = offense_team_tendencies['IAY'] / (offense_team_tendencies['Pass_Attempts'] - offense_team_tendencies['Sacks'])
+    offense_team_tendencies['ADOT to Sticks'] = offense_team_tendencies['IAY_ToSticks'] / (offense_team_tendencies['Pass_Attempts'] - offense_team_tendencies['Sacks'])
+    offense_team_tendencies['Avg Time to Throw'] = offense_team_tendencies['TotalTimeToThrow'] / (offense_team_tendencies['Pass_Attempts'] - offense_team_tendencies['Sacks'])
+
+    offense_team_tendencies['% Passes Behind LOS'] = offense_team_tendencies['Pass_BehindLOS'] / (offense_team_tendencies['Pass_Attempts'] - offense_team_tendencies['Sacks'])
+    offense_team_tendencies['% Passes Short'] = offense_team_tendencies['Pass_Short'] / (offense_team_tendencies['Pass_Attempts'] - offense_team_tendencies['Sacks'])
+    offense_team_tendencies['% Passes Medium'] = offense_team_tendencies['Pass_Medium'] / (offense_team_tendencies['Pass_Attempts'] - offense_team_tendencies['Sacks'])
+    offense_team_tendencies['% Passes Deep'] = offense_team_tendencies['Pass_Deep'] / (offense_team_tendencies['Pass_Attempts'] - offense_team_tendencies['Sacks'])
+
+    # Rushing numbers
+    offense_team_tendencies['% Rush Inside'] = offense_team_tendencies['Rush_Inside'] / offense_team_tendencies['Rush_Plays']
+    offense_team_tendencies['% Rush Outside'] = offense_team_tendencies['Rush_Outside'] / offense_team_tendencies['Rush_Plays']
+
+    # Personnel
+    for col in ['Plays_11_Personnel', 'Plays_Heavy_Personnel', 'Plays_Mult_RBs', 'Plays_Zero_RBs', 'Plays_Mult_TEs', 'Plays_Zero_TEs', 'Plays_Extra_OL']:
+        cat = col.replace('Plays_', '').replace('_', ' ')
+        col_name = f'% Plays {cat}'
+        offense_team_tendencies[col_name] = offense_team_tendencies[col] / offense_team_tendencies['Plays']
+
+    # Formations
+    offense_formations = pbp_df.groupby(['posteam', 'season', 'OffenseFormation']).aggregate(
+        Plays=('posteam', 'size'),
+        Neutral_Down_Plays=('posteam', lambda x: x[pbp_df['NeutralDown'] == 1].shape[0]),
+
+        Pass_Plays=('pass', 'sum'),
+        Rush_Plays=('rush', 'sum')
+    )
+    offense_formations['% Pass'] = offense_formations['Pass_Plays'] / offense_formations['Plays']
+
+    offense_formations = offense_formations.reset_index().pivot(
+        index=['posteam', 'season'],
+        columns='OffenseFormation',
+        values=['Plays', 'Neutral_Down_Plays', '% Pass']
+    ).swaplevel(axis=1)
+    offense_formations.columns = [" ".join(col) for col in offense_formations.columns.values]
+    offense_formations['% Under Center'] = offense_formations['Under Center Plays'] / (offense_formations['Under Center Plays'] + offense_formations['Shotgun Plays'])
+    offense_formations['% Shotgun'] = offense_formations['Shotgun Plays'] / (offense_formations['Under Center Plays'] + offense_formations['Shotgun Plays'])
+    offense_formations['% Under Center Neutral Downs'] = offense_formations['Under Center Neutral_Down_Plays'] / (offense_formations['Under Center Neutral_Down_Plays'] + offense_formations['Shotgun Neutral_Down_Plays'])
+    offense_formations['% Shotgun Neutral Downs'] = offense_formations['Shotgun Neutral_Down_Plays'] / (offense_formations['Under Center Neutral_Down_Plays'] + offense_formations['Shotgun Neutral_Down_Plays'])
+
+    offense_team_tendencies = offense_team_tendencies.merge(offense_formations, left_index=True, right_index=True, how='left')
+
+
+    ''' Players - Receiving '''
+
+    # All receivers
+    team_targets = pbp_df.groupby(['posteam', 'season', 'receiver']).aggregate(
+        Plays=('pass', 'sum'),
+        Targets=('pass_attempt', 'sum')
+    ).sort_values(by=['posteam', 'season', 'Targets'], ascending=[True, True, False])
+
+    team_targets['Targets'] = pd.to_numeric(team_targets['Targets'])
+    team_targets['Target Share'] = team_targets['Targets'] / team_targets.groupby(level=['posteam', 'season'])['Targets'].sum()
+    team_targets['Target Share Cumsum'] = team_targets.groupby(level=['posteam', 'season'])['Target Share'].cumsum()
+    team_targets['>5% Target Share'] = np.where(team_targets['Target Share'] >= 0.05, 1, 0)
+
+    # Team seasons
+    team_targets_seasons = team_targets.groupby(level=['posteam', 'season']).aggregate(
+        MaxTargets=('Targets', 'max'),
+        MaxTargetShare=('Target Share', 'max'),
+        N_Receivers_FivePctTargetShare=('>5% Target Share', 'sum')
+    )
+
+
+    ''' Players - Rushing '''
+
+    # All rushers
+    team_rushing = pbp_df.loc[pbp_df['rush'] == 1,:].groupby(['posteam', 'season', 'rusher']).aggregate(
+        Plays=('rush', 'sum'),
+        Attempts=('rush_attempt', 'sum')
+    ).sort_values(by=['posteam', 'season', 'Attempts'], ascending=[True, True, False])
+
+    team_rushing['Attempts'] = pd.to_numeric(team_rushing['Attempts'])
+    team_rushing['Attempts Share'] = team_rushing['Attempts'] / team_rushing.groupby(level=['posteam', 'season'])['Attempts'].sum()
+    team_rushing['Attempts Share Cumsum'] = team_rushing.groupby(level=['posteam', 'season'])['Attempts Share'].cumsum()
+    team_rushing['>10% Attempts Share'] = np.where(team_rushing['Attempts Share'] >= 0.1, 1, 0)
+
+    # Team seasons
+    team_rushing_seasons = team_rushing.groupby(level=['posteam', 'season']).aggregate(
+        MaxRushAttempts=('Attempts', 'max'),
+        MaxRushAttemptsShare=('Attempts Share', 'max'),
+        N_Rushers_TenPctAttemptShare=('>10% Attempts Share', 'sum')
+    )
+
+
+    ''' Combine '''
+
+    # Start with base
+    offense_inputs = offense_team_tendencies.copy()
+
+    # Add receivers / rushers
+    offense_inputs = offense_inputs.merge(team_targets_seasons, left_index=True, right_index=True, how='left')
+    offense_inputs = offense_inputs.merge(team_rushing_seasons, left_index=True, right_index=True, how='left')
+
+    # Numeric cols
+    for col in offense_inputs.columns:
+        offense_inputs[col] = pd.to_numeric(offense_inputs[col])
+
+    # print(offense_inputs.shape)
+    # print(offense_inputs.head().to_string())
+
+    return offense_inputs
+
+
+def legacy_defense_tendencies(pbp_df: pd.DataFrame) -> pd.DataFrame:
+    ''' Pandas groupby / lambda-mask defensive tendencies, as prep_data built them before the partials '''
+ 
+    ## Base Stats ##
+    defense_team_tendencies = pbp_df.groupby(['defteam', 'season']).aggregate(
+        Games=('game_id', 'nunique'),
+        Drives=('DriveID', 'nunique'),
+        Plays=('defteam', 'size'),
+        Neutral_Down_Plays=('defteam', lambda x: x[pbp_df['NeutralDown'] == 1].shape[0]),
+
+        PassPlaysFaced=('pass', 'sum'),
+        RushPlaysFaced=('rush', 'sum'),
+
+        LightBoxPlays=('LightBox', 'sum'),
+        HeavyBoxPlays=('HeavyBox', 'sum'),
+        ZoneCoveragePlays=('ZoneCoverage', 'sum'),
+        ManCoveragePlays=('ManCoverage', 'sum'),
+
+        FiveRushersPlays=('pass', lambda x: x[pbp_df['number_of_pass_rushers'] == 5].sum()),
+        SixPlusRushersPlays=('pass', lambda x: x[pbp_df['number_of_pass_rushers'] >= 6].sum()),
+    )
+
+    # Overall numbers
+    defense_team_tendencies['Plays / Game'] = defense_team_tendencies['Plays'] / defense_team_tendencies['Games']
+    defense_team_tendencies['Drives / Game'] = defense_team_tendencies['Drives'] / defense_team_tendencies['Games']
+
+    # Box
+    defense_team_tendencies['% Light Box'] = defense_team_tendencies['LightBoxPlays'] / defense_team_tendencies['Plays']
+    defense_team_tendencies['% Heavy Box'] = defense_team_tendencies['HeavyBoxPlays'] / defense_team_tendencies['Plays']
+
+    # Coverage
+    defense_team_tendencies['% Zone'] = defense_team_tendencies['ZoneCoveragePlays'] / defense_team_tendencies['PassPlaysFaced']
+    defense_team_tendencies['% Man'] = defense_team_tendencies['ManCoveragePlays'] / defense_team_tendencies['PassPlaysFaced']
+
+    # Rushers
+    defense_team_tendencies['% 5 Rushers'] = defense_team_tendencies['FiveRushersPlays'] / defense_team_tendencies['PassPlaysFaced']
+    defense_team_tendencies['% 6+ Rushers'] = defense_team_tendencies['SixPlusRushersPlays'] / defense_team_tendencies['PassPlaysFaced']
+
+    # Coverages
+    defense_coverages = pbp_df.groupby(['defteam', 'season', 'DefenseCoverage']).aggregate(
+        Plays=('pass', 'sum'),
+        Neutral_Down_Plays=('pass', lambda x: x[pbp_df['NeutralDown'] == 1].sum()),    
+    )
+    defense_coverages['% Plays'] = defense_coverages['Plays'] / defense_coverages.groupby(level=['defteam', 'season'])['Plays'].sum()
+    defense_coverages['% Neutral Down Plays'] = defense_coverages['Neutral_Down_Plays'] / defense_coverages.groupby(level=['defteam', 'season'])['Neutral_Down_Plays'].sum()
+
+    # Filter out other AFTER calculating percentages
+    defense_coverages = defense_coverages.loc[defense_coverages.index.get_level_values('DefenseCoverage') != 'Other',:]
+    defense_coverages = defense_coverages.reset_index().pivot(
+        index=['defteam', 'season'],
+        columns='DefenseCoverage',
+        values=defense_coverages.columns
+    ).swaplevel(axis=1)
+    defense_coverages.columns = [" ".join(col) for col in defense_coverages.columns.values]
+
+    defense_team_tendencies = defense_team_tendencies.merge(defense_coverages, left_index=True, right_index=True)
+
+    return defense_team_tendencies
+
+
+def bench_offense_tendencies(seasons: list[int] = prep_data.SEASONS) -> dict:
+    ''' Pandas lambda groupbys vs the lazy Polars query; checks the outputs are equal '''
+
+    plays = prep_data.load_plays(seasons=seasons)
+    pbp_df = pd.DataFrame(columns=plays.columns, data=plays)
+
+    legacy, legacy_secs = timed(legacy_offense_tendencies, pbp_df)
+    polars_df, polars_secs = timed(lambda: prep_data.offense_tendencies_query(plays.lazy()).collect())
+    new = prep_data._to_pandas_tendencies(polars_df, keys=['posteam', 'season'])
+
+    pd.testing.assert_frame_equal(new, legacy, check_dtype=False, check_index_type=False)
+
+    results = {
+        'team_seasons': new.shape[0],
+        'legacy_secs': legacy_secs,
+        'polars_secs': polars_secs,
+        'speedup': legacy_secs / polars_secs,
+    }
+
+    print(f'Offense tendencies | {plays.shape[0]:,} plays, {results["team_seasons"]:,} team seasons')
+    print(f'    pandas: {legacy_secs:,.2f}s')
+    print(f'    polars: {polars_secs:,.2f}s ({results["speedup"]:,.1f}x)')
+
+    return results
+
+
+def bench_loader_modes(seasons: list[int] = prep_data.SEASONS) -> dict:
+    ''' Eager all-column load + row-wise pandas constructor vs the lazy projected loader + Arrow conversion (warm cache) '''
+
+    # Warm the cache so both modes read the same local files
+    prep_data.load_plays(seasons=seasons, columns=['MasterPlayID'])
+
+    def eager():
+        pbp = prep_data.load_plays(seasons=seasons)
+        return pd.DataFrame(columns=pbp.columns, data=pbp)
+
+    def lazy():
+        return prep_data.load_pbp_participation_data(seasons=seasons, columns=prep_data.PLAY_COLUMNS['offense'])
+
+    results = {'eager': measure(eager), 'lazy': measure(lazy)}
+
+    print(f'Loader | {len(seasons)} seasons')
+    for mode, r in results.items():
+        print(f'    {mode}: {r["secs"]:,.2f}s, peak RSS +{r["peak_rss_mb"]:,.0f} MB')
+
+    return results
+
+
+def nflreadpy_season(season: int) -> tuple[pl.DataFrame, pl.DataFrame]:
+    ''' A season's raw pbp and participation release files, as nflreadpy downloads them '''
+
+    return prep_data.download_raw_season('pbp', season), prep_data.download_raw_season('participation', season)
+
+
+def check_cold_cache_fill(seasons: list[int] = (2023,), weeks: list[int] = (1, 2, 3), raw_season=nflreadpy_season,
+                          n_extra_columns: int = 8) -> dict:
+    '''
+    The cold-cache fill (load_season with an empty cache), run against temporary copies of the release files:
+    `raw_season(season)` -> (pbp, participation), nflreadpy's downloads by default. Extra filler columns stand in for
+    raw columns nothing reads. Checks:
+    - enrich_pbp's filters are pushed into the Parquet scan of the release file;
+    - the cached season keeps every raw pbp column and equals enriching the whole raw file eagerly;
+    - with the file unreachable, the fill falls back to nflreadpy, which requests exactly NFLVERSE_URLS
+      (its downloader is stubbed to serve the raw frames, so this part runs offline);
+    - a week filter is pushed into the cache scans.
+    '''
+
+    raw = {}
+    for season in seasons:
+        pbp, participation = raw_season(season)
+        raw[season] = {'pbp': pbp.with_columns([pl.lit(0.0).alias(f'filler_{n}') for n in range(n_extra_columns)]), 'participation': participation}
+
+    urls, cache_dir = dict(prep_data.NFLVERSE_URLS), data_cache.CACHE_DIR
+    downloader, requested = get_downloader(), []
+
+    def serve(url: str, season: int, **kwargs) -> pl.DataFrame:
+        requested.append(url)
+        return raw[season]['participation' if 'participation' in url else 'pbp']
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        data_cache.CACHE_DIR = tmp_dir / 'cache'
+        try:
+            ## Fallback: nothing to scan, so nflreadpy downloads the season ##
+            prep_data.NFLVERSE_URLS.update({kind: str(tmp_dir / 'missing' / f'{kind}_{{season}}.parquet') for kind in data_cache.DATA_KINDS})
+            downloader._download_file = serve
+            try:
+                fallback = {kind: [prep_data.load_season(kind, season, refresh=True) for season in seasons] for kind in data_cache.DATA_KINDS}
+            finally:
+                del downloader._download_file
+
+            assert sorted(requested) == sorted(urls[kind].format(season=season) for kind in data_cache.DATA_KINDS for season in seasons), requested
+
+            ## Scan of the release files ##
+            prep_data.NFLVERSE_URLS.update({kind: str(tmp_dir / f'{kind}_{{season}}.parquet') for kind in data_cache.DATA_KINDS})
+            for season in seasons:
+                for kind, frame in raw[season].items():
+                    frame.write_parquet(tmp_dir / f'{kind}_{season}.parquet')
+
+            # The row filters sit in the scan node of the fill's plan
+            scan = prep_data.enrich_pbp(prep_data.scan_raw_season('pbp', seasons[0])).explain().split('Parquet SCAN')[1]
+            assert 'SELECTION' in scan and 'season_type' in scan
+
+            def eager():
+                return {kind: [(prep_data.enrich_pbp if kind == 'pbp' else prep_data.enrich_participation)(pl.read_parquet(tmp_dir / f'{kind}_{season}.parquet'))
+                               for season in seasons] for kind in data_cache.DATA_KINDS}
+
+            def fill():
+                return {kind: [prep_data.load_season(kind, season, refresh=True) for season in seasons] for kind in data_cache.DATA_KINDS}
+
+            results = {'eager': measure(eager), 'fill': measure(fill)}
+
+            for kind, expected in eager().items():
+                for season, frame, fallback_frame in zip(seasons, expected, fallback[kind]):
+                    cached = data_cache.read_cached(kind, season)
+                    polars_testing.assert_frame_equal(cached, frame)
+                    polars_testing.assert_frame_equal(fallback_frame, frame)
+                    if kind == 'pbp':
+                        assert set(raw[season][kind].columns) <= set(cached.columns)
+
+            # Week filter: pushed into the cached pbp scans, same plays as filtering after the load
+            plan = prep_data.scan_plays(seasons=list(seasons), weeks=list(weeks)).explain()
+            assert all('SELECTION' in scan for scan in plan.split('Parquet SCAN')[1:1 + len(seasons)])
+            polars_testing.assert_frame_equal(prep_data.load_plays(seasons=list(seasons), weeks=list(weeks)),
+                                              prep_data.load_plays(seasons=list(seasons)).filter(pl.col('week').is_in(list(weeks))))
+        finally:
+            prep_data.NFLVERSE_URLS.update(urls)
+            data_cache.CACHE_DIR = cache_dir
+
+    print(f'Cold cache fill | {len(seasons)} seasons, {raw[seasons[0]]["pbp"].width} raw pbp columns')
+    for mode, r in results.items():
+        print(f'    {mode}: {r["secs"]:,.2f}s, peak RSS +{r["peak_rss_mb"]:,.0f} MB')
+
+    return results
+
+
+def bench_team_tendencies(seasons: list[int] = prep_data.SEASONS) -> dict:
+    '''
+    build_team_tendencies (one load, shared partials) vs separate offense and defense calls.
+    Also checks the defense against the old pandas implementation.
+    '''
+
+    plays = prep_data.load_plays(seasons=seasons)
+    pbp_df = pd.DataFrame(columns=plays.columns, data=plays)
+    del plays
+
+    combined = prep_data.build_team_tendencies(seasons=seasons)
+    pd.testing.assert_frame_equal(combined['offense'], legacy_offense_tendencies(pbp_df), check_dtype=False, check_index_type=False)
+    pd.testing.assert_frame_equal(combined['defense'], legacy_defense_tendencies(pbp_df), check_dtype=False, check_index_type=False)
+    del pbp_df
+
+    def separate():
+        return prep_data.load_stats_team_tendencies_offense(seasons=seasons), prep_data.load_stats_team_tendencies_defense(seasons=seasons)
+
+    results = {
+        'separate': measure(separate),
+        'combined': measure(prep_data.build_team_tendencies, seasons=seasons),
+    }
+
+    print(f'Team tendencies | {len(seasons)} seasons, offense + defense')
+    for mode, r in results.items():
+        print(f'    {mode}: {r["secs"]:,.2f}s, peak RSS +{r["peak_rss_mb"]:,.0f} MB')
+
+    return results
+
+
+def check_incremental_refresh(seasons: list[int] = prep_data.SEASONS) -> dict:
+    '''
+    Partials store refreshes, each checked against a full rebuild of the tendencies from the play table:
+    - the last week's games not ingested yet (the weekly refresh): only those games are aggregated;
+    - nflverse correcting one game's plays: only that game is re-aggregated, replacing its stored partials;
+    - no play file rewritten: nothing is read.
+    Runs on a temporary copy of the seasons' cache files, since it rewrites them.
+    '''
+
+    cache_dir = data_cache.CACHE_DIR
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        copy_play_cache(seasons, tmp_dir)
+        data_cache.CACHE_DIR = Path(tmp_dir)
+        try:
+            full_store = measure(partials_store.refresh_partials, seasons=seasons, rebuild=True)
+
+            def check_tendencies():
+                incremental, derive_secs = timed(partials_store.load_team_tendencies, seasons=seasons)
+                rebuilt, rebuild_secs = timed(prep_data.build_team_tendencies, seasons=seasons)
+                for side in rebuilt:
+                    pd.testing.assert_frame_equal(incremental[side], rebuilt[side])
+
+                return derive_secs, rebuild_secs
+
+            last_season = max(seasons)
+            pbp_path = data_cache.cache_path('pbp', last_season)
+
+            ## The week that hasn't been ingested yet; the weekly refresh rewrites the season's play files ##
+            game_partials = pl.read_parquet(data_cache.cache_path('game_partials', last_season))
+            last_week = game_partials['week'].max()
+            week_game_ids = game_partials.filter(pl.col('week') == last_week)['game_id'].cast(pl.String).unique().to_list()
+            for kind in data_cache.PARTIAL_KINDS:
+                stored = pl.read_parquet(data_cache.cache_path(kind, last_season))
+                data_cache.write_cached(kind, last_season, stored.filter(~pl.col('game_id').is_in(week_game_ids)))
+            os.utime(pbp_path)
+
+            new_games, refresh_secs = timed(partials_store.refresh_partials, seasons=seasons)
+            assert new_games == {season: len(week_game_ids) if season == last_season else 0 for season in seasons}, new_games
+            derive_secs, rebuild_secs = check_tendencies()
+
+            ## A corrected game: one game's air yards change ##
+            pbp = pl.read_parquet(pbp_path)
+            corrected_game_id = pbp['game_id'].cast(pl.String)[0]
+            data_cache.write_cached('pbp', last_season, pbp.with_columns(
+                air_yards=pl.when(pl.col('game_id') == corrected_game_id).then(pl.col('air_yards') + 1).otherwise(pl.col('air_yards'))
+            ))
+
+            corrected, correction_secs = timed(partials_store.refresh_partials, seasons=seasons)
+            assert corrected == {season: 1 if season == last_season else 0 for season in seasons}, corrected
+            check_tendencies()
+
+            ## Nothing rewritten ##
+            unchanged, noop_secs = timed(partials_store.refresh_partials, seasons=seasons)
+            assert unchanged == {season: 0 for season in seasons}, unchanged
+        finally:
+            data_cache.CACHE_DIR = cache_dir
+
+    results = {
+        'new_games': len(week_game_ids),
+        'store_build_secs': full_store['secs'],
+        'refresh_secs': refresh_secs,
+        'correction_secs': correction_secs,
+        'noop_secs': noop_secs,
+        'derive_secs': derive_secs,
+        'full_rebuild_secs': rebuild_secs,
+    }
+
+    print(f'Incremental refresh | {len(seasons)} seasons, {len(week_game_ids)} new games (week {last_week} of {last_season})')
+    print(f'    full rebuild:       {rebuild_secs:,.2f}s')
+    print(f'    refresh + derive:   {refresh_secs + derive_secs:,.2f}s (derive only: {derive_secs:,.2f}s)')
+    print(f'    one corrected game: {correction_secs:,.2f}s refresh, nothing changed: {noop_secs * 1000:,.1f}ms')
+
+    return results
+
+
+def bench_streaming(seasons: list[int] = prep_data.SEASONS) -> dict:
+    '''
+    Peak RSS of build_team_tendencies over a growing number of seasons, all at once vs streamed one season at a time.
+    Also checks the streamed tendencies equal the in-memory ones.
+    '''
+
+    # Warm the cache so neither mode pays for the download
+    prep_data.load_plays(seasons=seasons, columns=['MasterPlayID'])
+
+    # A budget of one (estimated) season per chunk; the estimate reads no plays, so compare it to the loaded table
+    max_memory_mb = prep_data.season_memory_mb(max(seasons))
+    assert prep_data.season_chunks(seasons, max_memory_mb) == [[season] for season in seasons]
+
+    season_plays = prep_data.load_plays(seasons=[max(seasons)], columns=prep_data.PLAY_COLUMNS['tendencies'])
+    loaded_mb = season_plays.estimated_size('mb') * prep_data.WORKING_MEMORY_FACTOR
+    del season_plays
+
+    streamed = prep_data.build_team_tendencies(seasons=seasons, max_memory_mb=max_memory_mb)
+    in_memory = prep_data.build_team_tendencies(seasons=seasons)
+    for side in in_memory:
+        pd.testing.assert_frame_equal(streamed[side], in_memory[side])
+
+    results = {}
+    for n in range(1, len(seasons) + 1):
+        results[n] = {
+            'in_memory': measure(prep_data.build_team_tendencies, seasons=seasons[:n]),
+            'streaming': measure(prep_data.build_team_tendencies, seasons=seasons[:n], max_memory_mb=max_memory_mb),
+        }
+
+    print(f'Streaming | up to {len(seasons)} seasons, one season per chunk ({max_memory_mb:,.1f} MB budget, {loaded_mb:,.1f} MB from the loaded season)')
+    for n, r in results.items():
+        print(f'    {n:>2} seasons: in memory {r["in_memory"]["secs"]:,.2f}s / +{r["in_memory"]["peak_rss_mb"]:,.0f} MB, '
+              f'streaming {r["streaming"]["secs"]:,.2f}s / +{r["streaming"]["peak_rss_mb"]:,.0f} MB')
+
+    return results
+
+
+def legacy_schema(frame: pl.DataFrame, game_ids: pl.DataFrame) -> pl.DataFrame:
+    '''
+    An enriched frame with the dtypes the loader used to emit: string labels, Int32 flags and '<game_id>_<n>' string
+    play / drive keys. `game_ids` maps game_number (the integer old_game_id) to game_id.
+    '''
+
+    frame = frame.with_columns(game_number=pl.col('MasterPlayID') // 100_000)
+    frame = frame.join(game_ids.rename({'game_id': 'game_key'}), on='game_number', how='left', maintain_order='left')
+
+    keys = {'MasterPlayID': pl.concat_str([pl.col('game_key'), (pl.col('MasterPlayID') % 100_000).cast(pl.String)], separator='_')}
+    if 'DriveID' in frame.columns:
+        keys['DriveID'] = pl.concat_str([pl.col('game_key'), (pl.col('DriveID') % 100).cast(pl.String)], separator='_')
+
+    frame = prep_data.strings_for_pandas(frame.with_columns(**keys).drop('game_number', 'game_key'))
+
+    # nflverse play flags were left as doubles, derived flags were when / then Int32s
+    raw_flags = [col for col in ['pass', 'rush', 'pass_attempt', 'rush_attempt', 'sack', 'qb_scramble'] if col in frame.columns]
+    return frame.with_columns(pl.col(raw_flags).cast(pl.Float64)).with_columns(pl.col(pl.Int8).cast(pl.Int32))
+
+
+def bench_compact_schema(seasons: list[int] = prep_data.SEASONS) -> dict:
+    '''
+    Size of the enriched pbp / participation / joined tendency frames with the old string / Int32 schema vs the compact one,
+    and the pbp - participation join on string vs integer MasterPlayID.
+    '''
+
+    pbp = pl.concat([prep_data.load_season('pbp', season) for season in seasons], how='diagonal_relaxed')
+    participation = pl.concat([prep_data.load_season('participation', season) for season in seasons], how='diagonal_relaxed')
+
+    game_ids = pbp.select(game_number=pl.col('old_game_id').cast(pl.Int64), game_id=pl.col('game_id').cast(pl.String)).unique()
+    frames = {
+        'compact': {'pbp': pbp, 'participation': participation},
+        'legacy': {'pbp': legacy_schema(pbp, game_ids), 'participation': legacy_schema(participation, game_ids)},
+    }
+
+    results = {}
+    for schema, f in frames.items():
+        join = lambda: f['pbp'].join(f['participation'], on='MasterPlayID', how='left', maintain_order='left')
+        plays, _ = timed(join)
+        results[schema] = {
+            'pbp_mb': f['pbp'].estimated_size('mb'),
+            'participation_mb': f['participation'].estimated_size('mb'),
+            'tendency_columns_mb': plays.select(prep_data.PLAY_COLUMNS['tendencies'] + ['MasterPlayID']).estimated_size('mb'),
+            'join_secs': min(timed(join)[1] for _ in range(5)),
+        }
+
+    print(f'Compact schema | {len(seasons)} seasons, {pbp.shape[0]:,} plays')
+    for key in results['compact']:
+        print(f'    {key}: {results["legacy"][key]:,.3f} -> {results["compact"][key]:,.3f} ({results["legacy"][key] / results["compact"][key]:,.1f}x)')
+
+    return results
+
+
+def legacy_closest_teams(tendencies: pd.DataFrame, features: list[str], team: str, season: int) -> pd.DataFrame:
+    ''' team_profiling's get_closest_teams: a scipy distance call per other team season '''
+
+    team_sl = tendencies.loc[(tendencies.index.get_level_values(0) == team) & (tendencies.index.get_level_values('season') == season), :]
+    team_feature_vals = team_sl[features].values.tolist()[0]
+
+    all_others_sl = tendencies.loc[~tendencies.index.isin(team_sl.index), :]
+    all_others_feature_vals = all_others_sl[features].values.tolist()
+
+    distances = [distance.euclidean(team_feature_vals, p) for p in all_others_feature_vals]
+
+    return pd.DataFrame(index=all_others_sl.index, data={'distance': distances}).sort_values(by='distance', ascending=True)
+
+
+def bench_similarity(seasons: list[int] = prep_data.SEASONS, k: int = similarity.DEFAULT_K) -> dict:
+    '''
+    Top-k similar team seasons for every team season: the per-team scipy loop vs SimilarityIndex.all_neighbors.
+    Checks the unstandardized index reproduces get_closest_teams' distances.
+    '''
+
+    tendencies = prep_data.build_team_tendencies(seasons=seasons)
+
+    results = {}
+    for side, side_tendencies in tendencies.items():
+        features = prep_data.TENDENCY_FEATURES[side]
+        team_seasons = side_tendencies.index.tolist()
+
+        # Same (raw Euclidean) distances as the notebook, where it has no missing values to compare against
+        raw_index = similarity.SimilarityIndex(side_tendencies, side=side, standardize=False)
+        for team, season in team_seasons:
+            legacy = legacy_closest_teams(side_tendencies, features, team, season)
+            if legacy['distance'].isna().any():
+                continue
+            new = raw_index.closest(team, season)
+            np.testing.assert_allclose(new['distance'].to_numpy(), legacy['distance'].to_numpy())
+            assert new.index[0] == legacy.index[0] or np.isclose(new['distance'].iloc[0], new['distance'].iloc[1])
+
+        legacy_secs = timed(lambda: [legacy_closest_teams(side_tendencies, features, team, season).head(k) for team, season in team_seasons])[1]
+        index, build_secs = timed(similarity.SimilarityIndex, side_tendencies, side=side)
+        batch, batch_secs = timed(index.all_neighbors, k=k)
+        assert batch.shape[0] == len(team_seasons) * k
+
+        results[side] = {'team_seasons': len(team_seasons), 'legacy_secs': legacy_secs, 'index_secs': build_secs + batch_secs}
+
+    print(f'Similarity | {len(seasons)} seasons, top {k} for every team season')
+    for side, r in results.items():
+        print(f'    {side}: loop {r["legacy_secs"]:,.2f}s, index {r["index_secs"]:,.3f}s ({r["legacy_secs"] / r["index_secs"]:,.0f}x)')
+
+    return results
+
+
+def bench_percentiles(seasons: list[int] = prep_data.SEASONS) -> dict:
+    '''
+    Percentile scores of every team season for every feature: a percentileofscore call per (team season, feature)
+    vs PercentileTable.matrix. Also checks lookups of arbitrary values (e.g. cluster means) match scipy.
+    '''
+
+    tendencies = prep_data.build_team_tendencies(seasons=seasons)
+
+    results = {}
+    for side, side_tendencies in tendencies.items():
+        features = prep_data.TENDENCY_FEATURES[side]
+
+        def legacy():
+            return [[percentileofscore(side_tendencies[feature].tolist(), val, kind='weak') / 100 for feature, val in zip(features, row)]
+                    for row in side_tendencies[features].values.tolist()]
+
+        legacy_scores, legacy_secs = timed(legacy)
+        table_scores, table_secs = timed(lambda: percentiles.PercentileTable(side_tendencies, features=features).matrix())
+        np.testing.assert_allclose(table_scores.to_numpy(), np.array(legacy_scores))
+
+        table = percentiles.PercentileTable(side_tendencies)
+        for feature in features:
+            probes = np.concatenate([side_tendencies[feature].quantile([0, 0.33, 0.5, 0.9]).to_numpy(), [-1e9, 1e9, np.nan]])
+            expected = [percentileofscore(side_tendencies[feature].tolist(), val, kind='weak') / 100 for val in probes]
+            np.testing.assert_allclose(table.score(feature, probes), expected)
+
+        results[side] = {'cells': table_scores.size, 'legacy_secs': legacy_secs, 'table_secs': table_secs}
+
+    print(f'Percentiles | {len(seasons)} seasons, every team season x feature')
+    for side, r in results.items():
+        print(f'    {side}: {r["cells"]:,} scores, percentileofscore {r["legacy_secs"]:,.2f}s, table {r["table_secs"]:,.4f}s ({r["legacy_secs"] / r["table_secs"]:,.0f}x)')
+
+    return results
+
+
+def legacy_sweep(tendencies: pd.DataFrame, configs: list[tuple[str, dict]]) -> dict:
+    ''' The notebooks' loops: scale, project and fit each configuration from scratch, then score it '''
+
+    models = {'kmeans': KMeans, 'spectral': SpectralClustering, 'dbscan': DBSCAN, 'hdbscan': HDBSCAN, 'optics': OPTICS}
+
+    labels = {}
+    for algorithm, params in configs:
+        cluster_input = similarity.feature_matrix(tendencies, prep_data.TENDENCY_FEATURES['offense'], n_components=cluster_sweep.PCA_N_COMPONENTS)[0]
+
+        kwargs = {**cluster_sweep.ALGORITHM_DEFAULTS[algorithm], **params}
+        if algorithm == 'spectral':
+            kwargs['affinity'] = 'nearest_neighbors'
+        model_labels = models[algorithm](**kwargs).fit(cluster_input).labels_
+
+        clustered = model_labels != -1
+        if len(np.unique(model_labels[clustered])) > 1:
+            silhouette_score(cluster_input[clustered], model_labels[clustered])
+            davies_bouldin_score(cluster_input[clustered], model_labels[clustered])
+
+        labels[cluster_sweep.config_key(algorithm, params)] = model_labels
+
+    return labels
+
+
+def bench_cluster_sweep(seasons: list[int] = prep_data.SEASONS, grid: dict = cluster_sweep.DEFAULT_GRID) -> dict:
+    '''
+    The notebooks' serial fit loops vs ClusterSweep (in process and over a process pool), then a cached re-run with one
+    extra configuration. Checks every configuration's labels match the plain sklearn fit.
+    '''
+
+    tendencies = prep_data.build_team_tendencies(seasons=seasons, sides=('offense',))['offense']
+    configs = cluster_sweep.expand_grid(grid)
+
+    legacy_labels, legacy_secs = timed(legacy_sweep, tendencies, configs)
+
+    serial_table, serial_secs = timed(lambda: cluster_sweep.ClusterSweep(tendencies, cache=False).run(grid, n_jobs=1))
+    sweep = cluster_sweep.ClusterSweep(tendencies, cache=False)
+    pool_table, pool_secs = timed(sweep.run, grid)
+
+    for key, labels in legacy_labels.items():
+        np.testing.assert_array_equal(sweep.results[key]['labels'], labels)
+    pd.testing.assert_frame_equal(serial_table.drop(columns='fit_secs'), pool_table.drop(columns='fit_secs'))
+
+    # One more spectral configuration: only it is fit
+    extra_grid = {**grid, 'spectral': {**grid.get('spectral', {}), 'n_clusters': [*grid.get('spectral', {}).get('n_clusters', []), 5]}}
+    extra_table, extra_secs = timed(sweep.run, extra_grid, n_jobs=1)
+    assert len(extra_table) == len(configs) + 1
+
+    results = {'configs': len(configs), 'legacy_secs': legacy_secs, 'serial_secs': serial_secs, 'pool_secs': pool_secs, 'extra_secs': extra_secs}
+
+    print(f'Cluster sweep | {len(seasons)} seasons, {len(tendencies)} team seasons, {len(configs)} configurations')
+    print(f'    loop: {legacy_secs:,.2f}s')
+    print(f'    sweep: {serial_secs:,.2f}s in process, {pool_secs:,.2f}s process pool ({os.cpu_count()} cores)')
+    print(f'    +1 config: {extra_secs:,.3f}s')
+
+    return results
+
+
+def bench_stability(seasons: list[int] = prep_data.SEASONS, n_replicates: int = stability.N_REPLICATES, n_legacy: int = 5) -> dict:
+    '''
+    Bootstrap replicates of the offensive tendencies: re-aggregating resampled partials with Polars per replicate (timed
+    on `n_legacy` of them) vs StabilityBootstrap's vectorized resampling. Checks both give the same tendencies.
+    '''
+
+    game_partials, player_partials = prep_data.collect_partials(seasons=seasons)
+    bootstrap, build_secs = timed(stability.StabilityBootstrap, game_partials, player_partials)
+
+    weights = bootstrap.resample(n_replicates)
+    sorted_partials = game_partials.sort([*bootstrap.keys, 'game_id'])
+
+    def legacy(replicate_weights):
+        # Each drawn game's partials, repeated as often as it was drawn
+        resampled = sorted_partials[np.repeat(np.arange(len(replicate_weights)), replicate_weights.astype(int))]
+        resampled_players = resampled.select('season', 'game_id', 'posteam').join(player_partials, on=['season', 'game_id', 'posteam'])
+        return prep_data.tendencies_from_partials(resampled.lazy(), resampled_players.lazy(), sides=('offense',))['offense']
+
+    legacy_tendencies, legacy_secs = timed(lambda: [legacy(replicate_weights) for replicate_weights in weights[:n_legacy]])
+    replicates, replicate_secs = timed(bootstrap.replicate_tendencies, weights)
+    for replicate, expected in enumerate(legacy_tendencies):
+        pd.testing.assert_frame_equal(replicates.xs(replicate, level='replicate'), expected, check_dtype=False)
+
+    assign, assign_secs = timed(bootstrap.run, n_replicates)
+    refit, refit_secs = timed(bootstrap.run, n_replicates, refit=True)
+
+    results = {
+        'replicates': n_replicates, 'legacy_secs_per_replicate': legacy_secs / n_legacy, 'build_secs': build_secs,
+        'replicate_secs': replicate_secs, 'assign_secs': assign_secs, 'refit_secs': refit_secs,
+        'mean_same_cluster': assign['teams']['% Same Cluster'].mean(), 'mean_same_cluster_refit': refit['teams']['% Same Cluster'].mean(),
+    }
+
+    print(f'Stability | {len(seasons)} seasons, {n_replicates} replicates')
+    print(f'    tendencies: {results["legacy_secs_per_replicate"] * n_replicates:,.2f}s re-aggregating per replicate, {replicate_secs:,.2f}s vectorized (+{build_secs:,.2f}s setup)')
+    print(f'    full run: assign {assign_secs:,.2f}s, refit {refit_secs:,.2f}s')
+    print(f'    mean % same cluster: assign {results["mean_same_cluster"]:.0%}, refit {results["mean_same_cluster_refit"]:.0%}')
+
+    return results
+
+
+def check_cluster_model(seasons: list[int] = prep_data.SEASONS, path: str = None) -> dict:
+    '''
+    ClusterModel vs the notebook's SpectralClustering fit: same labels, reassigning the training rows (after a save / load)
+    reproduces them, and held-out seasons are labeled without a refit. Times the refit vs the assignment.
+    '''
+
+    tendencies = prep_data.build_team_tendencies(seasons=seasons, sides=('offense',))['offense']
+    cluster_input = similarity.feature_matrix(tendencies, prep_data.TENDENCY_FEATURES['offense'], n_components=cluster_sweep.PCA_N_COMPONENTS)[0]
+
+    def refit():
+        return SpectralClustering(n_clusters=cluster_model.N_CLUSTERS, eigen_solver='arpack', affinity='nearest_neighbors',
+                                  random_state=cluster_model.RANDOM_STATE).fit(cluster_input).labels_
+
+    notebook_labels, refit_secs = timed(refit)
+    model, fit_secs = timed(cluster_model.ClusterModel, tendencies)
+    np.testing.assert_array_equal(model.labels, notebook_labels)
+
+    saved_path = model.save(path)
+    loaded, load_secs = timed(cluster_model.ClusterModel.load, saved_path)
+    reassigned, assign_secs = timed(loaded.assign, tendencies)
+    np.testing.assert_array_equal(reassigned.to_numpy(), model.labels)
+
+    # Fit on all but the last season, label it out of sample
+    last_season = tendencies.index.get_level_values('season') == seasons[-1]
+    held_out = cluster_model.ClusterModel(tendencies[~last_season]).assign(tendencies[last_season])
+    assert held_out.index.equals(tendencies[last_season].index)
+
+    results = {'team_seasons': len(tendencies), 'refit_secs': refit_secs, 'fit_secs': fit_secs, 'load_secs': load_secs, 'assign_secs': assign_secs}
+
+    print(f'Cluster model | {len(seasons)} seasons, {len(tendencies)} team seasons')
+    print(f'    refit: {refit_secs:,.3f}s, load: {load_secs * 1000:,.1f}ms, assign: {assign_secs * 1000:,.1f}ms (training labels reproduced)')
+
+    return results
+
+
+def bench_embeddings(seasons: list[int] = prep_data.SEASONS, perplexities: list[float] = (3, 5, 10, 20, 30)) -> dict:
+    '''
+    The notebooks' t-SNE perplexity loop (scale + fit per perplexity) vs EmbeddingStore.tsne_sweep, cold and on a repeat.
+    Checks the store's coordinates match TSNE on the scaled features exactly.
+    '''
+
+    tendencies = prep_data.build_team_tendencies(seasons=seasons, sides=('offense',))['offense']
+    features = prep_data.TENDENCY_FEATURES['offense']
+    perplexities = [perplexity for perplexity in perplexities if perplexity < len(tendencies)]
+
+    def legacy():
+        scaled_data = StandardScaler().fit_transform(similarity.feature_matrix(tendencies, features, standardize=False)[0])
+        return {perplexity: TSNE(n_components=3, perplexity=perplexity, random_state=42).fit(scaled_data) for perplexity in perplexities}
+
+    legacy_models, legacy_secs = timed(legacy)
+
+    store = embeddings.EmbeddingStore(cache_dir=False)
+    _, cold_secs = timed(store.tsne_sweep, tendencies, perplexities, features)
+    _, warm_secs = timed(store.tsne_sweep, tendencies, perplexities, features)
+
+    for perplexity, model in legacy_models.items():
+        coordinates, _ = store.tsne(tendencies, features, perplexity=perplexity)
+        np.testing.assert_array_equal(coordinates.to_numpy(), model.embedding_)
+
+    results = {'perplexities': len(perplexities), 'legacy_secs': legacy_secs, 'cold_secs': cold_secs, 'warm_secs': warm_secs}
+
+    print(f'Embeddings | {len(seasons)} seasons, t-SNE at {len(perplexities)} perplexities')
+    print(f'    loop: {legacy_secs:,.2f}s, store: {cold_secs:,.2f}s cold, {warm_secs * 1000:,.1f}ms repeat')
+
+    return results
+
+
+
+def legacy_windowed_tendencies(game_partials: pl.DataFrame, player_partials: pl.DataFrame, side: str, window: int = None) -> pd.DataFrame:
+    ''' Windowed tendencies the direct way: re-run the season group by on each week's window of games '''
+
+    team_keys = prep_data.TENDENCY_KEYS[side]
+    team = team_keys[0]
+
+    frames = []
+    for season, week in game_partials.select('season', 'week').unique().sort('season', 'week').iter_rows():
+        team_weeks = game_partials.filter(pl.col('season') == season, pl.col('week') <= week).select(*team_keys, 'week').unique()
+        if window is not None:
+            team_weeks = team_weeks.filter(pl.col('week').rank('ordinal', descending=True).over(team_keys) <= window)
+
+        games = game_partials.join(team_weeks, on=[*team_keys, 'week'])
+        if side == 'offense':
+            players = player_partials.join(team_weeks, on=[*team_keys, 'week'])
+            query = prep_data.offense_tendencies_from_partials(games.lazy(), players.lazy())
+        else:
+            query = prep_data.defense_tendencies_from_partials(games.lazy())
+
+        frames.append(query.collect().with_columns(week=pl.lit(week, dtype=game_partials['week'].dtype)))
+
+    return prep_data._to_pandas_tendencies(pl.concat(frames), team_keys + ['week'])
+
+
+def bench_windowed_tendencies(seasons: list[int] = prep_data.SEASONS, windows: list[int] = (None, 4)) -> dict:
+    '''
+    As-of-week tendencies (cumulative and trailing windows): a group by per week vs one pass of running sums.
+    Checks both give the same frame, and that the last cumulative week matches the season tendencies.
+    '''
+
+    game_partials, player_partials = prep_data.collect_partials(seasons=seasons)
+    season_tendencies = prep_data.tendencies_from_partials(game_partials.lazy(), player_partials.lazy())
+
+    results = {}
+    for window in windows:
+        windowed, windowed_secs = timed(prep_data.windowed_tendencies, game_partials.lazy(), player_partials.lazy(), window=window)
+
+        legacy_secs = 0
+        for side, side_windowed in windowed.items():
+            legacy, secs = timed(legacy_windowed_tendencies, game_partials, player_partials, side, window)
+            legacy_secs += secs
+            pd.testing.assert_frame_equal(side_windowed, legacy[side_windowed.columns], check_dtype=False)
+
+            if window is None:
+                last_week = side_windowed.groupby(level=[0, 1]).tail(1).droplevel('week')
+                pd.testing.assert_frame_equal(last_week, season_tendencies[side], check_dtype=False)
+
+        results[window] = {'rows': {side: len(df) for side, df in windowed.items()}, 'legacy_secs': legacy_secs, 'windowed_secs': windowed_secs}
+
+    print(f'Windowed tendencies | {len(seasons)} seasons, every team week')
+    for window, r in results.items():
+        label = 'to date' if window is None else f'last {window} games'
+        print(f'    {label}: {r["rows"]["offense"]:,} team weeks, group by per week {r["legacy_secs"]:,.2f}s, '
+              f'running sums {r["windowed_secs"]:,.3f}s ({r["legacy_secs"] / r["windowed_secs"]:,.0f}x)')
+
+    return results
+
+
+def bench_instrumentation(seasons: list[int] = prep_data.SEASONS, n_calls: int = 100_000) -> dict:
+    '''
+    Cost of the prep_data stage instrumentation: build_team_tendencies with profiling off vs on, and the cost of one
+    stage while it is off. Prints the flame summary of the profiled run.
+    '''
+
+    prep_data.build_team_tendencies(seasons=seasons)
+
+    _, off_secs = timed(prep_data.build_team_tendencies, seasons=seasons)
+    with instrument.profile() as profiler:
+        _, on_secs = timed(prep_data.build_team_tendencies, seasons=seasons)
+
+    def disabled_stages():
+        for _ in range(n_calls):
+            with instrument.stage('noop') as s:
+                s.output(None)
+
+    _, disabled_secs = timed(disabled_stages)
+
+    results = {'off_secs': off_secs, 'on_secs': on_secs, 'disabled_stage_ns': disabled_secs / n_calls * 1e9,
+               'stages': len(profiler.report()['stages'])}
+
+    print(f'Instrumentation | {len(seasons)} seasons, build_team_tendencies ({results["stages"]} stages)')
+    print(f'    off: {off_secs:,.3f}s, on: {on_secs:,.3f}s, disabled stage: {results["disabled_stage_ns"]:,.0f}ns')
+    print(profiler.flame())
+
+    return results
+
+
+def bench_feature_store(seasons: list[int] = prep_data.SEASONS) -> dict:
+    '''
+    FeatureStore build (cold), a no-op rebuild, and a rebuild after one season's input changes, vs loading the stored
+    tables. Checks the stored tendencies / clusters / components match build_team_tendencies and a ClusterModel fit.
+    Runs on a temporary copy of the seasons' cache files, since it rewrites one of them.
+    '''
+
+    cache_dir = data_cache.CACHE_DIR
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        copy_play_cache(seasons, tmp_dir)
+        data_cache.CACHE_DIR = Path(tmp_dir)
+        try:
+            store = feature_store.FeatureStore(Path(tmp_dir) / 'features')
+
+            _, cold_secs = timed(store.build, seasons)
+            warm, warm_secs = timed(store.build, seasons)
+            assert warm == {'rebuilt_seasons': [], 'refit': []}
+
+            # Inputs are versioned by content: a touched file is not new data...
+            path = data_cache.cache_path('pbp', seasons[-1])
+            os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 10 ** 9))
+            assert store.stale_seasons(seasons) == []
+
+            # ...a re-download with new plays (here: one game dropped) is. Only that season is rebuilt; the models are refit
+            pbp = data_cache.read_cached('pbp', seasons[-1])
+            data_cache.write_cached('pbp', seasons[-1], pbp.filter(pl.col('game_id') != pbp['game_id'][0]))
+            changed, changed_secs = timed(store.build, seasons)
+            assert changed['rebuilt_seasons'] == [seasons[-1]]
+
+            def load():
+                return {side: (store.tendencies(side), store.components(side), store.clusters(side)) for side in feature_store.SIDES}
+
+            stored, load_secs = timed(load)
+
+            # Float sums in the live build can differ in the last bit from run to run
+            tendencies = prep_data.build_team_tendencies(seasons=seasons)
+            for side, (side_tendencies, components, clusters) in stored.items():
+                pd.testing.assert_frame_equal(side_tendencies, tendencies[side], check_exact=False, rtol=1e-12)
+
+                model = cluster_model.ClusterModel(tendencies[side], side=side)
+                np.testing.assert_allclose(components.to_numpy(), model.matrix, atol=1e-9)
+                np.testing.assert_array_equal(clusters.to_numpy(), model.labels)
+        finally:
+            data_cache.CACHE_DIR = cache_dir
+
+    results = {'cold_secs': cold_secs, 'warm_secs': warm_secs, 'changed_secs': changed_secs, 'load_secs': load_secs}
+
+    print(f'Feature store | {len(seasons)} seasons, {len(feature_store.SIDES)} sides')
+    print(f'    build: {cold_secs:,.2f}s cold, {warm_secs * 1000:,.1f}ms up to date, {changed_secs:,.2f}s after one season changed')
+    print(f'    load: {load_secs * 1000:,.1f}ms (tendencies, components and clusters)')
+
+    return results
+
+
+CHECKS = [
+    bench_cache,
+    bench_personnel,
+    bench_offense_tendencies,
+    bench_loader_modes,
+    check_cold_cache_fill,
+    bench_team_tendencies,
+    check_incremental_refresh,
+    bench_streaming,
+    bench_compact_schema,
+    bench_similarity,
+    bench_percentiles,
+    bench_cluster_sweep,
+    bench_stability,
+    check_cluster_model,
+    bench_embeddings,
+    bench_windowed_tendencies,
+    bench_instrumentation,
+    bench_feature_store,
+]
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Timing / equivalence checks for the data prep pipeline')
+    parser.add_argument('--synthetic', type=int, nargs='+', metavar='SEASON', default=None,
+                        help='run on these synthetic seasons (offline, in a temporary cache) instead of the real data')
+    parser.add_argument('--seed', type=int, default=synthetic.SEED)
+    parser.add_argument('--only', nargs='+', choices=[check.__name__ for check in CHECKS], default=None, help='checks to run (default: all)')
+    args = parser.parse_args(argv)
+
+    checks = [check for check in CHECKS if args.only is None or check.__name__ in args.only]
+
+    if args.synthetic is None:
+        for check in checks:
+            check()
+        return 0
+
+    # bench_cache times the download itself, so it needs the real data
+    checks = [check for check in checks if check is not bench_cache]
+
+    cache_dir = data_cache.CACHE_DIR
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_cache.CACHE_DIR = Path(tmp_dir)
+        try:
+            synthetic.write_synthetic_cache(args.synthetic, seed=args.seed)
+
+            for check in checks:
+                if check is bench_personnel:
+                    check(synthetic.synthetic_seasons(args.synthetic, seed=args.seed)[1])
+                elif check is check_cluster_model:
+                    check(args.synthetic, path=Path(tmp_dir) / 'cluster_model.npz')
+                elif check is check_cold_cache_fill:
+                    check(args.synthetic, raw_season=lambda season: synthetic.synthetic_season(season, seed=args.seed))
+                else:
+                    check(args.synthetic)
+        finally:
+            data_cache.CACHE_DIR = cache_dir
+
+    return 0
+
+
+
+if __name__ == '__main__':
+    sys.exit(main())
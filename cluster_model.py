@@ -0,0 +1,178 @@
+'''
+Jack Miller
+January 2026
+'''
+
+
+''' Imports '''
+
+from pathlib import Path
+
+import pandas as pd
+import numpy as np
+
+from sklearn.cluster import k_means
+from sklearn.manifold import spectral_embedding
+from sklearn.utils import check_random_state
+
+import cluster_sweep
+import prep_data
+import similarity
+
+
+
+''' Parameters / Constants '''
+
+MODEL_DIR = Path(__file__).parent / 'data' / 'models'
+
+# final clustering.ipynb
+N_CLUSTERS = 4
+RANDOM_STATE = 42
+
+# Arrays written to / read from the model file
+MODEL_ARRAYS = [
+    'side', 'features', 'teams', 'seasons', 'scaler_mean', 'scaler_scale', 'pca_mean', 'pca_components',
+    'matrix', 'radii', 'embedding', 'eigenvalues', 'centers', 'labels', 'n_neighbors',
+]
+
+
+
+''' Helpers '''
+
+def _distances(points: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    ''' Euclidean distances (points x matrix rows); one formula for the radii and the queries, so a training point's
+    distance to its furthest neighbor compares equal to the radius '''
+
+    return np.sqrt(((points[:, None, :] - matrix[None, :, :]) ** 2).sum(axis=-1))
+
+
+def _affinity_rows(distances: np.ndarray, radii: np.ndarray, n_neighbors: int) -> np.ndarray:
+    '''
+    Affinity of query points to the training points, given their distances (queries x training points): the same
+    0.5 * (A + A.T) nearest-neighbor graph the spectral fit used. A query links to its n_neighbors - 1 nearest training
+    points (kneighbors_graph counts the point itself), and a training point links to the query if it would be one of
+    that point's own n_neighbors. A training point at distance 0 is the query itself, and self links are ignored.
+    '''
+
+    is_self = distances == 0
+    distances = np.where(is_self, np.inf, distances)
+
+    nearest = np.argsort(distances, axis=1, kind='stable')[:, :n_neighbors - 1]
+    forward = np.zeros(distances.shape)
+    np.put_along_axis(forward, nearest, 1, axis=1)
+
+    reverse = distances <= radii
+
+    return 0.5 * (forward + reverse)
+
+
+
+''' Main Functions '''
+
+class ClusterModel:
+    '''
+    The final spectral clustering as a reusable, persisted model: the scaler, the PCA, and the spectral embedding / k-means
+    centers of the training team seasons.
+
+    Fitting reproduces SpectralClustering(affinity='nearest_neighbors', eigen_solver='arpack') step by step, keeping the
+    pieces it discards. New team seasons are placed in the embedding by the Nystrom extension (a degree-normalized average
+    of their graph neighbors' embeddings, divided by the eigenvalue) and labeled by the nearest k-means center, so labels are
+    consistent with the fitted ones without a refit.
+    '''
+
+    def __init__(self, tendencies: pd.DataFrame, side: str = 'offense', features: list[str] = None, n_clusters: int = N_CLUSTERS,
+                 n_neighbors: int = cluster_sweep.N_NEIGHBORS, n_components: int = cluster_sweep.PCA_N_COMPONENTS,
+                 random_state: int = RANDOM_STATE):
+
+        # The model stores one (team, season) per row; windowed tendencies would repeat them once per week
+        if tendencies.index.nlevels != 2:
+            raise ValueError(f'ClusterModel is fit on team seasons, got index levels {list(tendencies.index.names)}; '
+                             f'select one week of windowed tendencies first, e.g. tendencies.xs(week, level="week")')
+
+        self.features = np.array(features if features is not None else prep_data.TENDENCY_FEATURES[side])
+
+        _, scaler, pca = similarity.feature_matrix(tendencies, list(self.features), n_components=n_components)
+        self.scaler_mean, self.scaler_scale, self.pca_mean, self.pca_components = scaler.mean_, scaler.scale_, pca.mean_, pca.components_
+
+        # Projected with the same arithmetic as new team seasons, so reassigning a training row finds it at distance 0
+        matrix = self.project(tendencies)
+        neighbor_positions = cluster_sweep.search_neighbors(matrix, n_neighbors)
+        affinity = cluster_sweep.knn_affinity(neighbor_positions, n_neighbors)
+
+        # As in SpectralClustering.fit: one RandomState shared by the eigensolver and k-means
+        random_state = check_random_state(random_state)
+        embedding = spectral_embedding(affinity, n_components=n_clusters, eigen_solver='arpack', random_state=random_state, drop_first=False)
+        centers, labels, _ = k_means(embedding, n_clusters, random_state=random_state, n_init=10)
+
+        # Random walk eigenvalues of each embedding dimension (self links dropped, as the Laplacian does)
+        adjacency = affinity.tolil()
+        adjacency.setdiag(0)
+        adjacency = adjacency.tocsr()
+        degree = np.asarray(adjacency.sum(axis=1)).ravel()
+        eigenvalues = (embedding * (adjacency @ embedding)).sum(axis=0) / (embedding * degree[:, None] * embedding).sum(axis=0)
+
+        # Each training point's distance to its furthest graph neighbor
+        radii = np.take_along_axis(_distances(matrix, matrix), neighbor_positions[:, -1:], axis=1).ravel()
+
+        self._set_arrays(
+            side=np.array(side), features=self.features, teams=tendencies.index.get_level_values(0).to_numpy(dtype=str),
+            seasons=tendencies.index.get_level_values(1).to_numpy(dtype=int),
+            scaler_mean=self.scaler_mean, scaler_scale=self.scaler_scale, pca_mean=self.pca_mean, pca_components=self.pca_components,
+            matrix=matrix, radii=radii, embedding=embedding, eigenvalues=eigenvalues, centers=centers, labels=labels,
+            n_neighbors=np.array(n_neighbors),
+        )
+
+    def _set_arrays(self, **arrays):
+        for name in MODEL_ARRAYS:
+            setattr(self, name, arrays[name])
+
+        self.side, self.n_neighbors = str(self.side), int(self.n_neighbors)
+        self.index = pd.MultiIndex.from_arrays([self.teams, self.seasons], names=prep_data.TENDENCY_KEYS[self.side])
+
+    @classmethod
+    def load(cls, path: str | Path = None, side: str = 'offense') -> 'ClusterModel':
+        ''' Reads a saved model (plain NumPy arrays, no pickled objects) '''
+
+        path = path if path is not None else MODEL_DIR / f'{side}_cluster_model.npz'
+
+        model = cls.__new__(cls)
+        with np.load(path) as arrays:
+            model._set_arrays(**{name: arrays[name] for name in MODEL_ARRAYS})
+
+        return model
+
+    def save(self, path: str | Path = None) -> Path:
+        path = Path(path) if path is not None else MODEL_DIR / f'{self.side}_cluster_model.npz'
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        np.savez(path, **{name: getattr(self, name) for name in MODEL_ARRAYS})
+
+        return path
+
+    def project(self, tendencies: pd.DataFrame) -> np.ndarray:
+        ''' Tendencies -> the training PCA space (missing values filled with the training means) '''
+
+        values = tendencies[self.features.tolist()].to_numpy(dtype=float)
+        values = np.where(np.isnan(values), self.scaler_mean, values)
+
+        return ((values - self.scaler_mean) / self.scaler_scale - self.pca_mean) @ self.pca_components.T
+
+    def embed(self, tendencies: pd.DataFrame) -> np.ndarray:
+        ''' Nystrom extension of the spectral embedding to (new) team seasons '''
+
+        points = self.project(tendencies)
+        affinity = _affinity_rows(_distances(points, self.matrix), self.radii, self.n_neighbors)
+        degree = affinity.sum(axis=1, keepdims=True)
+
+        return (affinity @ self.embedding) / degree / self.eigenvalues
+
+    def assign(self, tendencies: pd.DataFrame) -> pd.Series:
+        '''
+        Cluster labels for team seasons, consistent with the fitted labels (nearest k-means center in the embedding).
+        Works on any index, e.g. windowed tendencies: each team week is labeled on its own.
+        '''
+
+        embedding = self.embed(tendencies)
+        distances = ((embedding[:, None, :] - self.centers[None, :, :]) ** 2).sum(axis=-1)
+
+        return pd.Series(distances.argmin(axis=1), index=tendencies.index, name='Cluster')
@@ -0,0 +1,291 @@
+'''
+Jack Miller
+January 2026
+'''
+
+
+''' Imports '''
+
+import hashlib
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import pandas as pd
+import numpy as np
+
+import sklearn
+from scipy import sparse
+from sklearn.cluster import KMeans, SpectralClustering, DBSCAN, HDBSCAN, OPTICS
+from sklearn.metrics import pairwise_distances, silhouette_score, davies_bouldin_score
+from sklearn.model_selection import ParameterGrid
+from sklearn.neighbors import NearestNeighbors
+
+import data_cache
+import prep_data
+import similarity
+
+
+
+''' Parameters / Constants '''
+
+PCA_N_COMPONENTS = 8
+
+# SpectralClustering's default for affinity='nearest_neighbors'
+N_NEIGHBORS = 10
+
+# Settings the notebooks use for every fit; a grid value overrides them
+ALGORITHM_DEFAULTS = {
+    'kmeans': dict(n_init='auto', init='k-means++', random_state=42),
+    'spectral': dict(eigen_solver='arpack', random_state=42),
+    'dbscan': dict(),
+    'hdbscan': dict(copy=True),
+    'optics': dict(),
+}
+
+# The notebooks' hand-tuned loops, as one grid
+DEFAULT_GRID = {
+    'kmeans': {'n_clusters': list(range(2, 10))},
+    'spectral': {'n_clusters': [4, 6, 8, 10]},
+    'dbscan': {'eps': [i / 10.0 for i in range(10, 50, 5)], 'min_samples': [5]},
+    'hdbscan': {'min_cluster_size': [2, 3, 5, 7, 9], 'min_samples': [2, 3, 5, 7, 9], 'cluster_selection_method': ['eom', 'leaf']},
+    'optics': {'min_samples': [3, 5, 7], 'xi': [0.05], 'min_cluster_size': [0.1]},
+}
+
+SWEEP_CACHE_DIR = 'sweeps'
+
+# Shared artifacts of the sweep running in this process (set directly, or once per pool worker)
+_artifacts = None
+
+
+
+''' Helpers '''
+
+def config_key(algorithm: str, params: dict) -> str:
+    ''' Readable, order-independent key for a configuration, e.g. "spectral(n_clusters=4)" '''
+
+    params_str = ', '.join(f'{name}={val!r}' for name, val in sorted(params.items()))
+    return f'{algorithm}({params_str})'
+
+
+def expand_grid(grid: dict) -> list[tuple[str, dict]]:
+    ''' {algorithm: param grid} -> [(algorithm, params), ...] '''
+
+    configs = []
+    for algorithm, param_grid in grid.items():
+        if algorithm not in ALGORITHM_DEFAULTS:
+            raise ValueError(f'Unknown algorithm: {algorithm}')
+
+        configs += [(algorithm, params) for params in ParameterGrid(param_grid)]
+
+    return configs
+
+
+def knn_affinity(neighbor_positions: np.ndarray, n_neighbors: int) -> sparse.csr_matrix:
+    '''
+    SpectralClustering's nearest_neighbors affinity, from precomputed neighbor positions (self included):
+    the kNN connectivity graph, symmetrized as 0.5 * (A + A.T)
+    '''
+
+    n = len(neighbor_positions)
+    connectivity = sparse.csr_matrix(
+        (np.ones(n * n_neighbors), neighbor_positions[:, :n_neighbors].ravel(), np.arange(0, n * n_neighbors + 1, n_neighbors)),
+        shape=(n, n),
+    )
+
+    return 0.5 * (connectivity + connectivity.T)
+
+
+def score_labels(labels: np.ndarray, matrix: np.ndarray, distances: np.ndarray) -> dict:
+    '''
+    Cluster count, noise count, silhouette (on the precomputed distances), Davies-Bouldin and inertia (within-cluster
+    sum of squares). Noise points (-1) are left out of the scores, which are NaN with fewer than 2 clusters.
+    '''
+
+    clustered = labels != -1
+    clustered_labels = labels[clustered]
+    cluster_ids, cluster_positions = np.unique(clustered_labels, return_inverse=True)
+    n_clusters = len(cluster_ids)
+
+    scores = {'n_clusters': n_clusters, 'n_noise': int((~clustered).sum()), 'silhouette': np.nan, 'davies_bouldin': np.nan, 'inertia': np.nan}
+    if n_clusters == 0:
+        return scores
+
+    points = matrix[clustered]
+    centroids = np.array([points[cluster_positions == position].mean(axis=0) for position in range(n_clusters)])
+    scores['inertia'] = float(((points - centroids[cluster_positions]) ** 2).sum())
+
+    if 2 <= n_clusters < len(points):
+        scores['silhouette'] = silhouette_score(distances[np.ix_(clustered, clustered)], clustered_labels, metric='precomputed')
+        scores['davies_bouldin'] = davies_bouldin_score(points, clustered_labels)
+
+    return scores
+
+
+def search_neighbors(matrix: np.ndarray, n_neighbors: int) -> np.ndarray:
+    ''' Positions of each point's `n_neighbors` nearest points, self included (like kneighbors_graph(include_self=True)) '''
+
+    n_neighbors = min(n_neighbors, len(matrix))
+    return NearestNeighbors(n_neighbors=n_neighbors).fit(matrix).kneighbors(matrix, return_distance=False)
+
+
+def build_artifacts(matrix: np.ndarray, n_neighbors: int = N_NEIGHBORS) -> dict:
+    ''' The shared inputs of every fit on `matrix`: the matrix, its pairwise distances (for the scores) and its kNN positions '''
+
+    return {'matrix': matrix, 'distances': pairwise_distances(matrix), 'neighbor_positions': search_neighbors(matrix, n_neighbors)}
+
+
+def fit_labels(algorithm: str, params: dict, artifacts: dict) -> np.ndarray:
+    ''' Fits one configuration on the shared artifacts and returns its labels '''
+
+    params = {**ALGORITHM_DEFAULTS[algorithm], **params}
+
+    if algorithm == 'kmeans':
+        return KMeans(**params).fit(artifacts['matrix']).labels_
+
+    if algorithm == 'spectral':
+        # Same affinity SpectralClustering(affinity='nearest_neighbors') builds, taken from the shared kNN search
+        n_neighbors = params.pop('n_neighbors', N_NEIGHBORS)
+        affinity = knn_affinity(artifacts['neighbor_positions'], n_neighbors)
+        return SpectralClustering(affinity='precomputed', **params).fit(affinity).labels_
+
+    # Density based - on the matrix with the default euclidean metric, as the notebooks fit them. HDBSCAN builds a different
+    # tree (and breaks ties differently) from a precomputed distance matrix, so its labels wouldn't match
+    model = {'dbscan': DBSCAN, 'hdbscan': HDBSCAN, 'optics': OPTICS}[algorithm]
+    return model(**params).fit(artifacts['matrix']).labels_
+
+
+def fit_config(algorithm: str, params: dict, artifacts: dict = None) -> dict:
+    ''' Fits one configuration on the shared artifacts; returns its labels, scores and fit time '''
+
+    artifacts = artifacts if artifacts is not None else _artifacts
+
+    start = time.perf_counter()
+    labels = fit_labels(algorithm, params, artifacts)
+    fit_secs = time.perf_counter() - start
+
+    return {'labels': labels, 'fit_secs': fit_secs, **score_labels(labels, artifacts['matrix'], artifacts['distances'])}
+
+
+def process_pool(n_jobs: int, initializer=None, initargs: tuple = ()) -> ProcessPoolExecutor:
+    ''' Spawned (not forked) worker processes, since forking after Polars has started its thread pool can deadlock '''
+
+    return ProcessPoolExecutor(max_workers=n_jobs, mp_context=get_context('spawn'), initializer=initializer, initargs=initargs)
+
+
+def _init_worker(artifacts: dict):
+    global _artifacts
+    _artifacts = artifacts
+
+
+def _fit_worker(algorithm: str, params: dict) -> dict:
+    return fit_config(algorithm, params)
+
+
+
+''' Main Functions '''
+
+class ClusterSweep:
+    '''
+    Model selection sweep over KMeans / Spectral / DBSCAN / HDBSCAN / OPTICS configurations on a tendencies frame.
+
+    The standardized, PCA projected matrix, its pairwise distances (for the scores) and a kNN search (for every spectral
+    n_neighbors in the grid) are built once (build_artifacts) and shared by every fit. Fits run in a process pool. Results are cached on disk by a
+    hash of the matrix, so re-running a sweep only fits the configurations it hasn't seen.
+    '''
+
+    def __init__(self, tendencies: pd.DataFrame, side: str = 'offense', features: list[str] = None,
+                 n_components: int = PCA_N_COMPONENTS, max_neighbors: int = N_NEIGHBORS, cache: bool = True):
+
+        self.side = side
+        self.features = features if features is not None else prep_data.TENDENCY_FEATURES[side]
+        self.index = tendencies.index
+        self.cache = cache
+
+        self.matrix, self.scaler, self.pca = similarity.feature_matrix(tendencies, self.features, n_components=n_components)
+        self.artifacts = build_artifacts(self.matrix, max_neighbors)
+
+        matrix_hash = hashlib.sha1(np.ascontiguousarray(self.matrix).tobytes() + str(self.matrix.shape).encode())
+        matrix_hash.update(sklearn.__version__.encode())
+        self.key = matrix_hash.hexdigest()[:16]
+
+        self.results = self._read_results()
+
+    @property
+    def cache_path(self):
+        return data_cache.CACHE_DIR / SWEEP_CACHE_DIR / f'{self.side}_{self.key}.pkl'
+
+    def _read_results(self) -> dict:
+        if not self.cache or not self.cache_path.exists():
+            return {}
+
+        with open(self.cache_path, 'rb') as f:
+            return pickle.load(f)
+
+    def _write_results(self):
+        path = self.cache_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        tmp_path = path.with_suffix('.pkl.tmp')
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self.results, f)
+        os.replace(tmp_path, path)
+
+    def run(self, grid: dict = DEFAULT_GRID, n_jobs: int = None) -> pd.DataFrame:
+        '''
+        Fits every configuration in `grid` ({algorithm: sklearn-style param grid}) not already in the results, and returns
+        the tidy score table for the grid: one row per configuration. n_jobs=1 fits in this process; None uses every core.
+        '''
+
+        configs = expand_grid(grid)
+        new_configs = [(algorithm, params) for algorithm, params in configs if config_key(algorithm, params) not in self.results]
+
+        # One kNN search covers every spectral n_neighbors in the grid
+        max_neighbors = max([params.get('n_neighbors', N_NEIGHBORS) for algorithm, params in new_configs if algorithm == 'spectral'], default=0)
+        if max_neighbors > self.artifacts['neighbor_positions'].shape[1]:
+            self.artifacts['neighbor_positions'] = search_neighbors(self.matrix, max_neighbors)
+
+        ## Fit ##
+        if new_configs:
+            n_jobs = min(n_jobs or os.cpu_count(), len(new_configs))
+            if n_jobs == 1:
+                fitted = [fit_config(algorithm, params, self.artifacts) for algorithm, params in new_configs]
+            else:
+                with process_pool(n_jobs, initializer=_init_worker, initargs=(self.artifacts,)) as pool:
+                    fitted = list(pool.map(_fit_worker, *zip(*new_configs)))
+
+            for (algorithm, params), result in zip(new_configs, fitted):
+                self.results[config_key(algorithm, params)] = {'algorithm': algorithm, 'params': params, **result}
+
+            if self.cache:
+                self._write_results()
+
+        return self.table(configs)
+
+    def table(self, configs: list[tuple[str, dict]] = None) -> pd.DataFrame:
+        ''' Tidy scores of `configs` (all fitted configurations if None): algorithm, config, a param_ column per param (as in GridSearchCV.cv_results_), then the scores '''
+
+        keys = list(self.results) if configs is None else [config_key(algorithm, params) for algorithm, params in configs]
+
+        rows = []
+        for key in keys:
+            result = self.results[key]
+            rows.append({
+                'algorithm': result['algorithm'],
+                'config': key,
+                **{f'param_{name}': val for name, val in result['params'].items()},
+                **{col: result[col] for col in ['n_clusters', 'n_noise', 'silhouette', 'davies_bouldin', 'inertia', 'fit_secs']},
+            })
+
+        return pd.DataFrame(rows)
+
+    def labels(self, algorithm: str, **params) -> pd.Series:
+        ''' Cluster labels of a configuration (fitting it if needed), indexed like the tendencies '''
+
+        key = config_key(algorithm, params)
+        if key not in self.results:
+            self.run({algorithm: {name: [val] for name, val in params.items()}}, n_jobs=1)
+
+        return pd.Series(self.results[key]['labels'], index=self.index, name='Cluster')
@@ -0,0 +1,102 @@
+'''
+Jack Miller
+January 2026
+'''
+
+
+''' Imports '''
+
+import os
+import time
+from pathlib import Path
+
+import polars as pl
+
+import nflreadpy as nfl
+
+
+
+''' Parameters / Constants '''
+
+CACHE_DIR = Path(__file__).parent / 'data' / 'cache'
+
+# Bump whenever the enrichment / filter logic in prep_data changes, so old files are never read
+CACHE_VERSION = 3
+
+# The in-progress season gets new plays every week, so its files go stale
+CURRENT_SEASON_MAX_AGE_HOURS = 12
+
+DATA_KINDS = ['pbp', 'participation']
+
+# Additive per-game aggregates built from the enriched data, and the content hashes of the games they were built from (see partials_store)
+PARTIAL_KINDS = ['game_partials', 'player_partials', 'game_hashes']
+
+
+
+''' Helpers '''
+
+def cache_path(kind: str, season: int) -> Path:
+    if kind not in DATA_KINDS + PARTIAL_KINDS:
+        raise ValueError(f'Unknown data kind: {kind}')
+
+    return CACHE_DIR / f'v{CACHE_VERSION}' / kind / f'{kind}_{season}.parquet'
+
+
+def is_stale(kind: str, season: int) -> bool:
+    path = cache_path(kind, season)
+    if not path.exists():
+        return True
+
+    # Completed seasons never change; only the current one has a max age
+    if season < nfl.get_current_season():
+        return False
+
+    age_hours = (time.time() - path.stat().st_mtime) / 3600
+    return age_hours > CURRENT_SEASON_MAX_AGE_HOURS
+
+
+
+''' Main Functions '''
+
+def read_cached(kind: str, season: int) -> pl.DataFrame | None:
+    ''' Returns the cached frame, or None if it is missing or stale '''
+
+    if is_stale(kind, season):
+        return None
+
+    return pl.read_parquet(cache_path(kind, season))
+
+
+def write_cached(kind: str, season: int, df: pl.DataFrame) -> Path:
+    path = cache_path(kind, season)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    # Write to a temp file and swap in, so a killed run never leaves a half-written cache file
+    tmp_path = path.with_suffix('.parquet.tmp')
+    df.write_parquet(tmp_path)
+    os.replace(tmp_path, path)
+
+    return path
+
+
+def clear_cache(kind: str = None, season: int = None, old_versions_only: bool = False) -> list[Path]:
+    ''' Deletes cached files matching `kind` / `season` (all if None); returns the removed paths '''
+
+    if not CACHE_DIR.exists():
+        return []
+
+    removed = []
+    for path in CACHE_DIR.glob('v*/*/*.parquet'):
+        version_dir, kind_dir = path.parts[-3], path.parts[-2]
+
+        if old_versions_only and version_dir == f'v{CACHE_VERSION}':
+            continue
+        if kind is not None and kind_dir != kind:
+            continue
+        if season is not None and path.stem != f'{kind_dir}_{season}':
+            continue
+
+        path.unlink()
+        removed.append(path)
+
+    return removed
@@ -0,0 +1,281 @@
+'''
+Jack Miller
+January 2026
+'''
+
+
+''' Imports '''
+
+import hashlib
+import os
+import pickle
+from collections import OrderedDict
+from pathlib import Path
+
+import pandas as pd
+import numpy as np
+
+import sklearn
+from sklearn.decomposition import PCA
+from sklearn.manifold import TSNE
+from sklearn.neighbors import NearestNeighbors
+from sklearn.preprocessing import StandardScaler, Normalizer
+
+import data_cache
+import prep_data
+import similarity
+
+
+
+''' Parameters / Constants '''
+
+# Scaler choices, as in the notebooks' 'Transform and Scale' cells
+SCALERS = {
+    'standard': StandardScaler,
+    'normalizer': Normalizer,
+    None: None,
+}
+
+EMBEDDING_CACHE_DIR = 'embeddings'
+
+MAX_ENTRIES = 64
+MAX_MB = 256
+MAX_DISK_MB = 512
+
+
+
+''' Helpers '''
+
+def matrix_hash(matrix: np.ndarray) -> str:
+    matrix = np.ascontiguousarray(matrix, dtype=float)
+    return hashlib.sha1(matrix.tobytes() + str(matrix.shape).encode()).hexdigest()
+
+
+def entry_key(kind: str, input_hash: str, features: list[str], scaler: str | None, params: dict) -> str:
+    ''' Cache key of one result: what was computed, on which matrix / features / scaler, with which parameters '''
+
+    parts = [kind, input_hash, repr(list(features)), repr(scaler), repr(sorted(params.items())), sklearn.__version__]
+    return f'{kind}_{hashlib.sha1("|".join(parts).encode()).hexdigest()[:20]}'
+
+
+def entry_mb(value) -> float:
+    return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)) / 1024 ** 2
+
+
+def tsne_pca_init(matrix: np.ndarray, n_components: int, random_state: int) -> np.ndarray:
+    ''' TSNE's init='pca' starting point: PCA scores, rescaled so the first component has std 1e-4 (as in sklearn) '''
+
+    pca = PCA(n_components=n_components, random_state=np.random.RandomState(random_state))
+    init = pca.fit_transform(matrix).astype(np.float32, copy=False)
+
+    return init / np.std(init[:, 0]) * 1e-4
+
+
+def tsne_n_neighbors(perplexity: float, n_samples: int) -> int:
+    ''' Neighbors TSNE (barnes_hut) searches for a perplexity '''
+
+    return min(n_samples - 1, int(3.0 * perplexity + 1))
+
+
+
+''' Main Functions '''
+
+class EmbeddingStore:
+    '''
+    Cache of scaled matrices, PCA and t-SNE embeddings of tendency features, with their fitted transformers.
+
+    Entries are keyed by a hash of the input matrix, the feature list, the scaler ('standard', 'normalizer' or None) and
+    the model parameters, so a repeat call returns the cached coordinates and models instead of refitting. Entries are kept
+    in memory (least recently used evicted past `max_entries` / `max_mb`) and, with a cache directory, pickled to disk
+    (oldest evicted past `max_disk_mb`) so they survive a kernel restart.
+
+    t-SNE is fit from the same kNN graph and PCA initialization sklearn would compute (passed in as metric='precomputed'
+    and an init array, which gives identical embeddings), and both are cached too, so a perplexity sweep computes them once.
+    '''
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_mb: float = MAX_MB, cache_dir: str | Path | bool = True,
+                 max_disk_mb: float = MAX_DISK_MB):
+
+        self.max_entries = max_entries
+        self.max_mb = max_mb
+        self.max_disk_mb = max_disk_mb
+        self.cache_dir = data_cache.CACHE_DIR / EMBEDDING_CACHE_DIR if cache_dir is True else (Path(cache_dir) if cache_dir else None)
+
+        self.entries = OrderedDict()
+        self.sizes = {}
+        self.hits = 0
+        self.misses = 0
+
+    ## Storage ##
+
+    def _disk_path(self, key: str) -> Path:
+        return self.cache_dir / f'{key}.pkl'
+
+    def _get(self, key: str):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+
+        if self.cache_dir is not None and self._disk_path(key).exists():
+            path = self._disk_path(key)
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+            os.utime(path)
+
+            self._remember(key, value)
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        return None
+
+    def _remember(self, key: str, value):
+        self.entries[key] = value
+        self.sizes[key] = entry_mb(value)
+
+        # Least recently used first
+        while len(self.entries) > 1 and (len(self.entries) > self.max_entries or sum(self.sizes.values()) > self.max_mb):
+            evicted, _ = self.entries.popitem(last=False)
+            del self.sizes[evicted]
+
+    def _put(self, key: str, value):
+        self._remember(key, value)
+
+        if self.cache_dir is None:
+            return
+
+        path = self._disk_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        tmp_path = path.with_suffix('.pkl.tmp')
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+        # Oldest (least recently read / written) files first
+        files = sorted(self.cache_dir.glob('*.pkl'), key=lambda file: file.stat().st_mtime)
+        disk_mb = sum(file.stat().st_size for file in files) / 1024 ** 2
+        for file in files[:-1]:
+            if disk_mb <= self.max_disk_mb:
+                break
+            disk_mb -= file.stat().st_size / 1024 ** 2
+            file.unlink()
+
+    def clear(self, disk: bool = False):
+        ''' Empties the in-memory entries (and the files with `disk`) '''
+
+        self.entries.clear()
+        self.sizes.clear()
+
+        if disk and self.cache_dir is not None and self.cache_dir.exists():
+            for file in self.cache_dir.glob('*.pkl'):
+                file.unlink()
+
+    ## Embeddings ##
+
+    def _input(self, tendencies: pd.DataFrame, features: list[str] | None) -> tuple[list[str], np.ndarray, str]:
+        features = features if features is not None else prep_data.TENDENCY_FEATURES['offense']
+        matrix = similarity.feature_matrix(tendencies, features, standardize=False)[0]
+
+        return features, matrix, matrix_hash(matrix)
+
+    def scaled(self, tendencies: pd.DataFrame, features: list[str] = None, scaler: str = 'standard') -> tuple[pd.DataFrame, object]:
+        ''' Scaled features (missing values filled with the feature mean) and the fitted scaler '''
+
+        features, matrix, input_hash = self._input(tendencies, features)
+        key = entry_key('scaled', input_hash, features, scaler, {})
+
+        cached = self._get(key)
+        if cached is None:
+            model = SCALERS[scaler]() if scaler is not None else None
+            scaled = model.fit_transform(matrix) if model is not None else matrix
+            cached = (pd.DataFrame(scaled, index=tendencies.index, columns=features), model)
+            self._put(key, cached)
+
+        return cached
+
+    def pca(self, tendencies: pd.DataFrame, features: list[str] = None, scaler: str = 'standard', n_components: int = None,
+            random_state: int = 42) -> tuple[pd.DataFrame, PCA]:
+        ''' PCA scores ('Component 1', ...) of the scaled features, and the fitted PCA '''
+
+        features, matrix, input_hash = self._input(tendencies, features)
+        params = dict(n_components=n_components, random_state=random_state)
+        key = entry_key('pca', input_hash, features, scaler, params)
+
+        cached = self._get(key)
+        if cached is None:
+            scaled, _ = self.scaled(tendencies, features, scaler=scaler)
+            model = PCA(**params)
+            scores = model.fit_transform(scaled.to_numpy())
+
+            columns = [f'Component {n}' for n in range(1, scores.shape[1] + 1)]
+            cached = (pd.DataFrame(scores, index=tendencies.index, columns=columns), model)
+            self._put(key, cached)
+
+        return cached
+
+    def _tsne_input(self, tendencies: pd.DataFrame, features: list[str], scaler: str, pca_components: int | None) -> pd.DataFrame:
+        if pca_components is not None:
+            return self.pca(tendencies, features, scaler=scaler, n_components=pca_components)[0]
+
+        return self.scaled(tendencies, features, scaler=scaler)[0]
+
+    def _tsne_neighbors(self, tsne_input: np.ndarray, n_neighbors: int):
+        ''' kNN distance graph (self included, which TSNE drops) with at least `n_neighbors`; one search serves every smaller perplexity '''
+
+        key = entry_key('tsne_neighbors', matrix_hash(tsne_input), [], None, {})
+
+        graph = self._get(key)
+        if graph is None or graph.getnnz(axis=1).min() < n_neighbors + 1:
+            graph = NearestNeighbors(n_neighbors=n_neighbors + 1).fit(tsne_input).kneighbors_graph(tsne_input, mode='distance')
+            self._put(key, graph)
+
+        return graph
+
+    def tsne(self, tendencies: pd.DataFrame, features: list[str] = None, scaler: str = 'standard', n_components: int = 3,
+             perplexity: float = 30.0, random_state: int = 42, pca_components: int = None, max_perplexity: float = None) -> tuple[pd.DataFrame, TSNE]:
+        '''
+        t-SNE coordinates ('TSNE Component 1', ...) of the scaled features (or of their first `pca_components` PCA scores),
+        and the fitted TSNE. Same result as TSNE(n_components, perplexity, random_state).fit_transform on that input.
+
+        `max_perplexity` sizes the shared neighbor search for a sweep, so it runs once.
+        '''
+
+        features, _, input_hash = self._input(tendencies, features)
+        params = dict(n_components=n_components, perplexity=perplexity, random_state=random_state, pca_components=pca_components)
+        key = entry_key('tsne', input_hash, features, scaler, params)
+
+        cached = self._get(key)
+        if cached is None:
+            tsne_input = self._tsne_input(tendencies, features, scaler, pca_components).to_numpy()
+            n_samples = len(tsne_input)
+
+            init_key = entry_key('tsne_init', matrix_hash(tsne_input), [], None, dict(n_components=n_components, random_state=random_state))
+            init = self._get(init_key)
+            if init is None:
+                init = tsne_pca_init(tsne_input, n_components, random_state)
+                self._put(init_key, init)
+
+            graph = self._tsne_neighbors(tsne_input, tsne_n_neighbors(max(perplexity, max_perplexity or 0), n_samples))
+
+            model = TSNE(n_components=n_components, perplexity=perplexity, random_state=random_state, metric='precomputed', init=init)
+            coordinates = model.fit_transform(graph)
+
+            columns = [f'TSNE Component {n}' for n in range(1, n_components + 1)]
+            cached = (pd.DataFrame(coordinates, index=tendencies.index, columns=columns), model)
+            self._put(key, cached)
+
+        return cached
+
+    def tsne_sweep(self, tendencies: pd.DataFrame, perplexities: list[float], features: list[str] = None, scaler: str = 'standard',
+                   n_components: int = 3, random_state: int = 42, pca_components: int = None) -> pd.DataFrame:
+        ''' KL divergence by perplexity (the notebooks' perplexity charts); every embedding is cached for a later tsne() call '''
+
+        divergences = []
+        for perplexity in perplexities:
+            _, model = self.tsne(tendencies, features, scaler=scaler, n_components=n_components, perplexity=perplexity,
+                                 random_state=random_state, pca_components=pca_components, max_perplexity=max(perplexities))
+            divergences.append({'perplexity': perplexity, 'kl_divergence': model.kl_divergence_})
+
+        return pd.DataFrame(divergences)
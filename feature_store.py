@@ -0,0 +1,332 @@
+'''
+Jack Miller
+January 2026
+'''
+
+
+''' Imports '''
+
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+import polars as pl
+
+import sklearn
+
+import cluster_model
+import cluster_sweep
+import data_cache
+import instrument
+import prep_data
+import similarity
+
+
+
+''' Parameters / Constants '''
+
+STORE_DIR = Path(__file__).parent / 'data' / 'features'
+
+# Bump when the store layout changes; a new version is built from scratch next to the old one
+STORE_VERSION = 1
+
+SIDES = ['offense', 'defense']
+
+# Code the stored values depend on, as whole modules so nothing can be left out; a change to any of it marks every
+# partition stale (tendencies) or refits the models
+FEATURE_MODULES = [prep_data]
+MODEL_MODULES = [cluster_model, cluster_sweep, similarity]
+
+
+
+''' Helpers '''
+
+def logic_hash(modules: list, constants: list = ()) -> str:
+    ''' Hash of the source code of `modules` and the reprs of `constants` '''
+
+    digest = hashlib.sha1()
+    for module in modules:
+        digest.update(inspect.getsource(module).encode())
+    for constant in constants:
+        digest.update(repr(constant).encode())
+
+    return digest.hexdigest()[:16]
+
+
+def feature_hash() -> str:
+    return logic_hash(FEATURE_MODULES, [data_cache.CACHE_VERSION])
+
+
+def model_hash() -> str:
+    return logic_hash(MODEL_MODULES, [sklearn.__version__])
+
+
+def input_version(season: int, load: bool = True) -> str | None:
+    '''
+    Version of a season's input data: a hash of the contents of its cached enriched pbp / participation files, which
+    change whenever the season is re-downloaded (e.g. the in-progress season, weekly). Loads the season into the cache
+    first if it is missing or stale (or, without `load`, returns None).
+    '''
+
+    kinds = ['pbp'] + (['participation'] if season >= prep_data.PARTICIPATION_START_YEAR else [])
+
+    digest = hashlib.sha1(f'v{data_cache.CACHE_VERSION}'.encode())
+    for kind in kinds:
+        if data_cache.is_stale(kind, season):
+            if not load:
+                return None
+            prep_data.load_season(kind, season, refresh=True)
+
+        with open(data_cache.cache_path(kind, season), 'rb') as f:
+            digest.update(kind.encode() + hashlib.file_digest(f, 'sha1').digest())
+
+    return digest.hexdigest()[:16]
+
+
+def _write_parquet(df: pl.DataFrame, path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    tmp_path = path.with_suffix('.parquet.tmp')
+    df.write_parquet(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _table(side: str, kind: str) -> str:
+    return f'{side}_{kind}'
+
+
+
+''' Main Functions '''
+
+class FeatureStore:
+    '''
+    Materialized team tendencies, PCA components and cluster labels, as Parquet files partitioned by season.
+
+    build() computes only the seasons whose partitions are stale - missing, built from an older version of the input
+    data (a hash of the season's cached files), or by different feature logic (a hash of prep_data's source) - and refits the cluster
+    model (cluster_model.ClusterModel, saved next to the tables) whenever any of its seasons or logic changed.
+    A manifest records the versions and hashes each partition was built from.
+
+    Reads memory-map the Parquet files, so loading the tables takes milliseconds instead of rebuilding them.
+
+        v1/manifest.json
+        v1/offense_tendencies/season=2024.parquet
+        v1/offense_components/season=2024.parquet
+        v1/offense_clusters/season=2024.parquet
+        v1/models/offense_cluster_model.npz
+    '''
+
+    def __init__(self, root: str | Path = STORE_DIR):
+        self.root = Path(root) / f'v{STORE_VERSION}'
+
+    ## Manifest ##
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.root / 'manifest.json'
+
+    def read_manifest(self) -> dict:
+        if not self.manifest_path.exists():
+            return {'store_version': STORE_VERSION, 'builds': 0, 'partitions': {}, 'models': {}}
+
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    def _write_manifest(self, manifest: dict):
+        self.root.mkdir(parents=True, exist_ok=True)
+
+        tmp_path = self.manifest_path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def partition_path(self, table: str, season: int) -> Path:
+        return self.root / table / f'season={season}.parquet'
+
+    def model_path(self, side: str) -> Path:
+        return self.root / 'models' / f'{side}_cluster_model.npz'
+
+    def stale_seasons(self, seasons: list[int], sides: list[str] = SIDES, inputs: dict = None) -> list[int]:
+        '''
+        Seasons whose tendency partitions are missing or were built from other input data / feature logic. Seasons not
+        in the data cache count as stale rather than being downloaded to check.
+        '''
+
+        manifest = self.read_manifest()
+        inputs = inputs if inputs is not None else {season: input_version(season, load=False) for season in seasons}
+        current_hash = feature_hash()
+
+        stale = []
+        for season in seasons:
+            for side in sides:
+                entry = manifest['partitions'].get(_table(side, 'tendencies'), {}).get(str(season))
+                if (entry is None or inputs[season] is None or entry['input_version'] != inputs[season] or entry['feature_hash'] != current_hash
+                        or not self.partition_path(_table(side, 'tendencies'), season).exists()):
+                    stale.append(season)
+                    break
+
+        return stale
+
+    ## Build ##
+
+    def _write_season_partitions(self, manifest: dict, table: str, df: pd.DataFrame, seasons: list[int], **entry):
+        frame = pl.from_pandas(df.reset_index())
+        for season in seasons:
+            partition = frame.filter(pl.col('season') == season)
+            _write_parquet(partition, self.partition_path(table, season))
+            manifest['partitions'].setdefault(table, {})[str(season)] = {'rows': len(partition), **entry}
+
+    def build(self, seasons: list[int] = prep_data.SEASONS, sides: list[str] = SIDES, refresh: bool = False,
+              max_memory_mb: int = None) -> dict:
+        '''
+        Brings the store up to date for `seasons`: rebuilds stale tendency partitions (every one with `refresh`), then
+        refits each side's cluster model on all of `seasons` if anything it depends on changed, and rewrites its
+        components / clusters tables. Returns what was rebuilt.
+        '''
+
+        seasons = sorted(seasons)
+        manifest = self.read_manifest()
+        built_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+
+        with instrument.stage('input_versions', seasons=seasons):
+            inputs = {season: input_version(season) for season in seasons}
+
+        ## Tendencies - per season ##
+        stale = seasons if refresh else self.stale_seasons(seasons, sides, inputs=inputs)
+        if stale:
+            current_hash = feature_hash()
+            tendencies = prep_data.build_team_tendencies(seasons=stale, sides=tuple(sides), max_memory_mb=max_memory_mb)
+
+            with instrument.stage('write_tendencies', seasons=stale):
+                for side, side_tendencies in tendencies.items():
+                    for season in stale:
+                        self._write_season_partitions(manifest, _table(side, 'tendencies'), side_tendencies, [season],
+                                                      input_version=inputs[season], feature_hash=current_hash, built_at=built_at)
+
+            # Recorded before fitting, so the fit reads them back (memory-mapped) and a failed fit keeps them
+            self._write_manifest(manifest)
+
+        ## Components / clusters - fit across all seasons ##
+        model_key = hashlib.sha1(json.dumps([feature_hash(), model_hash(), inputs], sort_keys=True).encode()).hexdigest()[:16]
+
+        refit = []
+        for side in sides:
+            entry = manifest['models'].get(side)
+            if not refresh and entry is not None and entry['key'] == model_key and self.model_path(side).exists():
+                continue
+
+            side_tendencies = self.tendencies(side, seasons)
+            with instrument.stage('fit_cluster_model', side_tendencies, side=side) as s:
+                model = s.output(cluster_model.ClusterModel(side_tendencies, side=side))
+                model.save(self.model_path(side))
+
+            components = pd.DataFrame(model.matrix, index=side_tendencies.index,
+                                      columns=[f'Component {n}' for n in range(1, model.matrix.shape[1] + 1)])
+            clusters = pd.Series(model.labels, index=side_tendencies.index, name='Cluster').to_frame()
+
+            # The whole range is refit, so partitions of seasons outside it would be from another fit
+            with instrument.stage('write_models', side=side):
+                for table, df in [(_table(side, 'components'), components), (_table(side, 'clusters'), clusters)]:
+                    shutil.rmtree(self.root / table, ignore_errors=True)
+                    manifest['partitions'][table] = {}
+                    self._write_season_partitions(manifest, table, df, seasons, model_key=model_key, built_at=built_at)
+
+            manifest['models'][side] = {'key': model_key, 'seasons': seasons, 'feature_hash': feature_hash(), 'model_hash': model_hash(),
+                                        'path': str(self.model_path(side).relative_to(self.root)), 'built_at': built_at}
+            refit.append(side)
+
+        manifest['builds'] += 1
+        manifest['inputs'] = {**manifest.get('inputs', {}), **{str(season): version for season, version in inputs.items()}}
+        self._write_manifest(manifest)
+
+        return {'rebuilt_seasons': stale, 'refit': refit}
+
+    ## Load ##
+
+    def load(self, table: str, seasons: list[int] = None, columns: list[str] = None) -> pl.DataFrame:
+        ''' A table's partitions for `seasons` (all built if None), memory-mapped '''
+
+        built = self.read_manifest()['partitions'].get(table, {})
+        seasons = sorted(int(season) for season in built) if seasons is None else seasons
+
+        missing = [season for season in seasons if str(season) not in built]
+        if missing:
+            raise KeyError(f'{table} has no partitions for seasons {missing}; run build() first')
+
+        return pl.read_parquet([self.partition_path(table, season) for season in seasons], columns=columns, memory_map=True,
+                               hive_partitioning=False)
+
+    def tendencies(self, side: str = 'offense', seasons: list[int] = None) -> pd.DataFrame:
+        ''' Tendencies as build_team_tendencies returns them: pandas, indexed by (team, season) '''
+
+        return prep_data._to_pandas_tendencies(self.load(_table(side, 'tendencies'), seasons), prep_data.TENDENCY_KEYS[side])
+
+    def components(self, side: str = 'offense', seasons: list[int] = None) -> pd.DataFrame:
+        ''' PCA components ('Component 1', ...) of the tendencies, indexed by (team, season) '''
+
+        return prep_data._to_pandas_tendencies(self.load(_table(side, 'components'), seasons), prep_data.TENDENCY_KEYS[side])
+
+    def clusters(self, side: str = 'offense', seasons: list[int] = None) -> pd.Series:
+        ''' Cluster labels, indexed by (team, season) '''
+
+        return prep_data._to_pandas_tendencies(self.load(_table(side, 'clusters'), seasons), prep_data.TENDENCY_KEYS[side])['Cluster']
+
+    def model(self, side: str = 'offense') -> cluster_model.ClusterModel:
+        return cluster_model.ClusterModel.load(self.model_path(side))
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Build / inspect the materialized team tendency feature store')
+    parser.add_argument('--root', type=Path, default=STORE_DIR)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build', help='build or refresh the store for a season range')
+    build.add_argument('--start', type=int, default=prep_data.START_YEAR)
+    build.add_argument('--end', type=int, default=prep_data.END_YEAR)
+    build.add_argument('--sides', nargs='+', choices=SIDES, default=SIDES)
+    build.add_argument('--refresh', action='store_true', help='rebuild every partition')
+    build.add_argument('--max-memory-mb', type=int, default=None)
+    build.add_argument('--profile', type=Path, nargs='?', const=True, default=None,
+                       help='print a stage profile (and write its JSON report to the given path)')
+
+    status = commands.add_parser('status', help='list built partitions and stale seasons')
+    status.add_argument('--start', type=int, default=prep_data.START_YEAR)
+    status.add_argument('--end', type=int, default=prep_data.END_YEAR)
+    status.add_argument('--sides', nargs='+', choices=SIDES, default=SIDES)
+
+    args = parser.parse_args(argv)
+    store = FeatureStore(args.root)
+    seasons = prep_data.season_range(args.start, args.end)
+
+    if args.command == 'build':
+        if args.profile is None:
+            result = store.build(seasons, sides=args.sides, refresh=args.refresh, max_memory_mb=args.max_memory_mb)
+        else:
+            with instrument.profile() as profiler:
+                result = store.build(seasons, sides=args.sides, refresh=args.refresh, max_memory_mb=args.max_memory_mb)
+            print(profiler.flame())
+            if args.profile is not True:
+                profiler.to_json(args.profile)
+
+        print(f'Rebuilt seasons: {result["rebuilt_seasons"] or "none"}; refit: {result["refit"] or "none"}')
+        print(f'Store: {store.root}')
+
+    elif args.command == 'status':
+        manifest = store.read_manifest()
+        for table, partitions in sorted(manifest['partitions'].items()):
+            print(f'{table}: {len(partitions)} seasons ({min(partitions, default="-")} - {max(partitions, default="-")})')
+        print(f'Stale seasons: {store.stale_seasons(seasons, sides=args.sides) or "none"}')
+
+    return 0
+
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,309 @@
+'''
+Jack Miller
+January 2026
+'''
+
+
+''' Imports '''
+
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+import polars as pl
+
+
+
+''' Parameters / Constants '''
+
+# RSS sampling interval while profiling (seconds)
+SAMPLE_SECS = 0.005
+
+FLAME_WIDTH = 40
+
+# The profiler of the run in progress; None (the default) makes every stage a no-op
+_profiler = None
+
+
+
+''' Helpers '''
+
+def rss_mb() -> float:
+    ''' Current resident set size (Linux) '''
+
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+
+
+def frame_shape(value) -> tuple[int | None, int | None]:
+    '''
+    (rows, cols) of a stage's input / output: polars / pandas frames and NumPy arrays; lazy frames have no row count
+    until collected; tuples use their first item, and dicts of frames sum their rows.
+    '''
+
+    if isinstance(value, pl.LazyFrame):
+        return None, len(value.collect_schema())
+    if isinstance(value, (pl.DataFrame, pd.DataFrame)):
+        return value.shape
+    if hasattr(value, 'shape') and len(value.shape) == 2:
+        return tuple(value.shape)
+    if isinstance(value, tuple) and value:
+        return frame_shape(value[0])
+    if isinstance(value, dict) and value:
+        shapes = [frame_shape(item) for item in value.values()]
+        if all(rows is not None for rows, _ in shapes):
+            return sum(rows for rows, _ in shapes), None
+
+    return None, None
+
+
+class _NullStage:
+    ''' What stage() returns when profiling is off: nothing is measured '''
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def output(self, value):
+        return value
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    def __init__(self, profiler: 'StageProfiler', name: str, value_in, meta: dict):
+        self.profiler = profiler
+        self.record = {'name': name, **meta}
+        self.value_in = value_in
+        self.value_out = None
+
+    def __enter__(self):
+        self.record['rows_in'], self.record['cols_in'] = frame_shape(self.value_in)
+        self.value_in = None
+
+        self.profiler._open(self.record)
+        self.cpu_start = time.process_time()
+        self.wall_start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        wall_secs = time.perf_counter() - self.wall_start
+        cpu_secs = time.process_time() - self.cpu_start
+
+        self.record['rows_out'], self.record['cols_out'] = frame_shape(self.value_out)
+        self.value_out = None
+
+        self.profiler._close(self.record, wall_secs, cpu_secs)
+        return False
+
+    def output(self, value):
+        ''' Records `value` as the stage's output (for its row / column counts) and returns it '''
+
+        self.value_out = value
+        return value
+
+
+
+''' Main Functions '''
+
+class StageProfiler:
+    '''
+    Records each stage run while it is active: wall time, CPU time (process-wide, so Polars' worker threads count),
+    peak RSS growth over the RSS at the start of the stage, and rows / columns in and out.
+
+    Stages nest; each record keeps its path (e.g. 'build_team_tendencies;collect_partials;load_season'), which
+    the flame summary and folded stacks are built from. RSS is sampled from a background thread while profiling, since
+    most of the memory is allocated by Polars / Arrow outside of Python's allocator.
+    '''
+
+    def __init__(self, sample_secs: float = SAMPLE_SECS):
+        self.sample_secs = sample_secs
+        self.records = []
+        self._stack = []
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._sampler = None
+
+    ## Recording ##
+
+    def _sample(self):
+        while not self._done.wait(self.sample_secs):
+            rss = rss_mb()
+            with self._lock:
+                for record in self._stack:
+                    record['_peak_rss'] = max(record['_peak_rss'], rss)
+
+    def start(self):
+        self._done.clear()
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self._done.set()
+        if self._sampler is not None:
+            self._sampler.join()
+            self._sampler = None
+
+    def _open(self, record: dict):
+        rss = rss_mb()
+        with self._lock:
+            record['path'] = ';'.join([parent['name'] for parent in self._stack] + [record['name']])
+            record['depth'] = len(self._stack)
+            record['_start_rss'] = record['_peak_rss'] = rss
+            self.records.append(record)
+            self._stack.append(record)
+
+    def _close(self, record: dict, wall_secs: float, cpu_secs: float):
+        rss = rss_mb()
+        with self._lock:
+            self._stack.remove(record)
+
+        record['wall_secs'] = wall_secs
+        record['cpu_secs'] = cpu_secs
+        record['peak_rss_mb'] = max(record.pop('_peak_rss'), rss) - record.pop('_start_rss')
+
+    ## Reports ##
+
+    def report(self) -> dict:
+        '''
+        Every stage run in order, plus totals per stage path: {'stages': [...], 'totals': {path: {...}}}.
+        Totals are in tree order (each path right after its parent, siblings in the order they first ran).
+        '''
+
+        first_run = {}
+        for position, record in enumerate(self.records):
+            first_run.setdefault(record['path'], position)
+
+        def tree_order(record: dict) -> tuple:
+            parts = record['path'].split(';')
+            return tuple(first_run[';'.join(parts[:depth + 1])] for depth in range(len(parts)))
+
+        totals = {}
+        for record in sorted(self.records, key=tree_order):
+            if 'wall_secs' not in record:
+                continue
+
+            total = totals.setdefault(record['path'], {'calls': 0, 'wall_secs': 0.0, 'cpu_secs': 0.0, 'peak_rss_mb': 0.0})
+            total['calls'] += 1
+            total['wall_secs'] += record['wall_secs']
+            total['cpu_secs'] += record['cpu_secs']
+            total['peak_rss_mb'] = max(total['peak_rss_mb'], record['peak_rss_mb'])
+
+        return {'stages': [record for record in self.records if 'wall_secs' in record], 'totals': totals}
+
+    def to_json(self, path: str | Path = None) -> str:
+        ''' The report as JSON (also written to `path` if given) '''
+
+        report = json.dumps(self.report(), indent=2, default=str)
+        if path is not None:
+            Path(path).write_text(report)
+
+        return report
+
+    def folded(self) -> str:
+        ''' Folded stacks ("a;b;c self_ms" per line) for flamegraph.pl / speedscope '''
+
+        totals = self.report()['totals']
+
+        lines = []
+        for path, total in totals.items():
+            children = sum(child['wall_secs'] for child_path, child in totals.items()
+                           if child_path.startswith(path + ';') and child_path.count(';') == path.count(';') + 1)
+            lines.append(f'{path} {max(round((total["wall_secs"] - children) * 1000), 0)}')
+
+        return '\n'.join(lines)
+
+    def flame(self, width: int = FLAME_WIDTH) -> str:
+        ''' Indented tree of stage paths with their share of the total time as a bar (a text flame graph, top down) '''
+
+        totals = self.report()['totals']
+        total_secs = sum(total['wall_secs'] for path, total in totals.items() if ';' not in path) or 1.0
+        name_width = max([path.count(';') * 2 + len(path.rsplit(';', 1)[-1]) for path in totals], default=0) + 2
+
+        lines = []
+        for path, total in totals.items():
+            depth = path.count(';')
+            label = '  ' * depth + path.rsplit(';', 1)[-1]
+            share = total['wall_secs'] / total_secs
+            calls = f' x{total["calls"]}' if total['calls'] > 1 else ''
+            lines.append(f'{label:<{name_width}} {total["wall_secs"]:>8.3f}s {share:>6.1%} {"#" * round(share * width):<{width}} '
+                         f'cpu {total["cpu_secs"]:.3f}s  rss +{total["peak_rss_mb"]:.1f} MB{calls}')
+
+        return '\n'.join(lines)
+
+    def print_report(self):
+        for record in self.report()['stages']:
+            rows_in = f'{record["rows_in"]:,}' if record['rows_in'] is not None else '-'
+            rows_out = f'{record["rows_out"]:,}' if record['rows_out'] is not None else '-'
+            print(f'{"  " * record["depth"]}{record["name"]}: {record["wall_secs"]:.3f}s (cpu {record["cpu_secs"]:.3f}s), '
+                  f'rss +{record["peak_rss_mb"]:.1f} MB, rows {rows_in} -> {rows_out}, cols {record["cols_in"] or "-"} -> {record["cols_out"] or "-"}')
+
+
+@contextmanager
+def profile(sample_secs: float = SAMPLE_SECS):
+    '''
+    Turns stage instrumentation on for the block:
+
+        with instrument.profile() as profiler:
+            prep_data.build_team_tendencies(seasons)
+        print(profiler.flame())
+    '''
+
+    global _profiler
+
+    previous = _profiler
+    profiler = StageProfiler(sample_secs=sample_secs)
+    _profiler = profiler
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        _profiler = previous
+
+
+def enabled() -> bool:
+    return _profiler is not None
+
+
+def stage(name: str, value_in=None, **meta):
+    '''
+    A named stage, measured only while profiling:
+
+        with instrument.stage('join', pbp) as s:
+            plays = s.output(pbp.join(...))
+
+    `value_in` / s.output(...) give the row / column counts; `meta` is copied into the record.
+    '''
+
+    if _profiler is None:
+        return _NULL_STAGE
+
+    return _Stage(_profiler, name, value_in, meta)
+
+
+def staged(name: str = None):
+    ''' Decorator: the function is a stage (its first argument is the input, its return value the output) '''
+
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _profiler is None:
+                return func(*args, **kwargs)
+
+            with _Stage(_profiler, stage_name, args[0] if args else None, {}) as s:
+                return s.output(func(*args, **kwargs))
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,149 @@
+'''
+Jack Miller
+January 2026
+'''
+
+
+''' Imports '''
+
+import pandas as pd
+import polars as pl
+import polars.selectors as cs
+
+import data_cache
+import prep_data
+
+
+
+''' Parameters / Constants '''
+
+# Sort order of the stored files; kind -> keys
+PARTIAL_SORT_KEYS = {
+    'game_partials': prep_data.PARTIAL_KEYS,
+    'player_partials': prep_data.PLAYER_PARTIAL_KEYS,
+}
+
+
+
+''' Helpers '''
+
+def _read_season(kind: str, season: int) -> pl.DataFrame | None:
+    path = data_cache.cache_path(kind, season)
+    if not path.exists():
+        return None
+
+    return pl.read_parquet(path)
+
+
+def plays_changed(season: int) -> bool:
+    ''' Whether a cached play file of `season` was (re)written since the store last ingested it '''
+
+    hashes_path = data_cache.cache_path('game_hashes', season)
+    if not hashes_path.exists():
+        return True
+
+    ingested = hashes_path.stat().st_mtime
+    paths = [data_cache.cache_path(kind, season) for kind in data_cache.DATA_KINDS]
+
+    return any(path.exists() and path.stat().st_mtime >= ingested for path in paths)
+
+
+def game_hashes_query(plays: pl.LazyFrame) -> pl.LazyFrame:
+    '''
+    One content hash per game over the play columns the partials read, so a game nflverse corrects gets a new hash.
+
+    Labels are hashed as strings (categorical codes depend on the session) and row hashes are summed, which doesn't
+    depend on play order. Polars' hash can change between versions; after an upgrade every game looks changed once.
+    '''
+
+    plays = plays.with_columns((cs.categorical() | cs.enum()).cast(pl.String))
+
+    return plays.group_by('game_id').agg(game_hash=pl.struct(pl.all()).hash(seed=0).sum())
+
+
+
+''' Main Functions '''
+
+def scan_partials(kind: str, seasons: list[int] = prep_data.SEASONS) -> pl.LazyFrame:
+    ''' Stored partials for `seasons`; seasons not in the store yet are skipped '''
+
+    paths = [data_cache.cache_path(kind, season) for season in seasons]
+    paths = [path for path in paths if path.exists()]
+    if not paths:
+        raise FileNotFoundError(f'No stored {kind} for seasons {seasons}; run refresh_partials first')
+
+    return pl.scan_parquet(paths)
+
+
+def ingest_season(season: int, refresh: bool = False, rebuild: bool = False) -> int:
+    '''
+    Brings the store up to date with the cached plays of `season`; returns the number of games (re)ingested.
+
+    The store keeps a content hash per game (game_hashes_query). When the season's play files have been rewritten since
+    the last ingest (a refresh, or the in-progress season going stale) the plays are hashed, and only games that are new
+    or whose hash changed - e.g. nflverse corrected a play - are aggregated, replacing their stored partials. Games no
+    longer in the data are dropped. Otherwise nothing is read. Pass `rebuild` to recompute the whole season.
+    '''
+
+    plays = prep_data.scan_plays(seasons=[season], columns=prep_data.PLAY_COLUMNS['tendencies'], refresh=refresh)
+    if not rebuild and not plays_changed(season):
+        return 0
+
+    hashes = game_hashes_query(plays).collect()
+    stored_hashes = None if rebuild else _read_season('game_hashes', season)
+    if stored_hashes is None:
+        changed = hashes
+    else:
+        changed = hashes.join(stored_hashes, on=['game_id', 'game_hash'], how='anti')
+
+    if stored_hashes is None or changed.height > 0 or stored_hashes.height != hashes.height:
+        # Only the new / changed games' plays are aggregated; the game_id filter is pushed into the cached scans
+        changed_plays = plays.filter(pl.col('game_id').is_in(changed['game_id'].to_list()))
+        new_partials = dict(zip(PARTIAL_SORT_KEYS, pl.collect_all([
+            prep_data.game_partials_query(changed_plays),
+            prep_data.player_partials_query(changed_plays),
+        ])))
+
+        unchanged_game_ids = hashes.join(changed, on='game_id', how='anti')['game_id'].to_list()
+        for kind, partials in new_partials.items():
+            path = data_cache.cache_path(kind, season)
+            if stored_hashes is not None and path.exists():
+                stored = pl.scan_parquet(path).filter(pl.col('game_id').is_in(unchanged_game_ids)).collect()
+                partials = pl.concat([stored, partials], how='vertical_relaxed')
+
+            data_cache.write_cached(kind, season, partials.sort(PARTIAL_SORT_KEYS[kind]))
+
+    # Written last (and even with nothing changed), so its mtime marks the plays it has seen
+    data_cache.write_cached('game_hashes', season, hashes.sort('game_id'))
+
+    return changed.height
+
+
+def refresh_partials(seasons: list[int] = prep_data.SEASONS, refresh: bool | list[int] = False, rebuild: bool = False) -> dict[int, int]:
+    ''' Brings the store up to date for `seasons`; returns {season: games (re)ingested} '''
+
+    new_games = {}
+    for season in seasons:
+        season_refresh = refresh if isinstance(refresh, bool) else season in refresh
+        new_games[season] = ingest_season(season, refresh=season_refresh, rebuild=rebuild)
+
+    return new_games
+
+
+def load_team_tendencies(seasons: list[int] = prep_data.SEASONS, sides: tuple[str] = ('offense', 'defense')) -> dict[str, pd.DataFrame]:
+    ''' Team tendencies re-derived from the stored partials (no play data is read) '''
+
+    return prep_data.tendencies_from_partials(
+        scan_partials('game_partials', seasons),
+        scan_partials('player_partials', seasons),
+        sides=sides,
+    )
+
+
+def update_team_tendencies(seasons: list[int] = prep_data.SEASONS, refresh: bool | list[int] = False,
+                           sides: tuple[str] = ('offense', 'defense')) -> dict[str, pd.DataFrame]:
+    ''' Weekly refresh: merge new and corrected games into the store, then re-derive the tendencies '''
+
+    refresh_partials(seasons=seasons, refresh=refresh)
+
+    return load_team_tendencies(seasons=seasons, sides=sides)
@@ -0,0 +1,68 @@
+'''
+Jack Miller
+January 2026
+'''
+
+
+''' Imports '''
+
+import pandas as pd
+import numpy as np
+
+
+
+''' Main Functions '''
+
+class PercentileTable:
+    '''
+    Percentile scores of values against the team seasons in a tendencies frame, matching
+    scipy.stats.percentileofscore(tendencies[feature], value, kind='weak') / 100.
+
+    Each feature's values are sorted once, so a lookup is a binary search (count of values <= the score)
+    instead of a list conversion and a scan. Like scipy, a feature with any missing values scores NaN.
+    '''
+
+    def __init__(self, tendencies: pd.DataFrame, features: list[str] = None):
+
+        self.features = features if features is not None else tendencies.select_dtypes('number').columns.tolist()
+        self.index = tendencies.index
+        self.values = tendencies[self.features].to_numpy(dtype=float)
+
+        self.sorted_values = np.sort(self.values, axis=0)
+        self.has_missing = np.isnan(self.values).any(axis=0)
+        self.n = len(self.values)
+
+        self._matrix = None
+
+    def _feature_scores(self, position: int, values: np.ndarray) -> np.ndarray:
+        if self.has_missing[position]:
+            return np.full(values.shape, np.nan)
+
+        scores = np.searchsorted(self.sorted_values[:, position], values, side='right') / self.n
+        return np.where(np.isnan(values), np.nan, scores)
+
+    def score(self, feature: str, values: float | np.ndarray) -> float | np.ndarray:
+        ''' Percentile score(s) of `values` for one feature '''
+
+        scores = self._feature_scores(self.features.index(feature), np.asarray(values, dtype=float))
+        return scores if scores.ndim else float(scores)
+
+    def scores(self, features: list[str], feature_vals: list[float]) -> list[float]:
+        ''' Percentile score of each value against its feature - drop-in for the notebooks' get_team_pct_scores / get_feature_pct_scores '''
+
+        return [self.score(feature, val) for feature, val in zip(features, feature_vals)]
+
+    def team_scores(self, team: str, season: int, features: list[str] = None, week: int = None) -> list[float]:
+        ''' A team season's percentile scores, read from the precomputed matrix. Pass `week` on windowed tendencies '''
+
+        features = features if features is not None else self.features
+        return self.matrix().loc[(team, season) if week is None else (team, season, week), features].tolist()
+
+    def matrix(self) -> pd.DataFrame:
+        ''' Percentile score of every team season for every feature (same index / columns as the tendencies), computed once '''
+
+        if self._matrix is None:
+            scores = np.column_stack([self._feature_scores(i, self.values[:, i]) for i in range(len(self.features))])
+            self._matrix = pd.DataFrame(scores, index=self.index, columns=self.features)
+
+        return self._matrix
@@ -8,13 +8,16 @@ January 2026
 
 import pandas as pd
 import polars as pl
-import numpy as np
+import polars.selectors as cs
 
 import plotly.express as px
 
 import nflreadpy as nfl
 import nfl_data_py as nfldy
 
+import data_cache
+import instrument
+
 pl.Config.set_tbl_width_chars(-1)
 pl.Config.set_tbl_cols(-1)
 pl.Config.set_tbl_rows(-1)
@@ -23,16 +26,38 @@ pl.Config.set_tbl_rows(-1)
 
 ''' Parameters / Constants '''
 
-START_YEAR = 2016       # first year of participation data
+PBP_START_YEAR = 1999               # first year of nflverse pbp
+PARTICIPATION_START_YEAR = 2016     # first year of participation data
+
+START_YEAR = PARTICIPATION_START_YEAR
 END_YEAR = 2024
 SEASONS = [i for i in range(START_YEAR, END_YEAR + 1)]
 
+# Raw nflverse release files, scanned directly by the lazy loader (the files nflreadpy downloads; see benchmarks.check_cold_cache_fill)
+NFLVERSE_URLS = {
+    'pbp': 'https://github.com/nflverse/nflverse-data/releases/download/pbp/play_by_play_{season}.parquet',
+    'participation': 'https://github.com/nflverse/nflverse-data/releases/download/pbp_participation/pbp_participation_{season}.parquet',
+}
+
 
 
 ''' Helpers '''
 
+def season_range(start: int = START_YEAR, end: int = END_YEAR) -> list[int]:
+    if start < PBP_START_YEAR:
+        raise ValueError(f'pbp data starts in {PBP_START_YEAR}')
+    if end < start:
+        raise ValueError(f'end ({end}) is before start ({start})')
+    if end > nfl.get_current_season():
+        raise ValueError(f'end ({end}) is after the current season ({nfl.get_current_season()})')
+
+    return [i for i in range(start, end + 1)]
+
+
 ## Personnel Helper Functions ## 
 
+# Row-wise reference implementation; the loader uses the vectorized parse_personnel below
+
 def clean_personnel(personnel_str: str) -> str:
     if not personnel_str:
         return ''
@@ -118,19 +143,205 @@ def defensive_personnel(personnel_str: str) -> str:
     return f'{d_type} {total_dls}-{total_lbs}'
 
 
+## Personnel Parsing ##
+
+# Positions summed into each count, matched on the end of the position token. This mirrors the 'POS;' substring
+# counts in offensive_personnel / defensive_personnel, e.g. 'T;' also counts DT / NT and 'LB;' counts ILB / OLB / MLB
+OFFENSE_SPECIAL_TEAMS_POSITIONS = ['K', 'P', 'LS', 'FS', 'CB']
+DEFENSE_SPECIAL_TEAMS_POSITIONS = ['K', 'P', 'LS', 'WR', 'RB', 'TE']
+OL_POSITIONS = ['C', 'G', 'T']
+DL_POSITIONS = ['DL', 'DE', 'DT', 'NT']
+DB_POSITIONS = ['DB', 'CB', 'SS', 'FS']
+
+DEFENSE_PERSONNEL_TYPES = {4: 'Base', 5: 'Nickel', 6: 'Dime', 7: 'Quarters'}
+
+
+def _position_count(positions: list[str], suffix: bool = True) -> pl.Expr:
+    if suffix:
+        matches = pl.any_horizontal([pl.col('pos').str.ends_with(p) for p in positions])
+    else:
+        # offensive_personnel counts 'WR' / 'RB' / 'TE' without the trailing ';'
+        matches = pl.sum_horizontal([pl.col('pos').str.count_matches(p, literal=True) for p in positions])
+
+    return (pl.col('num') * matches.cast(pl.Int64)).sum()
+
+
+def _personnel_positions(personnel: pl.DataFrame | pl.LazyFrame) -> pl.DataFrame | pl.LazyFrame:
+    ''' One row per (distinct personnel string, position token), e.g. '1 RB, 1 TE, 3 WR' -> (1, RB), (1, TE), (3, WR) '''
+
+    return (
+        personnel
+        .with_columns(token=pl.col('personnel').str.split(', '))
+        .explode('token')
+        .with_columns(
+            num=pl.col('token').str.split(' ').list.get(0, null_on_oob=True).cast(pl.Int64, strict=False),
+            pos=pl.col('token').str.split(' ').list.get(1, null_on_oob=True),
+        )
+    )
+
+
+def offense_personnel_lookup(personnel: pl.DataFrame | pl.LazyFrame) -> pl.DataFrame | pl.LazyFrame:
+    ''' Position counts and personnel labels for each distinct offense_personnel string in the `personnel` column '''
+
+    counts = _personnel_positions(personnel).group_by('personnel').agg(
+        OffenseRBs=_position_count(['RB'], suffix=False),
+        OffenseTEs=_position_count(['TE'], suffix=False),
+        OffenseWRs=_position_count(['WR'], suffix=False),
+        OffenseCGT=_position_count(OL_POSITIONS),
+        OffenseOL=_position_count(['OL']),
+        OffenseSpecialTeams=_position_count(OFFENSE_SPECIAL_TEAMS_POSITIONS),
+    )
+
+    counts = counts.with_columns(
+        ExtraOL=pl.when(pl.col('OffenseCGT') > 5).then(pl.col('OffenseCGT') - 5).when(pl.col('OffenseOL') > 5).then(pl.col('OffenseOL') - 5).otherwise(0),
+        IsST=pl.col('OffenseSpecialTeams') > 0,
+    )
+    counts = counts.with_columns(
+        OffensePersonnel=pl.when(pl.col('IsST')).then(pl.lit('ST')).otherwise(pl.concat_str([
+            pl.col('OffenseRBs').cast(pl.String), pl.col('OffenseTEs').cast(pl.String), pl.lit('*').repeat_by('ExtraOL').list.join('')
+        ])),
+        OffenseOL=pl.col('OffenseCGT') + pl.col('OffenseOL'),
+    )
+
+    return counts.select(
+        'personnel', 'OffensePersonnel', 'OffenseRBs', 'OffenseTEs', 'OffenseWRs', 'OffenseOL', 'OffenseSpecialTeams',
+        OffensePersonnelGroup=pl.when(pl.col('OffensePersonnel').str.slice(0, 2).is_in(['11', '12', '13', '21', '22'])).then(pl.col('OffensePersonnel').str.slice(0, 2)).otherwise(pl.lit('Other')),
+        OffenseMultRBs=pl.when(~pl.col('IsST') & pl.col('OffenseRBs').is_between(2, 4)).then(1).otherwise(0),
+        OffenseZeroRBs=pl.when(~pl.col('IsST') & (pl.col('OffenseRBs') == 0)).then(1).otherwise(0),
+        OffenseMultTEs=pl.when(~pl.col('IsST') & pl.col('OffenseTEs').is_between(2, 4)).then(1).otherwise(0),
+        OffenseZeroTEs=pl.when(~pl.col('IsST') & (pl.col('OffenseTEs') == 0)).then(1).otherwise(0),
+        OffenseExtraOL=pl.when(~pl.col('IsST') & (pl.col('ExtraOL') > 0)).then(1).otherwise(0),
+    )
+
+
+def defense_personnel_lookup(personnel: pl.DataFrame | pl.LazyFrame) -> pl.DataFrame | pl.LazyFrame:
+    ''' Position counts and personnel labels for each distinct defense_personnel string in the `personnel` column '''
+
+    counts = _personnel_positions(personnel).group_by('personnel').agg(
+        DefenseDL=_position_count(DL_POSITIONS),
+        DefenseLB=_position_count(['LB']),
+        DefenseDB=_position_count(DB_POSITIONS),
+        DefenseSpecialTeams=_position_count(DEFENSE_SPECIAL_TEAMS_POSITIONS),
+    )
+
+    counts = counts.with_columns(
+        DefensePersonnelType=pl.when(pl.col('DefenseSpecialTeams') > 0).then(pl.lit('ST')).otherwise(
+            pl.col('DefenseDB').replace_strict(DEFENSE_PERSONNEL_TYPES, default='Other', return_dtype=pl.String)
+        ),
+    )
+    counts = counts.with_columns(
+        DefensePersonnel=pl.when(pl.col('DefenseSpecialTeams') > 0).then(pl.lit('ST')).otherwise(pl.concat_str([
+            pl.col('DefensePersonnelType'), pl.lit(' '), pl.col('DefenseDL').cast(pl.String), pl.lit('-'), pl.col('DefenseLB').cast(pl.String)
+        ])),
+    )
+
+    return counts.select('personnel', 'DefensePersonnel', 'DefensePersonnelType', 'DefenseDL', 'DefenseLB', 'DefenseDB', 'DefenseSpecialTeams')
+
+
+def parse_personnel(participation: pl.DataFrame | pl.LazyFrame) -> pl.DataFrame | pl.LazyFrame:
+    '''
+    Adds position counts and personnel labels for offense_personnel / defense_personnel.
+
+    Strings are parsed once per distinct value (a few hundred) and joined back on, instead of once per play.
+    '''
+
+    offense = offense_personnel_lookup(participation.select(personnel=pl.col('offense_personnel').drop_nulls().unique()))
+    defense = defense_personnel_lookup(participation.select(personnel=pl.col('defense_personnel').drop_nulls().unique()))
+
+    offense = offense.rename({'personnel': 'offense_personnel'})
+    defense = defense.rename({'personnel': 'defense_personnel'})
+
+    participation = participation.join(offense, on='offense_personnel', how='left').join(defense, on='defense_personnel', how='left')
+
+    # Null personnel strings don't match the lookup; flags are 0 like the row-wise version
+    flag_cols = ['OffenseMultRBs', 'OffenseZeroRBs', 'OffenseMultTEs', 'OffenseZeroTEs', 'OffenseExtraOL']
+    return participation.with_columns(
+        pl.col(flag_cols).fill_null(0),
+        OffensePersonnelGroup=pl.col('OffensePersonnelGroup').fill_null(pl.lit('Other')),
+    )
+
+
 ''' Main Functions '''
 
-def load_pbp_participation_data() -> pd.DataFrame:
+## Enrichment ##
+
+PARTICIPATION_COLS = ['MasterPlayID', 'OffenseFormation', 'OffensePersonnel','OffensePersonnelGroup', 'OffenseMultRBs', 'OffenseZeroRBs', 'OffenseMultTEs', 'OffenseZeroTEs', 
+                      'OffenseExtraOL', 'OffenseHeavyPersonnel', 'time_to_throw', 'DefensePersonnel', 'DefensePersonnelType', 'LightBox', 'HeavyBox', 'number_of_pass_rushers', 
+                      'ZoneCoverage', 'ManCoverage', 'defense_coverage_type', 'DefenseCoverage',
+                      'OffenseRBs', 'OffenseTEs', 'OffenseWRs', 'OffenseOL', 'DefenseDL', 'DefenseLB', 'DefenseDB']
+
+# Enriched play table columns each consumer reads; the lazy loader only materializes these
+PLAY_COLUMNS = {
+    'offense': ['season', 'week', 'game_id', 'posteam', 'defteam', 'DriveID', 'NeutralDown', 'pass', 'pass_attempt', 'qb_scramble', 'air_yards',
+                'AirYardsToSticks', 'time_to_throw', 'PassDepth', 'sack', 'rush', 'rush_attempt', 'RunLocation', 'OffenseFormation', 'OffensePersonnel',
+                'OffenseHeavyPersonnel', 'OffenseMultRBs', 'OffenseZeroRBs', 'OffenseMultTEs', 'OffenseZeroTEs', 'OffenseExtraOL', 'receiver', 'rusher'],
+    'defense': ['season', 'week', 'game_id', 'posteam', 'defteam', 'DriveID', 'NeutralDown', 'pass', 'rush', 'LightBox', 'HeavyBox', 'ZoneCoverage',
+                'ManCoverage', 'number_of_pass_rushers', 'DefenseCoverage'],
+    'profiling': ['posteam', 'defteam', 'season', 'week', 'game_id', 'MasterPlayID', 'OffensePersonnel', 'OffensePersonnelGroup', 'DefensePersonnel',
+                  'DefensePersonnelType', 'DefenseCoverage', 'OffenseFormation'],
+}
+
+# Game partials feed both sides, so they read both sides' columns
+PLAY_COLUMNS['tendencies'] = list(dict.fromkeys(PLAY_COLUMNS['offense'] + PLAY_COLUMNS['defense']))
+
+## Compact Schema ##
+
+FORMATIONS = ['Shotgun', 'Under Center']
+COVERAGES = ['COVER_1', 'COVER_2', 'COVER_3', 'COVER_4', 'COVER_6']
+
+# Labels with a fixed set of values are stored as Enums
+LABEL_DTYPES = {
+    'PassDepth': pl.Enum(['Behind LOS', 'Short', 'Medium', 'Long']),
+    'RunLocation': pl.Enum(['Inside', 'Outside']),
+    'OffenseFormation': pl.Enum(FORMATIONS),
+    'DefenseCoverage': pl.Enum(COVERAGES + ['Other']),
+    'OffensePersonnelGroup': pl.Enum(['11', '12', '13', '21', '22', 'Other']),
+    'DefensePersonnelType': pl.Enum([*DEFENSE_PERSONNEL_TYPES.values(), 'Other', 'ST']),
+}
+
+# Open ended labels (team codes change over the years, personnel strings and player names vary) are Categoricals
+CATEGORICAL_COLS = ['game_id', 'posteam', 'defteam', 'home_team', 'away_team', 'receiver', 'rusher', 'OffensePersonnel', 'DefensePersonnel']
+
+# 0 / 1 flags and position counts fit in Int8 (sums of Int8 come back as Int64). nflverse ships its play flags as doubles
+INT8_COLS = ['pass', 'rush', 'pass_attempt', 'rush_attempt', 'sack', 'qb_scramble',
+             'NeutralDown', 'LightBox', 'HeavyBox', 'ZoneCoverage', 'ManCoverage', 'OffenseMultRBs', 'OffenseZeroRBs', 'OffenseMultTEs',
+             'OffenseZeroTEs', 'OffenseExtraOL', 'OffenseHeavyPersonnel', 'OffenseRBs', 'OffenseTEs', 'OffenseWRs', 'OffenseOL',
+             'DefenseDL', 'DefenseLB', 'DefenseDB']
+
+
+def compact_schema(frame: pl.DataFrame | pl.LazyFrame) -> pl.DataFrame | pl.LazyFrame:
+    ''' Casts whichever label / flag columns `frame` has to their compact dtypes '''
+
+    names = frame.collect_schema().names()
+
+    labels = [pl.col(col).cast(dtype) for col, dtype in LABEL_DTYPES.items() if col in names]
+    categoricals = [pl.col(col).cast(pl.Categorical) for col in CATEGORICAL_COLS if col in names]
 
-    ''' PBP Data '''
+    # Non-strict so a stray NaN in a raw flag becomes null, which sums skip like pandas did with NaN
+    int8s = [pl.col(col).cast(pl.Int8, strict=False) for col in INT8_COLS if col in names]
 
-    ## Load ##
-    pbp = nfl.load_pbp(seasons=SEASONS)
+    return frame.with_columns(labels + categoricals + int8s)
+
+
+def play_key(game_col: str, play_col: str, width: int) -> pl.Expr:
+    ''' Integer key from the numeric gsis game id (old_game_id, YYYYMMDDGG) and a per-game number below `width` '''
+
+    return pl.col(game_col).cast(pl.Int64) * width + pl.col(play_col).cast(pl.Int64)
+
+
+def strings_for_pandas(frame: pl.DataFrame) -> pl.DataFrame:
+    ''' Enum / Categorical columns back to strings; pandas groupbys on categoricals add empty groups (observed=False) '''
+
+    return frame.with_columns((cs.categorical() | cs.enum()).cast(pl.String))
+
+
+def enrich_pbp(pbp: pl.DataFrame | pl.LazyFrame) -> pl.DataFrame | pl.LazyFrame:
+    ''' Adds derived play columns to raw nflverse pbp and filters to relevant, normal game state plays '''
 
     ## Add columns ##
     pbp = pbp.with_columns(
-        MasterPlayID=pl.concat_str([pl.col('game_id'), pl.col('play_id').cast(pl.Int32).cast(pl.String)], separator='_'),
-        DriveID=pl.concat_str([pl.col('game_id'), pl.col('drive').cast(pl.Int8).cast(pl.String)], separator='_'),
+        MasterPlayID=play_key('old_game_id', 'play_id', width=100_000),
+        DriveID=play_key('old_game_id', 'drive', width=100),
     )
     pbp = pbp.with_columns(
         NeutralDown=pl.when((pl.col('down') == 1) & (pl.col('ydstogo') <= 10)).then(1).when((pl.col('down') == 2) & (pl.col('ydstogo') <= 6)).then(1).when((pl.col('down') == 3) & (pl.col('ydstogo') <= 3)).then(1).otherwise(0),
@@ -166,15 +377,15 @@ def load_pbp_participation_data() -> pd.DataFrame:
     # print(pbp['MasterPlayID'].n_unique())
     # print(pbp.head())
 
+    return compact_schema(pbp)
+
 
-    ''' Participation Data '''
-        
-    ## Get data ##
-    participation = nfl.load_participation(seasons=SEASONS)
+def enrich_participation(participation: pl.DataFrame | pl.LazyFrame) -> pl.DataFrame | pl.LazyFrame:
+    ''' Adds formation, personnel, box and coverage columns to raw nflverse participation '''
 
     ## Add columns
     participation = participation.with_columns(
-        MasterPlayID=pl.concat_str([pl.col('nflverse_game_id'), pl.col('play_id').cast(pl.Int32).cast(pl.String)], separator='_'),
+        MasterPlayID=play_key('old_game_id', 'play_id', width=100_000),
         season=pl.col('nflverse_game_id').str.split('_').list.get(0).cast(int),
 
         # Defense stuff
@@ -182,28 +393,17 @@ def load_pbp_participation_data() -> pd.DataFrame:
         HeavyBox=pl.when(pl.col('defenders_in_box') >= 8).then(1).otherwise(0),
         ZoneCoverage=pl.when(pl.col('defense_man_zone_type') == 'ZONE_COVERAGE').then(1).otherwise(0),
         ManCoverage=pl.when(pl.col('defense_man_zone_type') == 'MAN_COVERAGE').then(1).otherwise(0),
-        DefenseCoverage=pl.when(pl.col('defense_coverage_type').is_in(['COVER_1', 'COVER_2', 'COVER_3', 'COVER_4', 'COVER_6'])).then(pl.col('defense_coverage_type')).otherwise(pl.lit('Other')),
+        DefenseCoverage=pl.when(pl.col('defense_coverage_type').is_in(COVERAGES)).then(pl.col('defense_coverage_type')).otherwise(pl.lit('Other')),
         OffenseFormation=pl.when(pl.col('offense_formation').is_in(['SINGLEBACK', 'I_FORM', 'UNDER CENTER', 'JUMBO'])).then(pl.lit('Under Center')).when(pl.col('offense_formation').is_in(['SHOTGUN', 'EMPTY', 'WILDCAT', 'PISTOL'])).then(pl.lit('Shotgun'))
     )
 
     # Personnel
-    participation = participation.with_columns(
-        OffensePositionsStr=pl.col('offense_personnel').map_elements(clean_personnel, return_dtype=str),
-        DefensePositionsStr=pl.col('defense_personnel').map_elements(clean_personnel, return_dtype=str),
-    )
-    participation = participation.with_columns(
-        OffensePersonnel=pl.col('OffensePositionsStr').map_elements(offensive_personnel, return_dtype=str),
-        DefensePersonnel=pl.col('DefensePositionsStr').map_elements(defensive_personnel, return_dtype=str),
-    )
-    participation = participation.with_columns(
-        OffensePersonnelGroup=pl.when(pl.col('OffensePersonnel').str.slice(0, 2).is_in(['11', '12', '13', '21', '22'])).then(pl.col('OffensePersonnel').str.slice(0, 2)).otherwise(pl.lit('Other')),
-        OffenseMultRBs=pl.when(pl.col('OffensePersonnel').str.slice(0, 1).is_in(['2', '3', '4'])).then(1).otherwise(0),
-        OffenseZeroRBs=pl.when(pl.col('OffensePersonnel').str.slice(0, 1) == '0').then(1).otherwise(0),
-        OffenseMultTEs=pl.when(pl.col('OffensePersonnel').str.slice(1, 1).is_in(['2', '3', '4'])).then(1).otherwise(0),
-        OffenseZeroTEs=pl.when(pl.col('OffensePersonnel').str.slice(1, 1) == '0').then(1).otherwise(0),
-        OffenseExtraOL=pl.when(pl.col('OffensePersonnel').str.tail(1) == '*').then(1).otherwise(0),
-        DefensePersonnelType=pl.col('DefensePersonnel').str.split(' ').list.get(0)
-    )
+    if isinstance(participation, pl.DataFrame):
+        with instrument.stage('parse_personnel', participation) as s:
+            participation = s.output(parse_personnel(participation))
+    else:
+        # Lazy: only adds to the query plan, nothing to measure
+        participation = parse_personnel(participation)
     participation = participation.with_columns(
         OffenseHeavyPersonnel=pl.when((pl.col('OffenseMultRBs') == 1) | (pl.col('OffenseMultTEs') == 1)).then(1).otherwise(0),
     )
@@ -212,250 +412,641 @@ def load_pbp_participation_data() -> pd.DataFrame:
     # print(participation['MasterPlayID'].n_unique())
     # print(participation.filter(pl.col('season') == 2024, pl.col('route') != '').head(100))
 
+    # Only the columns that get joined onto pbp
+    return compact_schema(participation.select(PARTICIPATION_COLS))
 
-    ''' Combine '''
 
-    participation_cols = ['MasterPlayID', 'OffenseFormation', 'OffensePersonnel','OffensePersonnelGroup', 'OffenseMultRBs', 'OffenseZeroRBs', 'OffenseMultTEs', 'OffenseZeroTEs', 
-                          'OffenseExtraOL', 'OffenseHeavyPersonnel', 'time_to_throw', 'DefensePersonnel', 'DefensePersonnelType', 'LightBox', 'HeavyBox', 'number_of_pass_rushers', 
-                          'ZoneCoverage', 'ManCoverage', 'defense_coverage_type', 'DefenseCoverage']
-    pbp = pbp.join(participation[participation_cols], on='MasterPlayID', how='left')
+## Loading ##
 
-    # Create dataframe
-    pbp_df = pd.DataFrame(columns=pbp.columns, data=pbp)
+# Raw participation columns read by enrich_participation
+RAW_PARTICIPATION_SCHEMA = {
+    'nflverse_game_id': pl.String, 'old_game_id': pl.String, 'play_id': pl.Int32, 'offense_formation': pl.String, 'offense_personnel': pl.String,
+    'defense_personnel': pl.String, 'defenders_in_box': pl.Int32, 'defense_man_zone_type': pl.String, 'defense_coverage_type': pl.String,
+    'time_to_throw': pl.Float64, 'number_of_pass_rushers': pl.Int32,
+}
+
+
+@instrument.staged()
+def load_season(kind: str, season: int, use_cache: bool = True, refresh: bool = False) -> pl.DataFrame:
+    ''' Loads one season of enriched pbp or participation data, from the local cache when possible '''
+
+    if use_cache and not refresh:
+        with instrument.stage('read_cache', kind=kind, season=season) as s:
+            cached = s.output(data_cache.read_cached(kind, season))
+        if cached is not None:
+            return cached
+
+    if kind not in ['pbp', 'participation']:
+        raise ValueError(f'Unknown data kind: {kind}')
+
+    # One query over the release file, with enrich_pbp's row filters pushed into the scan. nflreadpy's (eager) download
+    # is the fallback when the file can't be scanned, e.g. if nflverse moves it
+    enrich = enrich_pbp if kind == 'pbp' else enrich_participation
+    with instrument.stage('download', kind=kind, season=season) as s:
+        try:
+            df = enrich(scan_raw_season(kind, season)).collect()
+        except OSError:
+            df = enrich(download_raw_season(kind, season))
+        s.output(df)
+
+    if use_cache:
+        with instrument.stage('write_cache', df, kind=kind, season=season):
+            data_cache.write_cached(kind, season, df)
+
+    return df
+
+
+def scan_raw_season(kind: str, season: int) -> pl.LazyFrame:
+    '''
+    Lazy scan of a season's raw nflverse release file. pbp keeps every column (the cache holds the full schema);
+    participation is projected to the columns enrich_participation reads.
+    '''
+
+    if kind not in ['pbp', 'participation']:
+        raise ValueError(f'Unknown data kind: {kind}')
+
+    raw = pl.scan_parquet(NFLVERSE_URLS[kind].format(season=season))
+
+    return raw if kind == 'pbp' else raw.select(list(RAW_PARTICIPATION_SCHEMA))
+
+
+def download_raw_season(kind: str, season: int) -> pl.DataFrame:
+    ''' A season's raw release file through nflreadpy (every column, read eagerly) '''
+
+    if kind not in ['pbp', 'participation']:
+        raise ValueError(f'Unknown data kind: {kind}')
+
+    return nfl.load_pbp(season) if kind == 'pbp' else nfl.load_participation(season)
+
+
+def scan_season(kind: str, season: int, use_cache: bool = True, refresh: bool = False) -> pl.LazyFrame:
+    '''
+    Lazy version of load_season. Nothing is read until collect(), so only the columns and rows the final query
+    needs come off disk / the network.
+
+    With the cache, a missing or stale season is loaded into it first (itself a scan of the release file with the game
+    state filters pushed down; every pbp column is kept) and the cached Parquet file is scanned, so the projection to a
+    consumer's columns happens there. Without it, the release file is scanned directly (no nflreadpy fallback).
+    '''
+
+    if not use_cache:
+        raw = scan_raw_season(kind, season)
+        return enrich_pbp(raw) if kind == 'pbp' else enrich_participation(raw)
+
+    if refresh or data_cache.is_stale(kind, season):
+        load_season(kind, season, refresh=True)
+
+    return pl.scan_parquet(data_cache.cache_path(kind, season))
+
+
+def empty_participation() -> pl.LazyFrame:
+    ''' Enriched participation with no rows, joined onto seasons that have no participation data '''
+
+    return enrich_participation(pl.LazyFrame(schema=RAW_PARTICIPATION_SCHEMA))
+
+
+def scan_plays(seasons: list[int] = SEASONS, columns: list[str] = None, use_cache: bool = True, refresh: bool | list[int] = False,
+               participation: bool = True, weeks: list[int] = None) -> pl.LazyFrame:
+    '''
+    Lazy enriched pbp joined with participation for `seasons`, projected to `columns` (all if None) and filtered to
+    `weeks` (all if None). Seasons are selected by which files get scanned; the week filter is pushed into the pbp scans.
+
+    `refresh` re-downloads every season if True, or only the listed seasons if a list. Seasons before
+    PARTICIPATION_START_YEAR (or all of them, with `participation=False`) get null participation columns.
+    '''
+
+    refresh_seasons = seasons if refresh is True else (refresh or [])
+    participation_seasons = [season for season in seasons if participation and season >= PARTICIPATION_START_YEAR]
+
+    pbp = pl.concat(
+        [scan_season('pbp', season, use_cache=use_cache, refresh=season in refresh_seasons) for season in seasons],
+        how='diagonal_relaxed'
+    )
+    if weeks is not None:
+        pbp = pbp.filter(pl.col('week').is_in(weeks))
+
+    participation = pl.concat(
+        [empty_participation()] + [scan_season('participation', season, use_cache=use_cache, refresh=season in refresh_seasons) for season in participation_seasons],
+        how='diagonal_relaxed'
+    )
+
+    plays = pbp.join(participation, on='MasterPlayID', how='left', maintain_order='left')
+
+    if columns is not None:
+        plays = plays.select(columns)
+
+    return plays
+
+
+@instrument.staged()
+def load_plays(seasons: list[int] = SEASONS, use_cache: bool = True, refresh: bool | list[int] = False, columns: list[str] = None,
+               weeks: list[int] = None) -> pl.DataFrame:
+    '''
+    Loads enriched pbp joined with participation for `seasons`; see scan_plays.
 
-    # print(pbp_df.shape)
-    # print(pbp_df.head().to_string())
+    Pass `columns` (e.g. PLAY_COLUMNS['offense']) to only materialize what a consumer needs.
+    '''
+
+    with instrument.stage('scan', seasons=list(seasons)):
+        plays = scan_plays(seasons=seasons, columns=columns, use_cache=use_cache, refresh=refresh, weeks=weeks)
+
+    with instrument.stage('join', plays) as s:
+        return s.output(plays.collect())
+
+
+@instrument.staged()
+def load_pbp_participation_data(seasons: list[int] = SEASONS, use_cache: bool = True, refresh: bool | list[int] = False, columns: list[str] = None,
+                                weeks: list[int] = None, arrow_dtypes: bool = False, categoricals: bool = False) -> pd.DataFrame:
+    '''
+    Pandas version of load_plays, for the notebooks.
+
+    Converts through Arrow rather than row by row; `arrow_dtypes` keeps the Arrow buffers as pandas
+    ArrowDtype columns (zero-copy) instead of converting to NumPy dtypes. Labels come back as strings
+    unless `categoricals` is set (then groupbys on them need observed=True).
+
+    NumPy dtypes stay the default because ArrowDtype is experimental in pandas 1.5: groupbys keyed on ArrowDtype
+    columns don't align with their parent groups (team_profiling's personnel shares come out all NaN), and
+    to_numpy(dtype=float) fails on nulls.
+    '''
+
+    pbp = load_plays(seasons=seasons, use_cache=use_cache, refresh=refresh, columns=columns, weeks=weeks)
+
+    # Create dataframe
+    with instrument.stage('to_pandas', pbp) as s:
+        if not categoricals:
+            pbp = strings_for_pandas(pbp)
+        pbp_df = s.output(pbp.to_pandas(use_pyarrow_extension_array=arrow_dtypes))
 
     return pbp_df
 
 
-def load_stats_team_tendencies_offense():
-    ''' Prep Offensive Inputs '''
+## Aggregation ##
+
+# Partial aggregates are kept per (game, offense, defense); summing them over any set of games gives
+# the numerators / denominators of every tendency for those games
+PARTIAL_KEYS = ['season', 'week', 'game_id', 'posteam', 'defteam']
+PLAYER_PARTIAL_KEYS = ['season', 'week', 'game_id', 'posteam', 'PlayerType', 'Player']
+
+# Peak RSS growth per season of a tendency build over the in-memory size of that season's play table (tendency columns):
+# the join / aggregation working memory on top of the table (~7 MB per 2.3 MB season, see benchmarks.bench_streaming)
+WORKING_MEMORY_FACTOR = 3
+
+OFFENSE_KEYS = ['posteam', 'season']
+DEFENSE_KEYS = ['defteam', 'season']
+TENDENCY_KEYS = {'offense': OFFENSE_KEYS, 'defense': DEFENSE_KEYS}
+
+# Default modeling / profiling features per side (offense matches the notebooks' OFFENSE_FEATURES)
+TENDENCY_FEATURES = {
+    'offense': [
+        'Plays / Game', 'Drives / Game',
+        '% Pass', 'Scrambles / Game',
+        '% Plays 11 Personnel', '% Plays Mult RBs', '% Plays Zero RBs', '% Plays Mult TEs', '% Plays Zero TEs', '% Plays Extra OL',
+        '% Under Center', '% Shotgun', 'Shotgun % Pass', 'Under Center % Pass',
+        'ADOT', 'ADOT to Sticks', 'Avg Time to Throw', '% Passes Behind LOS', '% Passes Deep', 'MaxTargetShare',
+        '% Rush Inside', '% Rush Outside', 'MaxRushAttemptsShare',
+    ],
+    'defense': [
+        'Plays / Game', 'Drives / Game',
+        '% Light Box', '% Heavy Box', '% Zone', '% Man', '% 5 Rushers', '% 6+ Rushers',
+        'COVER_1 % Plays', 'COVER_2 % Plays', 'COVER_3 % Plays', 'COVER_4 % Plays', 'COVER_6 % Plays',
+    ],
+}
 
-    ## Get data ##
-    pbp_df = load_pbp_participation_data()
- 
-    ## Base Stats ##
-    offense_team_tendencies = pbp_df.groupby(['posteam', 'season']).aggregate(
+# Per player type: (max count, max share, # players over the threshold, share threshold)
+SHARE_LEADER_COLS = {
+    'receiver': ('MaxTargets', 'MaxTargetShare', 'N_Receivers_FivePctTargetShare', 0.05),
+    'rusher': ('MaxRushAttempts', 'MaxRushAttemptsShare', 'N_Rushers_TenPctAttemptShare', 0.1),
+}
+
+
+def _to_pandas_tendencies(tendencies: pl.DataFrame, keys: list[str]) -> pd.DataFrame:
+    ''' Team tendencies as the notebooks expect them: pandas, indexed by (team, season) '''
+
+    return strings_for_pandas(tendencies).sort(keys).to_pandas().set_index(keys)
+
+
+def game_partials_query(plays: pl.LazyFrame) -> pl.LazyFrame:
+    ''' Additive play counts / sums per (game, offense, defense), shared by the offensive and defensive tendencies '''
+
+    neutral = pl.col('NeutralDown') == 1
+
+    partial_aggs = dict(
         # General
-        Games=('game_id', 'nunique'),
-        Drives=('DriveID', 'nunique'),
-        Plays=('posteam', 'size'),
-        Neutral_Down_Plays=('posteam', lambda x: x[pbp_df['NeutralDown'] == 1].shape[0]),
+        Games=pl.lit(1, dtype=pl.Int64),
+        Drives=pl.col('DriveID').drop_nulls().n_unique().cast(pl.Int64),   # Drive IDs are per game, so these add up across games
+        Plays=pl.len().cast(pl.Int64),
+        Neutral_Down_Plays=neutral.sum().cast(pl.Int64),
 
         # Play Types
-        Pass_Plays=('pass', 'sum'),
-        Neutral_Down_Pass=('pass', lambda x: x[pbp_df['NeutralDown'] == 1].sum()),
-        Pass_Attempts=('pass_attempt', 'sum'),
-        
-        QBScrambles=('qb_scramble', 'sum'),
+        Pass_Plays=pl.col('pass').sum(),
+        Neutral_Down_Pass=pl.col('pass').filter(neutral).sum(),
+        Pass_Attempts=pl.col('pass_attempt').sum(),
+
+        QBScrambles=pl.col('qb_scramble').sum(),
 
         # Passing
-        IAY=('air_yards', 'sum'),
-        IAY_ToSticks=('AirYardsToSticks', 'sum'),
-        TotalTimeToThrow=('time_to_throw', 'sum'),
-        Pass_BehindLOS=('pass_attempt', lambda x: x[pbp_df['PassDepth'] == 'Behind LOS'].sum()),
-        Pass_Short=('pass_attempt', lambda x: x[pbp_df['PassDepth'] == 'Short'].sum()),
-        Pass_Medium=('pass_attempt', lambda x: x[pbp_df['PassDepth'] == 'Medium'].sum()),
-        Pass_Deep=('pass_attempt', lambda x: x[pbp_df['PassDepth'] == 'Long'].sum()),
-        Sacks=('sack', 'sum'),
+        IAY=pl.col('air_yards').sum(),
+        IAY_ToSticks=pl.col('AirYardsToSticks').sum(),
+        TotalTimeToThrow=pl.col('time_to_throw').sum(),
+        Pass_BehindLOS=pl.col('pass_attempt').filter(pl.col('PassDepth') == 'Behind LOS').sum(),
+        Pass_Short=pl.col('pass_attempt').filter(pl.col('PassDepth') == 'Short').sum(),
+        Pass_Medium=pl.col('pass_attempt').filter(pl.col('PassDepth') == 'Medium').sum(),
+        Pass_Deep=pl.col('pass_attempt').filter(pl.col('PassDepth') == 'Long').sum(),
+        Sacks=pl.col('sack').sum(),
 
         # Rushing
-        Rush_Plays=('rush', 'sum'),
-        Rush_Attempts=('rush_attempt', 'sum'),
-        Rush_Inside=('rush', lambda x: x[pbp_df['RunLocation'] == 'Inside'].sum()),
-        Rush_Outside=('rush', lambda x: x[pbp_df['RunLocation'] == 'Outside'].sum()),
+        Rush_Plays=pl.col('rush').sum(),
+        Rush_Attempts=pl.col('rush_attempt').sum(),
+        Rush_Inside=pl.col('rush').filter(pl.col('RunLocation') == 'Inside').sum(),
+        Rush_Outside=pl.col('rush').filter(pl.col('RunLocation') == 'Outside').sum(),
 
         # Personnel
-        Plays_11_Personnel=('posteam', lambda x: x[pbp_df['OffensePersonnel'] == '11'].shape[0]),
-        Plays_Heavy_Personnel=('OffenseHeavyPersonnel', 'sum'),
-        Plays_Mult_RBs=('OffenseMultRBs', 'sum'),
-        Plays_Zero_RBs=('OffenseZeroRBs', 'sum'),
-        Plays_Mult_TEs=('OffenseMultTEs', 'sum'),
-        Plays_Zero_TEs=('OffenseZeroTEs', 'sum'),
-        Plays_Extra_OL=('OffenseExtraOL', 'sum')
+        Plays_11_Personnel=(pl.col('OffensePersonnel') == '11').sum().cast(pl.Int64),
+        Plays_Heavy_Personnel=pl.col('OffenseHeavyPersonnel').sum(),
+        Plays_Mult_RBs=pl.col('OffenseMultRBs').sum(),
+        Plays_Zero_RBs=pl.col('OffenseZeroRBs').sum(),
+        Plays_Mult_TEs=pl.col('OffenseMultTEs').sum(),
+        Plays_Zero_TEs=pl.col('OffenseZeroTEs').sum(),
+        Plays_Extra_OL=pl.col('OffenseExtraOL').sum(),
+
+        # Box / Coverage / Rushers
+        LightBoxPlays=pl.col('LightBox').sum(),
+        HeavyBoxPlays=pl.col('HeavyBox').sum(),
+        ZoneCoveragePlays=pl.col('ZoneCoverage').sum(),
+        ManCoveragePlays=pl.col('ManCoverage').sum(),
+        FiveRushersPlays=pl.col('pass').filter(pl.col('number_of_pass_rushers') == 5).sum(),
+        SixPlusRushersPlays=pl.col('pass').filter(pl.col('number_of_pass_rushers') >= 6).sum(),
     )
 
-    # Overall numbers
-    offense_team_tendencies['Plays / Game'] = offense_team_tendencies['Plays'] / offense_team_tendencies['Games']
-    offense_team_tendencies['Drives / Game'] = offense_team_tendencies['Drives'] / offense_team_tendencies['Games']
+    # Formations
+    for formation in FORMATIONS:
+        in_formation = pl.col('OffenseFormation') == formation
+        partial_aggs[f'{formation} Plays'] = in_formation.sum().cast(pl.Int64)
+        partial_aggs[f'{formation} Neutral_Down_Plays'] = (in_formation & neutral).sum().cast(pl.Int64)
+        partial_aggs[f'{formation} Pass_Plays'] = pl.col('pass').filter(in_formation).sum()
+
+    # Coverages
+    for coverage in COVERAGES:
+        in_coverage = pl.col('DefenseCoverage') == coverage
+        partial_aggs[f'{coverage} Plays'] = pl.col('pass').filter(in_coverage).sum()
+        partial_aggs[f'{coverage} Neutral_Down_Plays'] = pl.col('pass').filter(in_coverage & neutral).sum()
+
+    # Pass plays with any coverage charted ('Other' included), the denominator for coverage shares
+    charted = pl.col('DefenseCoverage').is_not_null()
+    partial_aggs['Charted Plays'] = pl.col('pass').filter(charted).sum()
+    partial_aggs['Charted Neutral_Down_Plays'] = pl.col('pass').filter(charted & neutral).sum()
+
+    return plays.group_by(PARTIAL_KEYS).agg(**partial_aggs)
+
 
-    # Play Types
-    offense_team_tendencies['% Pass'] = offense_team_tendencies['Pass_Plays'] / offense_team_tendencies['Plays']
-    offense_team_tendencies['% Pass Neutral Downs'] = offense_team_tendencies['Neutral_Down_Pass'] / offense_team_tendencies['Neutral_Down_Plays']
+def player_partials_query(plays: pl.LazyFrame) -> pl.LazyFrame:
+    ''' Targets per receiver and rush attempts per rusher, per game '''
 
-    offense_team_tendencies['Scrambles / Game'] = offense_team_tendencies['QBScrambles'] / offense_team_tendencies['Games']
+    game_keys = ['season', 'week', 'game_id', 'posteam']
 
-    # Passing numbers
-    offense_team_tendencies['ADOT'] = offense_team_tendencies['IAY'] / (offense_team_tendencies['Pass_Attempts'] - offense_team_tendencies['Sacks'])
-    offense_team_tendencies['ADOT to Sticks'] = offense_team_tendencies['IAY_ToSticks'] / (offense_team_tendencies['Pass_Attempts'] - offense_team_tendencies['Sacks'])
-    offense_team_tendencies['Avg Time to Throw'] = offense_team_tendencies['TotalTimeToThrow'] / (offense_team_tendencies['Pass_Attempts'] - offense_team_tendencies['Sacks'])
+    targets = plays.filter(pl.col('receiver').is_not_null()).group_by(game_keys + ['receiver']).agg(
+        Count=pl.col('pass_attempt').sum()
+    ).rename({'receiver': 'Player'}).with_columns(PlayerType=pl.lit('receiver'))
 
-    offense_team_tendencies['% Passes Behind LOS'] = offense_team_tendencies['Pass_BehindLOS'] / (offense_team_tendencies['Pass_Attempts'] - offense_team_tendencies['Sacks'])
-    offense_team_tendencies['% Passes Short'] = offense_team_tendencies['Pass_Short'] / (offense_team_tendencies['Pass_Attempts'] - offense_team_tendencies['Sacks'])
-    offense_team_tendencies['% Passes Medium'] = offense_team_tendencies['Pass_Medium'] / (offense_team_tendencies['Pass_Attempts'] - offense_team_tendencies['Sacks'])
-    offense_team_tendencies['% Passes Deep'] = offense_team_tendencies['Pass_Deep'] / (offense_team_tendencies['Pass_Attempts'] - offense_team_tendencies['Sacks'])
+    rush_attempts = plays.filter(pl.col('rush') == 1, pl.col('rusher').is_not_null()).group_by(game_keys + ['rusher']).agg(
+        Count=pl.col('rush_attempt').sum()
+    ).rename({'rusher': 'Player'}).with_columns(PlayerType=pl.lit('rusher'))
 
-    # Rushing numbers
-    offense_team_tendencies['% Rush Inside'] = offense_team_tendencies['Rush_Inside'] / offense_team_tendencies['Rush_Plays']
-    offense_team_tendencies['% Rush Outside'] = offense_team_tendencies['Rush_Outside'] / offense_team_tendencies['Rush_Plays']
+    return pl.concat([targets, rush_attempts], how='diagonal').select(*PLAYER_PARTIAL_KEYS, 'Count')
+
+
+def share_leaders(player_counts: pl.LazyFrame, keys: list[str]) -> pl.LazyFrame:
+    '''
+    Per team: the top receiver's / rusher's count and share, and how many players clear the share threshold.
+
+    `player_counts` has one row per (keys, PlayerType, Player) with that player's Count over the period.
+    '''
+
+    player_counts = player_counts.with_columns(Share=pl.col('Count') / pl.col('Count').sum().over(keys + ['PlayerType']))
+
+    leader_aggs = []
+    for player_type, (max_col, max_share_col, n_col, threshold) in SHARE_LEADER_COLS.items():
+        is_type = pl.col('PlayerType') == player_type
+        leader_aggs += [
+            pl.col('Count').filter(is_type).max().alias(max_col),
+            pl.col('Share').filter(is_type).max().alias(max_share_col),
+            (pl.col('Share').filter(is_type) >= threshold).sum().cast(pl.Int64).alias(n_col),
+        ]
+
+    return player_counts.group_by(keys).agg(leader_aggs)
+
+
+def offense_features(sums: pl.LazyFrame, keys: list[str] = OFFENSE_KEYS) -> pl.LazyFrame:
+    ''' Offensive tendency ratios from summed partials (plus share leader columns), in the notebooks' column order '''
+
+    base_cols = ['Games', 'Drives', 'Plays', 'Neutral_Down_Plays', 'Pass_Plays', 'Neutral_Down_Pass', 'Pass_Attempts', 'QBScrambles',
+                 'IAY', 'IAY_ToSticks', 'TotalTimeToThrow', 'Pass_BehindLOS', 'Pass_Short', 'Pass_Medium', 'Pass_Deep', 'Sacks',
+                 'Rush_Plays', 'Rush_Attempts', 'Rush_Inside', 'Rush_Outside',
+                 'Plays_11_Personnel', 'Plays_Heavy_Personnel', 'Plays_Mult_RBs', 'Plays_Zero_RBs', 'Plays_Mult_TEs', 'Plays_Zero_TEs', 'Plays_Extra_OL']
+
+    dropbacks = pl.col('Pass_Attempts') - pl.col('Sacks')
+    ratios = {
+        # Overall numbers
+        'Plays / Game': pl.col('Plays') / pl.col('Games'),
+        'Drives / Game': pl.col('Drives') / pl.col('Games'),
+
+        # Play Types
+        '% Pass': pl.col('Pass_Plays') / pl.col('Plays'),
+        '% Pass Neutral Downs': pl.col('Neutral_Down_Pass') / pl.col('Neutral_Down_Plays'),
+
+        'Scrambles / Game': pl.col('QBScrambles') / pl.col('Games'),
+
+        # Passing numbers
+        'ADOT': pl.col('IAY') / dropbacks,
+        'ADOT to Sticks': pl.col('IAY_ToSticks') / dropbacks,
+        'Avg Time to Throw': pl.col('TotalTimeToThrow') / dropbacks,
+
+        '% Passes Behind LOS': pl.col('Pass_BehindLOS') / dropbacks,
+        '% Passes Short': pl.col('Pass_Short') / dropbacks,
+        '% Passes Medium': pl.col('Pass_Medium') / dropbacks,
+        '% Passes Deep': pl.col('Pass_Deep') / dropbacks,
+
+        # Rushing numbers
+        '% Rush Inside': pl.col('Rush_Inside') / pl.col('Rush_Plays'),
+        '% Rush Outside': pl.col('Rush_Outside') / pl.col('Rush_Plays'),
+    }
 
     # Personnel
     for col in ['Plays_11_Personnel', 'Plays_Heavy_Personnel', 'Plays_Mult_RBs', 'Plays_Zero_RBs', 'Plays_Mult_TEs', 'Plays_Zero_TEs', 'Plays_Extra_OL']:
         cat = col.replace('Plays_', '').replace('_', ' ')
-        col_name = f'% Plays {cat}'
-        offense_team_tendencies[col_name] = offense_team_tendencies[col] / offense_team_tendencies['Plays']
+        ratios[f'% Plays {cat}'] = pl.col(col) / pl.col('Plays')
 
     # Formations
-    offense_formations = pbp_df.groupby(['posteam', 'season', 'OffenseFormation']).aggregate(
-        Plays=('posteam', 'size'),
-        Neutral_Down_Plays=('posteam', lambda x: x[pbp_df['NeutralDown'] == 1].shape[0]),
+    formation_plays = pl.col('Under Center Plays') + pl.col('Shotgun Plays')
+    formation_neutral_plays = pl.col('Under Center Neutral_Down_Plays') + pl.col('Shotgun Neutral_Down_Plays')
+    formation_ratios = {
+        'Shotgun % Pass': pl.col('Shotgun Pass_Plays') / pl.col('Shotgun Plays'),
+        'Under Center % Pass': pl.col('Under Center Pass_Plays') / pl.col('Under Center Plays'),
+        '% Under Center': pl.col('Under Center Plays') / formation_plays,
+        '% Shotgun': pl.col('Shotgun Plays') / formation_plays,
+        '% Under Center Neutral Downs': pl.col('Under Center Neutral_Down_Plays') / formation_neutral_plays,
+        '% Shotgun Neutral Downs': pl.col('Shotgun Neutral_Down_Plays') / formation_neutral_plays,
+    }
 
-        Pass_Plays=('pass', 'sum'),
-        Rush_Plays=('rush', 'sum')
-    )
-    offense_formations['% Pass'] = offense_formations['Pass_Plays'] / offense_formations['Plays']
-
-    offense_formations = offense_formations.reset_index().pivot(
-        index=['posteam', 'season'],
-        columns='OffenseFormation',
-        values=['Plays', 'Neutral_Down_Plays', '% Pass']
-    ).swaplevel(axis=1)
-    offense_formations.columns = [" ".join(col) for col in offense_formations.columns.values]
-    offense_formations['% Under Center'] = offense_formations['Under Center Plays'] / (offense_formations['Under Center Plays'] + offense_formations['Shotgun Plays'])
-    offense_formations['% Shotgun'] = offense_formations['Shotgun Plays'] / (offense_formations['Under Center Plays'] + offense_formations['Shotgun Plays'])
-    offense_formations['% Under Center Neutral Downs'] = offense_formations['Under Center Neutral_Down_Plays'] / (offense_formations['Under Center Neutral_Down_Plays'] + offense_formations['Shotgun Neutral_Down_Plays'])
-    offense_formations['% Shotgun Neutral Downs'] = offense_formations['Shotgun Neutral_Down_Plays'] / (offense_formations['Under Center Neutral_Down_Plays'] + offense_formations['Shotgun Neutral_Down_Plays'])
-
-    offense_team_tendencies = offense_team_tendencies.merge(offense_formations, left_index=True, right_index=True, how='left')
-
-
-    ''' Players - Receiving '''
-
-    # All receivers
-    team_targets = pbp_df.groupby(['posteam', 'season', 'receiver']).aggregate(
-        Plays=('pass', 'sum'),
-        Targets=('pass_attempt', 'sum')
-    ).sort_values(by=['posteam', 'season', 'Targets'], ascending=[True, True, False])
-
-    team_targets['Targets'] = pd.to_numeric(team_targets['Targets'])
-    team_targets['Target Share'] = team_targets['Targets'] / team_targets.groupby(level=['posteam', 'season'])['Targets'].sum()
-    team_targets['Target Share Cumsum'] = team_targets.groupby(level=['posteam', 'season'])['Target Share'].cumsum()
-    team_targets['>5% Target Share'] = np.where(team_targets['Target Share'] >= 0.05, 1, 0)
-
-    # Team seasons
-    team_targets_seasons = team_targets.groupby(level=['posteam', 'season']).aggregate(
-        MaxTargets=('Targets', 'max'),
-        MaxTargetShare=('Target Share', 'max'),
-        N_Receivers_FivePctTargetShare=('>5% Target Share', 'sum')
-    )
+    # Same column order as the formation pivot used to produce
+    formation_cols = ['Shotgun Plays', 'Under Center Plays', 'Shotgun Neutral_Down_Plays', 'Under Center Neutral_Down_Plays', *formation_ratios]
+    share_cols = [*SHARE_LEADER_COLS['receiver'][:3], *SHARE_LEADER_COLS['rusher'][:3]]
 
+    return sums.with_columns(**ratios, **formation_ratios).select(*keys, *base_cols, *ratios, *formation_cols, *share_cols)
 
-    ''' Players - Rushing '''
 
-    # All rushers
-    team_rushing = pbp_df.loc[pbp_df['rush'] == 1,:].groupby(['posteam', 'season', 'rusher']).aggregate(
-        Plays=('rush', 'sum'),
-        Attempts=('rush_attempt', 'sum')
-    ).sort_values(by=['posteam', 'season', 'Attempts'], ascending=[True, True, False])
+def defense_features(sums: pl.LazyFrame, keys: list[str] = DEFENSE_KEYS) -> pl.LazyFrame:
+    ''' Defensive tendency ratios from summed partials, in the notebooks' column order '''
 
-    team_rushing['Attempts'] = pd.to_numeric(team_rushing['Attempts'])
-    team_rushing['Attempts Share'] = team_rushing['Attempts'] / team_rushing.groupby(level=['posteam', 'season'])['Attempts'].sum()
-    team_rushing['Attempts Share Cumsum'] = team_rushing.groupby(level=['posteam', 'season'])['Attempts Share'].cumsum()
-    team_rushing['>10% Attempts Share'] = np.where(team_rushing['Attempts Share'] >= 0.1, 1, 0)
+    sums = sums.rename({'Pass_Plays': 'PassPlaysFaced', 'Rush_Plays': 'RushPlaysFaced'})
 
-    # Team seasons
-    team_rushing_seasons = team_rushing.groupby(level=['posteam', 'season']).aggregate(
-        MaxRushAttempts=('Attempts', 'max'),
-        MaxRushAttemptsShare=('Attempts Share', 'max'),
-        N_Rushers_TenPctAttemptShare=('>10% Attempts Share', 'sum')
-    )
+    base_cols = ['Games', 'Drives', 'Plays', 'Neutral_Down_Plays', 'PassPlaysFaced', 'RushPlaysFaced', 'LightBoxPlays', 'HeavyBoxPlays',
+                 'ZoneCoveragePlays', 'ManCoveragePlays', 'FiveRushersPlays', 'SixPlusRushersPlays']
 
+    ratios = {
+        # Overall numbers
+        'Plays / Game': pl.col('Plays') / pl.col('Games'),
+        'Drives / Game': pl.col('Drives') / pl.col('Games'),
 
-    ''' Combine '''
+        # Box
+        '% Light Box': pl.col('LightBoxPlays') / pl.col('Plays'),
+        '% Heavy Box': pl.col('HeavyBoxPlays') / pl.col('Plays'),
 
-    # Start with base
-    offense_inputs = offense_team_tendencies.copy()
+        # Coverage
+        '% Zone': pl.col('ZoneCoveragePlays') / pl.col('PassPlaysFaced'),
+        '% Man': pl.col('ManCoveragePlays') / pl.col('PassPlaysFaced'),
 
-    # Add receivers / rushers
-    offense_inputs = offense_inputs.merge(team_targets_seasons, left_index=True, right_index=True, how='left')
-    offense_inputs = offense_inputs.merge(team_rushing_seasons, left_index=True, right_index=True, how='left')
+        # Rushers
+        '% 5 Rushers': pl.col('FiveRushersPlays') / pl.col('PassPlaysFaced'),
+        '% 6+ Rushers': pl.col('SixPlusRushersPlays') / pl.col('PassPlaysFaced'),
+    }
 
-    # Numeric cols
-    for col in offense_inputs.columns:
-        offense_inputs[col] = pd.to_numeric(offense_inputs[col])
+    # Coverages - shares are out of all charted coverages, including 'Other'
+    coverage_shares = {}
+    for coverage in COVERAGES:
+        coverage_shares[f'{coverage} % Plays'] = pl.col(f'{coverage} Plays') / pl.col('Charted Plays')
+    for coverage in COVERAGES:
+        coverage_shares[f'{coverage} % Neutral Down Plays'] = pl.col(f'{coverage} Neutral_Down_Plays') / pl.col('Charted Neutral_Down_Plays')
 
-    # print(offense_inputs.shape)
-    # print(offense_inputs.head().to_string())
+    coverage_cols = [f'{coverage} Plays' for coverage in COVERAGES] + [f'{coverage} Neutral_Down_Plays' for coverage in COVERAGES] + list(coverage_shares)
 
-    return offense_inputs
+    return sums.with_columns(**ratios, **coverage_shares).select(*keys, *base_cols, *ratios, *coverage_cols)
 
 
+def offense_tendencies_from_partials(game_partials: pl.LazyFrame, player_partials: pl.LazyFrame, keys: list[str] = OFFENSE_KEYS) -> pl.LazyFrame:
+    sums = game_partials.group_by(keys).agg(pl.exclude(PARTIAL_KEYS).sum())
+    player_counts = player_partials.group_by(keys + ['PlayerType', 'Player']).agg(pl.col('Count').sum())
 
+    return offense_features(sums.join(share_leaders(player_counts, keys), on=keys, how='left'), keys)
 
-def load_stats_team_tendencies_defense():
-    ''' Prep Defensive Inputs '''
-        
-    ## Get data ##
-    pbp_df = load_pbp_participation_data()
- 
-    ## Base Stats ##
-    defense_team_tendencies = pbp_df.groupby(['defteam', 'season']).aggregate(
-        Games=('game_id', 'nunique'),
-        Drives=('DriveID', 'nunique'),
-        Plays=('defteam', 'size'),
-        Neutral_Down_Plays=('defteam', lambda x: x[pbp_df['NeutralDown'] == 1].shape[0]),
-
-        PassPlaysFaced=('pass', 'sum'),
-        RushPlaysFaced=('rush', 'sum'),
-
-        LightBoxPlays=('LightBox', 'sum'),
-        HeavyBoxPlays=('HeavyBox', 'sum'),
-        ZoneCoveragePlays=('ZoneCoverage', 'sum'),
-        ManCoveragePlays=('ManCoverage', 'sum'),
-
-        FiveRushersPlays=('pass', lambda x: x[pbp_df['number_of_pass_rushers'] == 5].sum()),
-        SixPlusRushersPlays=('pass', lambda x: x[pbp_df['number_of_pass_rushers'] >= 6].sum()),
-    )
 
-    # Overall numbers
-    defense_team_tendencies['Plays / Game'] = defense_team_tendencies['Plays'] / defense_team_tendencies['Games']
-    defense_team_tendencies['Drives / Game'] = defense_team_tendencies['Drives'] / defense_team_tendencies['Games']
+def defense_tendencies_from_partials(game_partials: pl.LazyFrame, keys: list[str] = DEFENSE_KEYS) -> pl.LazyFrame:
+    sums = game_partials.group_by(keys).agg(pl.exclude(PARTIAL_KEYS).sum())
 
-    # Box
-    defense_team_tendencies['% Light Box'] = defense_team_tendencies['LightBoxPlays'] / defense_team_tendencies['Plays']
-    defense_team_tendencies['% Heavy Box'] = defense_team_tendencies['HeavyBoxPlays'] / defense_team_tendencies['Plays']
+    return defense_features(sums, keys)
 
-    # Coverage
-    defense_team_tendencies['% Zone'] = defense_team_tendencies['ZoneCoveragePlays'] / defense_team_tendencies['PassPlaysFaced']
-    defense_team_tendencies['% Man'] = defense_team_tendencies['ManCoveragePlays'] / defense_team_tendencies['PassPlaysFaced']
 
-    # Rushers
-    defense_team_tendencies['% 5 Rushers'] = defense_team_tendencies['FiveRushersPlays'] / defense_team_tendencies['PassPlaysFaced']
-    defense_team_tendencies['% 6+ Rushers'] = defense_team_tendencies['SixPlusRushersPlays'] / defense_team_tendencies['PassPlaysFaced']
+def offense_tendencies_query(plays: pl.LazyFrame) -> pl.LazyFrame:
+    ''' Offensive team tendencies by (posteam, season) as a single lazy query over the enriched play table '''
+
+    return offense_tendencies_from_partials(game_partials_query(plays), player_partials_query(plays))
+
+
+def defense_tendencies_query(plays: pl.LazyFrame) -> pl.LazyFrame:
+    ''' Defensive team tendencies by (defteam, season) as a single lazy query over the enriched play table '''
+
+    return defense_tendencies_from_partials(game_partials_query(plays))
 
-    # Coverages
-    defense_coverages = pbp_df.groupby(['defteam', 'season', 'DefenseCoverage']).aggregate(
-        Plays=('pass', 'sum'),
-        Neutral_Down_Plays=('pass', lambda x: x[pbp_df['NeutralDown'] == 1].sum()),    
-    )
-    defense_coverages['% Plays'] = defense_coverages['Plays'] / defense_coverages.groupby(level=['defteam', 'season'])['Plays'].sum()
-    defense_coverages['% Neutral Down Plays'] = defense_coverages['Neutral_Down_Plays'] / defense_coverages.groupby(level=['defteam', 'season'])['Neutral_Down_Plays'].sum()
 
-    # Filter out other AFTER calculating percentages
-    defense_coverages = defense_coverages.loc[defense_coverages.index.get_level_values('DefenseCoverage') != 'Other',:]
-    defense_coverages = defense_coverages.reset_index().pivot(
-        index=['defteam', 'season'],
-        columns='DefenseCoverage',
-        values=defense_coverages.columns
-    ).swaplevel(axis=1)
-    defense_coverages.columns = [" ".join(col) for col in defense_coverages.columns.values]
+def tendencies_from_partials(game_partials: pl.LazyFrame, player_partials: pl.LazyFrame, sides: tuple[str] = ('offense', 'defense')) -> dict[str, pd.DataFrame]:
+    ''' Offensive and / or defensive tendencies (pandas, indexed by team / season) from game and player partials '''
 
-    defense_team_tendencies = defense_team_tendencies.merge(defense_coverages, left_index=True, right_index=True)
+    queries = {}
+    if 'offense' in sides:
+        queries['offense'] = offense_tendencies_from_partials(game_partials, player_partials)
+    if 'defense' in sides:
+        queries['defense'] = defense_tendencies_from_partials(game_partials)
 
-    print(defense_team_tendencies.shape)
-    print(defense_team_tendencies.head().to_string())
-    # print(defense_team_tendencies.loc[defense_team_tendencies.index.get_level_values('season') == 2024, :].to_string())
+    with instrument.stage('team_tendencies', game_partials, sides=list(queries)) as s:
+        results = s.output(pl.collect_all(list(queries.values())))
 
+    with instrument.stage('to_pandas', results[0]) as s:
+        return s.output({side: _to_pandas_tendencies(df, keys=TENDENCY_KEYS[side]) for side, df in zip(queries, results)})
+
+
+## Windowed (as-of week) tendencies ##
+
+def _window_sums(cols: list[str], over: list[str], window: int | None) -> list[pl.Expr]:
+    ''' Sums of `cols` over each row's last `window` rows (all rows to date if None) within `over`, from cumulative sums:
+    sum(last N) = cumsum - cumsum shifted by N. Rows must be sorted by week within each group. '''
+
+    if window is None:
+        return [pl.col(col).cum_sum().over(over) for col in cols]
+
+    return [(pl.col(col).cum_sum() - pl.col(col).cum_sum().shift(window, fill_value=0)).over(over) for col in cols]
+
+
+def windowed_tendencies_from_partials(game_partials: pl.LazyFrame, player_partials: pl.LazyFrame = None, side: str = 'offense',
+                                      window: int = None) -> pl.LazyFrame:
+    '''
+    Team tendencies as of every week of the season: over each team's last `window` games, or all games to date if None.
+    Same columns as the season tendencies, keyed by (team, season, week).
+
+    Partials are summed per team week and accumulated once per team season (player counts per team season's player), so
+    every week's window is a difference of two running sums instead of a new group by. Weeks a team didn't play (byes)
+    carry its last window forward; weeks before its first game have no row.
+    '''
+
+    team_keys = TENDENCY_KEYS[side]
+    keys = team_keys + ['week']
+
+    ## Game partials - one row per team week ##
+    weekly = game_partials.group_by(keys).agg(pl.exclude(PARTIAL_KEYS).sum()).sort(keys)
+    sum_cols = [col for col in weekly.collect_schema().names() if col not in keys]
+    sums = weekly.with_columns(_window_sums(sum_cols, team_keys, window))
+
+    ## Player partials - one row per team week and team season player (zero in games they missed) ##
+    if side == 'offense':
+        player_keys = team_keys + ['PlayerType', 'Player']
+
+        players = player_partials.select(player_keys).unique()
+        counts = player_partials.group_by(keys + ['PlayerType', 'Player']).agg(pl.col('Count').sum())
+        player_counts = weekly.select(keys).join(players, on=team_keys).join(counts, on=keys + ['PlayerType', 'Player'], how='left').with_columns(
+            pl.col('Count').fill_null(0)
+        ).sort(player_keys + ['week'])
+
+        player_counts = player_counts.with_columns(_window_sums(['Count'], player_keys, window))
+        tendencies = offense_features(sums.join(share_leaders(player_counts, keys), on=keys, how='left'), keys)
+    else:
+        tendencies = defense_features(sums, keys)
+
+    ## Every week of the season, as of the team's last game ##
+    weeks = game_partials.select('season', 'week').unique()
+    team_weeks = tendencies.select(team_keys).unique().join(weeks, on='season').sort('week')
+
+    # Both sides are sorted by week above (sortedness can't be checked with `by`)
+    return team_weeks.join_asof(tendencies.sort('week'), on='week', by=team_keys, strategy='backward', check_sortedness=False).filter(
+        pl.col('Games').is_not_null()
+    ).select(*keys, pl.exclude(keys))
+
+
+def windowed_tendencies(game_partials: pl.LazyFrame, player_partials: pl.LazyFrame, sides: tuple[str] = ('offense', 'defense'),
+                        window: int = None) -> dict[str, pd.DataFrame]:
+    ''' Offensive and / or defensive windowed tendencies (pandas, indexed by team / season / week) from game and player partials '''
+
+    queries = {side: windowed_tendencies_from_partials(game_partials, player_partials, side=side, window=window) for side in sides}
+    with instrument.stage('windowed_tendencies', game_partials, sides=list(queries), window=window) as s:
+        results = s.output(pl.collect_all(list(queries.values())))
+
+    with instrument.stage('to_pandas', results[0]) as s:
+        return s.output({side: _to_pandas_tendencies(df, keys=TENDENCY_KEYS[side] + ['week']) for side, df in zip(queries, results)})
+
+
+def season_memory_mb(season: int, participation: bool = True) -> float:
+    '''
+    Estimated memory (MB) to aggregate one season, without loading it: the row count of its cached pbp file (read from
+    the Parquet metadata) times the width of the tendency columns' schema, times WORKING_MEMORY_FACTOR
+    '''
+
+    plays = scan_plays(seasons=[season], columns=PLAY_COLUMNS['tendencies'], participation=participation)
+    n_plays = scan_season('pbp', season).select(pl.len()).collect().item()
+
+    # Bytes per row, from an all-null frame with the play table's schema
+    row_mb = pl.DataFrame(schema=plays.collect_schema()).clear(n=1_000).estimated_size('mb') / 1_000
+
+    return n_plays * row_mb * WORKING_MEMORY_FACTOR
+
+
+def season_chunks(seasons: list[int], max_memory_mb: int = None, participation: bool = True) -> list[list[int]]:
+    '''
+    Splits `seasons` into groups small enough to aggregate within `max_memory_mb` (one group if None).
+
+    The chunk size comes from the estimate for the latest season (the largest: 17+ games and participation data), see
+    season_memory_mb. The budget is a sizing target, not an enforced ceiling: the process' own baseline and the
+    engine's fixed overhead come on top, and a single season over the budget still runs as its own chunk.
+    '''
+
+    if max_memory_mb is None:
+        return [list(seasons)]
+
+    chunk_size = max(1, int(max_memory_mb // season_memory_mb(max(seasons), participation=participation)))
+    return [list(seasons[i:i + chunk_size]) for i in range(0, len(seasons), chunk_size)]
+
+
+@instrument.staged()
+def collect_partials(seasons: list[int] = SEASONS, max_memory_mb: int = None, participation: bool = True,
+                     player_partials: bool = True) -> tuple[pl.DataFrame, pl.DataFrame | None]:
+    '''
+    Game (and player) partials for `seasons`.
+
+    With `max_memory_mb`, seasons are loaded and aggregated a chunk at a time on the streaming engine and only the
+    (small) partials are kept, so peak memory depends on the chunk size rather than the number of seasons.
+    '''
+
+    game_chunks, player_chunks = [], []
+    for chunk in season_chunks(seasons, max_memory_mb, participation=participation):
+        with instrument.stage('scan', seasons=chunk):
+            plays = scan_plays(seasons=chunk, columns=PLAY_COLUMNS['tendencies'], participation=participation)
+
+        with instrument.stage('game_partials', plays, seasons=chunk) as s:
+            queries = [game_partials_query(plays)] + ([player_partials_query(plays)] if player_partials else [])
+            results = s.output(pl.collect_all(queries, engine='auto' if max_memory_mb is None else 'streaming'))
+
+        game_chunks.append(results[0])
+        if player_partials:
+            player_chunks.append(results[1])
+
+    game = pl.concat(game_chunks, how='vertical_relaxed')
+    player = pl.concat(player_chunks, how='vertical_relaxed') if player_partials else None
+
+    return game, player
+
+
+@instrument.staged()
+def build_team_tendencies(seasons: list[int] = SEASONS, sides: tuple[str] = ('offense', 'defense'), max_memory_mb: int = None,
+                          participation: bool = True) -> dict[str, pd.DataFrame]:
+    '''
+    Offensive and / or defensive team tendencies from a single load of the play table.
+
+    Both sides are ratios of the same per-game partials (games, drives, neutral down counts, coverage counts, ...),
+    so those are computed once and only the final group by team differs. Returns {side: tendencies}.
+
+    Pass `max_memory_mb` for long season ranges (e.g. season_range(1999)) to stream them a chunk of seasons at a time.
+    '''
+
+    game_partials, player_partials = collect_partials(seasons=seasons, max_memory_mb=max_memory_mb, participation=participation,
+                                                      player_partials='offense' in sides)
+
+    return tendencies_from_partials(game_partials.lazy(), player_partials.lazy() if player_partials is not None else None, sides=sides)
+
+
+@instrument.staged()
+def build_windowed_tendencies(seasons: list[int] = SEASONS, sides: tuple[str] = ('offense', 'defense'), window: int = None,
+                              max_memory_mb: int = None, participation: bool = True) -> dict[str, pd.DataFrame]:
+    '''
+    Team tendencies as of every week: over each team's trailing `window` games, or cumulative to date if None.
+    Returns {side: tendencies indexed by (team, season, week)}, with the same columns as build_team_tendencies.
+
+    SimilarityIndex, PercentileTable, ClusterSweep and ClusterModel.assign take the windowed frame as is (closest /
+    team_scores with a `week`). ClusterModel itself is fit on team seasons and rejects it; fit on one week's slice,
+    e.g. .xs(week, level='week').
+    '''
+
+    game_partials, player_partials = collect_partials(seasons=seasons, max_memory_mb=max_memory_mb, participation=participation,
+                                                      player_partials='offense' in sides)
+
+    return windowed_tendencies(game_partials.lazy(), player_partials.lazy() if player_partials is not None else None, sides=sides, window=window)
+
+
+@instrument.staged('offense_tendencies')
+def load_stats_team_tendencies_offense(seasons: list[int] = SEASONS) -> pd.DataFrame:
+    ''' Prep Offensive Inputs '''
+
+    return build_team_tendencies(seasons=seasons, sides=('offense',))['offense']
+
+
+@instrument.staged('defense_tendencies')
+def load_stats_team_tendencies_defense(seasons: list[int] = SEASONS) -> pd.DataFrame:
+    ''' Prep Defensive Inputs '''
 
-    return defense_team_tendencies
\ No newline at end of file
+    return build_team_tendencies(seasons=seasons, sides=('defense',))['defense']
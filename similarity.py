@@ -0,0 +1,114 @@
+'''
+Jack Miller
+January 2026
+'''
+
+
+''' Imports '''
+
+import pandas as pd
+import numpy as np
+
+from sklearn.decomposition import PCA
+from sklearn.neighbors import NearestNeighbors
+from sklearn.preprocessing import StandardScaler
+
+import prep_data
+
+
+
+''' Parameters / Constants '''
+
+DEFAULT_K = 5
+
+
+
+''' Helpers '''
+
+def feature_matrix(tendencies: pd.DataFrame, features: list[str], standardize: bool = True, n_components: int = None) -> tuple[np.ndarray, StandardScaler | None, PCA | None]:
+    '''
+    Tendency features as a float matrix, optionally standardized and PCA projected. Returns (matrix, scaler, pca).
+
+    Missing values (0 / 0 ratios) are filled with the feature mean, so they sit in the middle instead of breaking distances.
+    '''
+
+    matrix = tendencies[features].to_numpy(dtype=float)
+
+    missing = np.isnan(matrix)
+    if missing.any():
+        matrix = np.where(missing, np.nanmean(matrix, axis=0), matrix)
+
+    scaler = None
+    if standardize:
+        scaler = StandardScaler()
+        matrix = scaler.fit_transform(matrix)
+
+    pca = None
+    if n_components is not None:
+        pca = PCA(n_components=n_components, random_state=42)
+        matrix = pca.fit_transform(matrix)
+
+    return matrix, scaler, pca
+
+
+
+''' Main Functions '''
+
+class SimilarityIndex:
+    '''
+    k-nearest team seasons over a tendency feature matrix (offense or defense).
+
+    The matrix is built once (standardized and optionally PCA projected); queries use sklearn's NearestNeighbors, which
+    picks vectorized brute force or a KD / ball tree by `algorithm` and `metric`.
+    '''
+
+    def __init__(self, tendencies: pd.DataFrame, side: str = 'offense', features: list[str] = None, metric: str = 'euclidean',
+                 standardize: bool = True, n_components: int = None, algorithm: str = 'auto'):
+
+        self.side = side
+        self.features = features if features is not None else prep_data.TENDENCY_FEATURES[side]
+        self.index = tendencies.index
+
+        self.matrix, self.scaler, self.pca = feature_matrix(tendencies, self.features, standardize=standardize, n_components=n_components)
+        self.neighbors = NearestNeighbors(metric=metric, algorithm=algorithm).fit(self.matrix)
+
+    def closest(self, team: str, season: int, k: int = None, week: int = None) -> pd.DataFrame:
+        '''
+        The `k` closest other team seasons (all if None), sorted by distance - same shape as the notebooks' get_closest_teams.
+        Pass `week` on windowed tendencies (indexed by team, season, week).
+        '''
+
+        position = self.index.get_loc((team, season) if week is None else (team, season, week))
+        n_neighbors = len(self.index) if k is None else min(k + 1, len(self.index))
+
+        distances, positions = self.neighbors.kneighbors(self.matrix[[position]], n_neighbors=n_neighbors)
+        distances, positions = distances[0], positions[0]
+
+        # Drop the team season itself (by position, since an identical team season could tie it at distance 0)
+        others = positions != position
+        distances, positions = distances[others], positions[others]
+        if k is not None:
+            distances, positions = distances[:k], positions[:k]
+
+        return pd.DataFrame(index=self.index[positions], data={'distance': distances})
+
+    def all_neighbors(self, k: int = DEFAULT_K) -> pd.DataFrame:
+        '''
+        Top `k` neighbors of every team season in one call, as a long frame indexed by (team, season, rank)
+        with the neighbor's team / season and the distance. Windowed tendencies add the week to both.
+        '''
+
+        # With no query points, kneighbors excludes each point from its own neighbors
+        distances, positions = self.neighbors.kneighbors(n_neighbors=k)
+
+        levels = list(self.index.names)
+        neighbor_index = self.index[positions.ravel()]
+
+        neighbors = pd.DataFrame({
+            **{level: np.repeat(self.index.get_level_values(level), k) for level in levels},
+            'rank': np.tile(np.arange(1, k + 1), len(self.index)),
+            **{f'similar_{level}': neighbor_index.get_level_values(level) for level in levels},
+            'distance': distances.ravel(),
+        })
+
+        return neighbors.set_index([*levels, 'rank'])
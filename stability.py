@@ -0,0 +1,237 @@
+'''
+Jack Miller
+January 2026
+'''
+
+
+''' Imports '''
+
+import os
+
+import pandas as pd
+import polars as pl
+import numpy as np
+
+from scipy import sparse
+from scipy.optimize import linear_sum_assignment
+
+import cluster_sweep
+import prep_data
+import similarity
+
+
+
+''' Parameters / Constants '''
+
+# The final model in final clustering.ipynb
+FINAL_ALGORITHM = 'spectral'
+FINAL_PARAMS = dict(n_clusters=4)
+
+N_REPLICATES = 200
+
+# Refit settings of the replicates running in this process (set once per pool worker)
+_refit_config = None
+
+
+
+''' Helpers '''
+
+def align_labels(labels: np.ndarray, reference: np.ndarray) -> np.ndarray:
+    ''' Relabels `labels` to best match `reference` (maximum overlap), since a refit numbers its clusters arbitrarily '''
+
+    label_ids, positions = np.unique(labels, return_inverse=True)
+    reference_ids, reference_positions = np.unique(reference, return_inverse=True)
+
+    overlap = np.zeros((len(label_ids), len(reference_ids)))
+    np.add.at(overlap, (positions, reference_positions), 1)
+    rows, cols = linear_sum_assignment(overlap, maximize=True)
+
+    # Clusters left unmatched (refit found more clusters than the reference) get new ids
+    mapping = np.arange(len(label_ids)) + reference_ids.max() + 1
+    mapping[rows] = reference_ids[cols]
+
+    return mapping[positions]
+
+
+def co_assignment(labels: np.ndarray) -> np.ndarray:
+    ''' Share of replicates (rows of `labels`) in which each pair of team seasons lands in the same cluster '''
+
+    n_replicates, n = labels.shape
+
+    # One-hot of every replicate's labels side by side: (n, replicates x clusters); pairs in the same cluster share a column
+    label_ids, positions = np.unique(labels, return_inverse=True)
+    columns = positions.reshape(labels.shape) + np.arange(n_replicates)[:, None] * len(label_ids)
+    one_hot = sparse.csr_matrix((np.ones(labels.size), (np.tile(np.arange(n), n_replicates), columns.ravel())),
+                                shape=(n, n_replicates * len(label_ids)))
+
+    return (one_hot @ one_hot.T).toarray() / n_replicates
+
+
+def _init_worker(algorithm: str, params: dict):
+    global _refit_config
+    _refit_config = (algorithm, params)
+
+
+def _refit_worker(matrix: np.ndarray) -> np.ndarray:
+    algorithm, params = _refit_config
+    return cluster_sweep.fit_labels(algorithm, params, cluster_sweep.build_artifacts(matrix))
+
+
+
+''' Main Functions '''
+
+class StabilityBootstrap:
+    '''
+    Bootstrap of the team clusters over each team season's games.
+
+    The game (and player) partials are laid out once as matrices, one row per team game, grouped by team season. A replicate
+    resamples every team season's games with replacement as a vector of game weights (times drawn), so its sums are one
+    weighted reduce per team season; the ratios come from the same prep_data feature queries as the tendencies. Replicates
+    are projected with the scaler / PCA fit on the real tendencies, then assigned to the nearest real cluster centroid or
+    refit in a process pool.
+    '''
+
+    def __init__(self, game_partials: pl.DataFrame | pl.LazyFrame, player_partials: pl.DataFrame | pl.LazyFrame = None,
+                 side: str = 'offense', features: list[str] = None, n_components: int = cluster_sweep.PCA_N_COMPONENTS):
+
+        self.side = side
+        self.keys = prep_data.TENDENCY_KEYS[side]
+        self.features = features if features is not None else prep_data.TENDENCY_FEATURES[side]
+
+        ## Game partials - one row per team game, sorted so each team season is a contiguous block ##
+        game_partials = game_partials.lazy().sort([*self.keys, 'game_id']).collect()
+        self.sum_cols = [col for col in game_partials.columns if col not in prep_data.PARTIAL_KEYS]
+        self.partials = game_partials.select(self.sum_cols).to_numpy().astype(float)
+
+        team_seasons = game_partials.select(self.keys).with_row_index('row').group_by(self.keys, maintain_order=True).agg(
+            start=pl.col('row').first(), n_games=pl.len()
+        )
+        self.team_seasons = team_seasons.select(self.keys)
+        self.starts = team_seasons['start'].to_numpy().astype(np.int64)
+        self.n_games = team_seasons['n_games'].to_numpy().astype(np.int64)
+
+        # Each row's team season block, to draw its replacement from
+        self.row_starts = np.repeat(self.starts, self.n_games)
+        self.row_n_games = np.repeat(self.n_games, self.n_games)
+
+        ## Player partials - a (team game x player) count matrix, one column per team season's player ##
+        self.player_counts = None
+        if side == 'offense':
+            game_keys = ['season', 'game_id', 'posteam']
+            game_rows = game_partials.select(game_keys).with_row_index('row').unique(game_keys, keep='first')
+            players = player_partials.lazy().collect().join(game_rows, on=game_keys, how='inner')
+
+            self.players = players.select(*self.keys, 'PlayerType', 'Player').unique(maintain_order=True)
+            players = players.join(self.players.with_row_index('column'), on=[*self.keys, 'PlayerType', 'Player'], how='left')
+
+            self.player_counts = sparse.csr_matrix(
+                (players['Count'].to_numpy().astype(float), (players['row'].to_numpy(), players['column'].to_numpy())),
+                shape=(len(self.partials), len(self.players)),
+            )
+
+        ## Real tendencies and their projection ##
+        self.tendencies = self.replicate_tendencies(np.ones((1, len(self.partials))))
+        self.matrix, self.scaler, self.pca = similarity.feature_matrix(self.tendencies, self.features, n_components=n_components)
+        self.index = self.tendencies.index
+
+    def resample(self, n_replicates: int = N_REPLICATES, seed: int = 42) -> np.ndarray:
+        ''' Bootstrap game weights (n_replicates x team games): how many times each game is drawn for its team season '''
+
+        rng = np.random.default_rng(seed)
+        draws = self.row_starts + (rng.random((n_replicates, len(self.partials))) * self.row_n_games).astype(np.int64)
+
+        n_rows = len(self.partials)
+        draws += np.arange(n_replicates)[:, None] * n_rows
+
+        return np.bincount(draws.ravel(), minlength=n_replicates * n_rows).reshape(n_replicates, n_rows).astype(float)
+
+    def replicate_sums(self, weights: np.ndarray) -> np.ndarray:
+        ''' Summed game partials per replicate and team season (replicates x team seasons x sum columns) '''
+
+        return np.stack([np.add.reduceat(self.partials * replicate_weights[:, None], self.starts) for replicate_weights in weights])
+
+    def replicate_tendencies(self, weights: np.ndarray) -> pd.DataFrame:
+        '''
+        Tendencies of each bootstrap replicate (rows of `weights`), indexed by (replicate, team, season).
+        All-ones weights give the real tendencies (indexed by team, season).
+        '''
+
+        n_replicates = len(weights)
+        replicate_keys = ['replicate', *self.keys]
+        replicates = pl.DataFrame({'replicate': np.arange(n_replicates)})
+
+        # Replicate-major, like the sums / counts arrays
+        sums = replicates.join(self.team_seasons, how='cross').hstack(
+            pl.DataFrame(self.replicate_sums(weights).reshape(-1, len(self.sum_cols)), schema=self.sum_cols)
+        )
+
+        if self.side == 'offense':
+            counts = (self.player_counts.T @ weights.T).T
+            player_counts = replicates.join(self.players, how='cross').with_columns(Count=pl.Series(counts.ravel()))
+
+            sums = sums.join(prep_data.share_leaders(player_counts.lazy(), replicate_keys).collect(), on=replicate_keys, how='left')
+            tendencies = prep_data.offense_features(sums.lazy(), replicate_keys).collect()
+        else:
+            tendencies = prep_data.defense_features(sums.lazy(), replicate_keys).collect()
+
+        tendencies = prep_data.strings_for_pandas(tendencies).sort(replicate_keys).to_pandas().set_index(replicate_keys)
+        return tendencies.droplevel('replicate') if n_replicates == 1 else tendencies
+
+    def project(self, tendencies: pd.DataFrame) -> np.ndarray:
+        ''' Tendencies -> the real tendencies' standardized, PCA projected space (missing values filled with the real means) '''
+
+        values = tendencies[self.features].to_numpy(dtype=float)
+        values = np.where(np.isnan(values), self.scaler.mean_, values)
+
+        return self.pca.transform(self.scaler.transform(values))
+
+    def run(self, n_replicates: int = N_REPLICATES, algorithm: str = FINAL_ALGORITHM, params: dict = FINAL_PARAMS,
+            refit: bool = False, n_jobs: int = None, seed: int = 42) -> dict:
+        '''
+        Clusters the real tendencies, then each of `n_replicates` bootstrap replicates. Replicates are assigned to the nearest
+        real cluster centroid, or with `refit` clustered from scratch (n_jobs processes, all cores if None) and relabeled
+        to best match the real clusters.
+
+        Returns {'labels': replicates x team seasons, 'co_assignment': team season x team season share of replicates
+        clustered together, 'teams': per team season Cluster, '% Same Cluster' and 'Stability' (mean co-assignment with its
+        real clustermates)}.
+        '''
+
+        labels = cluster_sweep.fit_labels(algorithm, params, cluster_sweep.build_artifacts(self.matrix))
+
+        ## Replicates ##
+        replicate_tendencies = self.replicate_tendencies(self.resample(n_replicates, seed=seed))
+        matrices = self.project(replicate_tendencies).reshape(n_replicates, len(self.index), -1)
+
+        if not refit:
+            cluster_ids = np.unique(labels[labels != -1])
+            centroids = np.array([self.matrix[labels == cluster_id].mean(axis=0) for cluster_id in cluster_ids])
+            distances = ((matrices[:, :, None, :] - centroids[None, None, :, :]) ** 2).sum(axis=-1)
+            replicate_labels = cluster_ids[distances.argmin(axis=-1)]
+        else:
+            n_jobs = min(n_jobs or os.cpu_count(), n_replicates)
+            if n_jobs == 1:
+                fitted = [cluster_sweep.fit_labels(algorithm, params, cluster_sweep.build_artifacts(matrix)) for matrix in matrices]
+            else:
+                with cluster_sweep.process_pool(n_jobs, initializer=_init_worker, initargs=(algorithm, params)) as pool:
+                    fitted = list(pool.map(_refit_worker, matrices, chunksize=max(1, n_replicates // (n_jobs * 4))))
+
+            replicate_labels = np.array([align_labels(replicate, labels) for replicate in fitted])
+
+        ## Summaries ##
+        co_assigned = co_assignment(replicate_labels)
+
+        clustermates = (labels[:, None] == labels[None, :]) & ~np.eye(len(labels), dtype=bool)
+        stability = (co_assigned * clustermates).sum(axis=1) / np.maximum(clustermates.sum(axis=1), 1)
+
+        teams = pd.DataFrame(index=self.index, data={
+            'Cluster': labels,
+            '% Same Cluster': (replicate_labels == labels).mean(axis=0),
+            'Stability': np.where(clustermates.any(axis=1), stability, np.nan),
+        })
+
+        return {
+            'labels': replicate_labels,
+            'co_assignment': pd.DataFrame(co_assigned, index=self.index, columns=self.index),
+            'teams': teams,
+        }
@@ -0,0 +1,362 @@
+'''
+Jack Miller
+January 2026
+'''
+
+
+''' Imports '''
+
+from datetime import date, timedelta
+
+import polars as pl
+import numpy as np
+
+import data_cache
+import prep_data
+
+
+
+''' Parameters / Constants '''
+
+TEAMS = [
+    'ARI', 'ATL', 'BAL', 'BUF', 'CAR', 'CHI', 'CIN', 'CLE', 'DAL', 'DEN', 'DET', 'GB', 'HOU', 'IND', 'JAX', 'KC',
+    'LA', 'LAC', 'LV', 'MIA', 'MIN', 'NE', 'NO', 'NYG', 'NYJ', 'PHI', 'PIT', 'SEA', 'SF', 'TB', 'TEN', 'WAS',
+]
+
+SEED = 42
+
+# 17 game seasons (18 weeks) since 2021
+def n_weeks(season: int) -> int:
+    return 18 if season >= 2021 else 17
+
+BYE_WEEKS = list(range(5, 15))
+POSTSEASON_GAMES = [6, 4, 2, 1]
+
+# Per team game: drives and plays per drive (every down, including the special teams / penalty rows the loader drops)
+DRIVES_PER_TEAM_GAME = 12
+PLAYS_PER_DRIVE = 6
+
+## League-wide value distributions; each team season draws its own weights around these ##
+
+# nflverse personnel strings (the 6 OL / special teams ones exercise the extra OL / ST parsing)
+OFFENSE_PERSONNEL = {
+    '1 RB, 1 TE, 3 WR': 0.58, '1 RB, 2 TE, 2 WR': 0.19, '2 RB, 1 TE, 2 WR': 0.07, '1 RB, 3 TE, 1 WR': 0.03,
+    '2 RB, 2 TE, 1 WR': 0.03, '1 RB, 0 TE, 4 WR': 0.03, '0 RB, 1 TE, 4 WR': 0.02, '6 OL, 1 RB, 2 TE, 1 WR': 0.02,
+    '6 OL, 2 RB, 1 TE, 1 WR': 0.01, '2 QB, 1 RB, 1 TE, 2 WR': 0.01, '1 RB, 1 TE, 3 WR, 1 DL': 0.01,
+}
+DEFENSE_PERSONNEL = {
+    '4 DL, 2 LB, 5 DB': 0.34, '3 DL, 3 LB, 5 DB': 0.14, '2 DL, 4 LB, 5 DB': 0.14, '4 DL, 3 LB, 4 DB': 0.12,
+    '4 DL, 1 LB, 6 DB': 0.08, '3 DL, 2 LB, 6 DB': 0.06, '3 DL, 4 LB, 4 DB': 0.05, '5 DL, 2 LB, 4 DB': 0.03,
+    '2 DL, 3 LB, 6 DB': 0.02, '1 DL, 4 LB, 6 DB': 0.01,
+}
+SPECIAL_TEAMS_PERSONNEL = {
+    'offense': ['1 K, 1 LS, 1 P, 2 TE, 6 OL', '1 LS, 1 P, 3 WR, 2 TE, 5 OL', '1 K, 1 LS, 7 OL, 2 TE'],
+    'defense': ['1 K, 1 P, 3 WR, 2 RB, 4 LB, 1 DB', '6 DL, 3 LB, 2 DB', '2 WR, 4 LB, 5 DB'],
+}
+
+UNDER_CENTER_FORMATIONS = {'SINGLEBACK': 0.6, 'I_FORM': 0.25, 'UNDER CENTER': 0.1, 'JUMBO': 0.05}
+SHOTGUN_FORMATIONS = {'SHOTGUN': 0.86, 'EMPTY': 0.09, 'PISTOL': 0.045, 'WILDCAT': 0.005}
+
+COVERAGE_TYPES = {
+    'COVER_3': 0.31, 'COVER_1': 0.2, 'COVER_4': 0.13, 'COVER_2': 0.11, 'COVER_6': 0.06, 'COVER_0': 0.04, '2_MAN': 0.04,
+    'PREVENT': 0.01, None: 0.1,
+}
+MAN_COVERAGES = ['COVER_0', 'COVER_1', '2_MAN']
+
+RUN_GAPS = {'end': 0.36, 'tackle': 0.22, 'guard': 0.24, None: 0.18}
+PASS_RUSHERS = {3: 0.05, 4: 0.66, 5: 0.21, 6: 0.07, 7: 0.01}
+
+DOWNS = [0.41, 0.32, 0.23, 0.04]
+
+N_RECEIVERS = 9
+N_RUSHERS = 5
+
+
+
+''' Helpers '''
+
+def seasons_for(n_seasons: int, end: int = prep_data.END_YEAR) -> list[int]:
+    ''' The last `n_seasons` seasons through `end` '''
+
+    if not 1 <= n_seasons <= end - prep_data.PBP_START_YEAR + 1:
+        raise ValueError(f'n_seasons must be between 1 and {end - prep_data.PBP_START_YEAR + 1}')
+
+    return list(range(end - n_seasons + 1, end + 1))
+
+
+def _choice(rng: np.random.Generator, options: dict, size: int) -> np.ndarray:
+    return rng.choice(np.array(list(options), dtype=object), size=size, p=np.array(list(options.values())) / sum(options.values()))
+
+
+def _team_choice(rng: np.random.Generator, options: list, weights: np.ndarray, teams: np.ndarray) -> np.ndarray:
+    ''' One draw per play from its team's own weights over `options` (weights: teams x options) '''
+
+    cumulative = np.cumsum(weights[teams], axis=1)
+    picks = (rng.random(len(teams))[:, None] * cumulative[:, -1:] > cumulative).sum(axis=1)
+
+    return np.array(options, dtype=object)[np.minimum(picks, len(options) - 1)]
+
+
+def _strings(values: np.ndarray) -> pl.Series:
+    ''' Object array (None for missing) -> String series '''
+
+    return pl.Series(values.tolist(), dtype=pl.String)
+
+
+def _dirichlet(rng: np.random.Generator, options: dict, concentration: float, size: int) -> np.ndarray:
+    return rng.dirichlet(np.array(list(options.values())) * concentration, size=size)
+
+
+def team_styles(season: int, seed: int = SEED) -> dict:
+    ''' Per team tendencies for a season, so team seasons differ (and cluster) the way real ones do '''
+
+    rng = np.random.default_rng([seed, season, 0])
+    n = len(TEAMS)
+
+    return {
+        'pass_rate': np.clip(rng.normal(0.57, 0.045, n), 0.42, 0.7),
+        'shotgun_rate': np.clip(rng.normal(0.66, 0.13, n), 0.25, 0.97),
+        'scramble_rate': np.clip(rng.normal(0.035, 0.015, n), 0.005, 0.1),
+        'adot': rng.normal(7.8, 1.0, n),
+        'time_to_throw': rng.normal(2.78, 0.12, n),
+        'outside_run': np.clip(rng.normal(1, 0.25, n), 0.4, 1.8),
+        'offense_personnel': _dirichlet(rng, OFFENSE_PERSONNEL, 40, n),
+        'defense_personnel': _dirichlet(rng, DEFENSE_PERSONNEL, 40, n),
+        'coverage': _dirichlet(rng, COVERAGE_TYPES, 60, n),
+        'pass_rushers': _dirichlet(rng, PASS_RUSHERS, 50, n),
+        'box': rng.normal(6.6, 0.25, n),
+        'targets': rng.dirichlet(np.linspace(3, 0.4, N_RECEIVERS) * rng.uniform(1, 4), size=n),
+        'carries': rng.dirichlet(np.array([6, 2.5, 1, 0.6, 0.3]) * rng.uniform(0.5, 3), size=n),
+    }
+
+
+def schedule(season: int, seed: int = SEED) -> pl.DataFrame:
+    ''' Regular season games (every team once per week except one bye) plus the playoffs, with nflverse style game ids '''
+
+    rng = np.random.default_rng([seed, season, 1])
+    n_teams = len(TEAMS)
+
+    # Byes in pairs of teams, spread over the bye weeks
+    bye_pairs = rng.permutation(n_teams).reshape(-1, 2)
+    bye_weeks = np.sort(np.concatenate([BYE_WEEKS, rng.choice(BYE_WEEKS, len(bye_pairs) - len(BYE_WEEKS), replace=False)]))
+    bye_week_of = np.empty(n_teams, dtype=int)
+    for pair, week in zip(bye_pairs, bye_weeks):
+        bye_week_of[pair] = week
+
+    games = []
+    for week in range(1, n_weeks(season) + 1):
+        playing = rng.permutation(np.flatnonzero(bye_week_of != week))
+        games += [(week, 'REG', home, away) for home, away in playing.reshape(-1, 2)]
+
+    # Playoffs: any teams, just so the season type filter has rows to drop
+    for round_number, n_games in enumerate(POSTSEASON_GAMES):
+        for home, away in rng.choice(n_teams, size=(n_games, 2), replace=True):
+            if home != away:
+                games.append((n_weeks(season) + 1 + round_number, 'POST', home, away))
+
+    games = pl.DataFrame(games, schema={'week': pl.Int32, 'season_type': pl.String, 'home': pl.Int64, 'away': pl.Int64}, orient='row')
+    first_sunday = date(season, 9, 7) + timedelta(days=(6 - date(season, 9, 7).weekday()) % 7)
+
+    return games.with_columns(
+        season=pl.lit(season, dtype=pl.Int32),
+        game_number=pl.int_range(pl.len()).over('week'),
+        home_team=pl.col('home').replace_strict(list(range(n_teams)), TEAMS, return_dtype=pl.String),
+        away_team=pl.col('away').replace_strict(list(range(n_teams)), TEAMS, return_dtype=pl.String),
+    ).with_columns(
+        game_id=pl.format('{}_{}_{}_{}', 'season', pl.col('week').cast(pl.String).str.zfill(2), 'away_team', 'home_team'),
+        old_game_id=pl.format('{}{}', pl.col('week').map_elements(lambda week: (first_sunday + timedelta(weeks=week - 1)).strftime('%Y%m%d'),
+                                                                   return_dtype=pl.String),
+                              pl.col('game_number').cast(pl.String).str.zfill(2)),
+    )
+
+
+
+''' Main Functions '''
+
+def synthetic_season(season: int, seed: int = SEED) -> tuple[pl.DataFrame, pl.DataFrame]:
+    '''
+    One season of raw pbp and participation, with nflverse's column names and dtypes (the columns the loader reads).
+
+    Every team season gets its own pass rate, formation / personnel / coverage mix, depth of target, target and carry
+    shares, etc., drawn around league-wide rates, and plays are drawn from those. Special teams, two point, unspecified and
+    postseason plays are included, so the loader's filters have rows to drop. Seeded per season, so a season's data is
+    the same whatever range it is generated in.
+    '''
+
+    rng = np.random.default_rng([seed, season, 2])
+    styles = team_styles(season, seed=seed)
+    games = schedule(season, seed=seed)
+    n_games = len(games)
+
+    ## Drives (alternating possession) and plays ##
+    drives_per_game = rng.poisson(2 * DRIVES_PER_TEAM_GAME, n_games) + 2
+    drive_game = np.repeat(np.arange(n_games), drives_per_game)
+    drive_number = np.arange(len(drive_game)) - np.repeat(np.cumsum(drives_per_game) - drives_per_game, drives_per_game) + 1
+
+    home, away = games['home'].to_numpy(), games['away'].to_numpy()
+    home_first = rng.random(n_games) < 0.5
+    home_has_ball = (drive_number % 2 == 1) == home_first[drive_game]
+    drive_posteam = np.where(home_has_ball, home[drive_game], away[drive_game])
+    drive_defteam = np.where(home_has_ball, away[drive_game], home[drive_game])
+
+    plays_per_drive = rng.poisson(PLAYS_PER_DRIVE - 1, len(drive_game)) + 1
+    game = np.repeat(drive_game, plays_per_drive)
+    drive = np.repeat(drive_number, plays_per_drive)
+    posteam = np.repeat(drive_posteam, plays_per_drive)
+    defteam = np.repeat(drive_defteam, plays_per_drive)
+    n = len(game)
+
+    game_plays = np.bincount(game, minlength=n_games)
+    game_starts = np.cumsum(game_plays) - game_plays
+    play_number = np.arange(n) - game_starts[game]
+    game_progress = play_number / game_plays[game]
+
+    # Drives end in a punt / field goal about half the time
+    last_of_drive = np.cumsum(plays_per_drive) - 1
+    special_teams = np.zeros(n, dtype=bool)
+    special_teams[last_of_drive] = rng.random(len(last_of_drive)) < 0.5
+
+    ## Situation ##
+    down = rng.choice(np.arange(1, 5), size=n, p=DOWNS).astype(float)
+    ydstogo = np.where((down == 1) & (rng.random(n) < 0.85), 10, np.clip(rng.geometric(0.14, n), 1, 30)).astype(float)
+    qtr = np.minimum(game_progress * 4 // 1 + 1, 4) + (rng.random(n) < 0.01)
+    half_seconds_remaining = np.round(1800 * (1 - (game_progress * 2) % 1))
+    score_differential = np.round(rng.normal(0, 2 + 14 * game_progress))
+
+    ## Play type ##
+    third_down_lean = np.where(down >= 3, 0.2, np.where(down == 1, -0.05, 0))
+    is_pass = ~special_teams & (rng.random(n) < np.clip(styles['pass_rate'][posteam] + third_down_lean, 0, 1))
+    is_rush = ~special_teams & ~is_pass
+
+    is_sack = is_pass & (rng.random(n) < 0.065)
+    is_scramble = is_pass & ~is_sack & (rng.random(n) < styles['scramble_rate'][posteam])
+    is_attempt = is_pass & ~is_scramble
+
+    odd = rng.random(n)
+    play_type_nfl = np.select(
+        [special_teams & (odd < 0.55), special_teams, odd < 0.006, odd < 0.02, is_sack, is_pass, is_rush],
+        ['PUNT', 'FIELD_GOAL', 'PAT2', 'UNSPECIFIED', 'SACK', 'PASS', 'RUSH'],
+        default='UNSPECIFIED',
+    ).astype(object)
+
+    ## Passing / rushing details ##
+    thrown = is_attempt & ~is_sack
+    air_yards = np.where(thrown & (rng.random(n) < 0.97), np.clip(np.round(rng.normal(styles['adot'][posteam], 9.5)), -10, 65), np.nan)
+
+    targeted = thrown & (rng.random(n) < 0.93)
+    receiver_slot = _team_choice(rng, list(range(N_RECEIVERS)), styles['targets'], posteam)
+    rusher_slot = _team_choice(rng, list(range(N_RUSHERS)), styles['carries'], posteam)
+
+    team_names = np.array(TEAMS, dtype=object)
+    receiver = np.where(targeted, team_names[posteam] + '.Receiver' + receiver_slot.astype(str), None)
+    rusher = np.where(is_rush, team_names[posteam] + '.Rusher' + rusher_slot.astype(str), None)
+    rusher = np.where(is_scramble, team_names[posteam] + '.QB', rusher)
+
+    run_weights = np.array(list(RUN_GAPS.values()))[None, :] * np.ones((len(TEAMS), 1))
+    run_weights[:, 0] *= styles['outside_run']
+    run_gap = np.where(is_rush, _team_choice(rng, list(RUN_GAPS), run_weights, posteam), None)
+
+    epa = np.where(rng.random(n) < 0.004, np.nan, rng.normal(0, 1.4, n))
+
+    ## pbp ##
+    play_id = np.cumsum(rng.integers(15, 45, n))
+    play_id = play_id - np.repeat(play_id[game_starts] - 1, game_plays)
+
+    pbp = games.select('game_id', 'old_game_id', 'season', 'week', 'season_type', 'home_team', 'away_team')[game].with_columns(
+        play_id=pl.Series(play_id, dtype=pl.Float64),
+        posteam=_strings(team_names[posteam]),
+        defteam=_strings(team_names[defteam]),
+        drive=pl.Series(drive, dtype=pl.Float64),
+        qtr=pl.Series(qtr, dtype=pl.Float64),
+        half_seconds_remaining=pl.Series(half_seconds_remaining, dtype=pl.Float64),
+        score_differential=pl.Series(score_differential, dtype=pl.Float64),
+        special_teams_play=pl.Series(special_teams.astype(float)),
+        play_type_nfl=_strings(play_type_nfl),
+        down=pl.Series(np.where(special_teams & (rng.random(n) < 0.3), np.nan, down)).fill_nan(None),
+        ydstogo=pl.Series(ydstogo),
+        yardline_100=pl.Series(rng.integers(1, 100, n).astype(float)),
+        air_yards=pl.Series(air_yards).fill_nan(None),
+        run_gap=_strings(run_gap),
+        epa=pl.Series(epa),
+        **{'pass': pl.Series(is_pass.astype(float))},
+        rush=pl.Series(is_rush.astype(float)),
+        pass_attempt=pl.Series(is_attempt.astype(float)),
+        rush_attempt=pl.Series((is_rush | is_scramble).astype(float)),
+        sack=pl.Series(is_sack.astype(float)),
+        qb_scramble=pl.Series(is_scramble.astype(float)),
+        receiver=_strings(receiver),
+        rusher=_strings(rusher),
+    )
+
+    ## Participation ##
+    shotgun_rate = np.clip(styles['shotgun_rate'][posteam] + np.where(is_pass, 0.15, -0.15), 0.02, 0.99)
+    in_shotgun = rng.random(n) < shotgun_rate
+    offense_formation = np.where(in_shotgun, _choice(rng, SHOTGUN_FORMATIONS, n), _choice(rng, UNDER_CENTER_FORMATIONS, n))
+    offense_formation = np.where(rng.random(n) < 0.01, None, offense_formation)
+
+    offense_personnel = _team_choice(rng, list(OFFENSE_PERSONNEL), styles['offense_personnel'], posteam)
+    defense_personnel = _team_choice(rng, list(DEFENSE_PERSONNEL), styles['defense_personnel'], defteam)
+    offense_personnel = np.where(special_teams, rng.choice(SPECIAL_TEAMS_PERSONNEL['offense'], n), offense_personnel)
+    defense_personnel = np.where(special_teams, rng.choice(SPECIAL_TEAMS_PERSONNEL['defense'], n), defense_personnel)
+    offense_personnel = np.where(rng.random(n) < 0.005, None, offense_personnel)
+
+    # Heavier personnel, bigger box
+    heavy = _strings(offense_personnel).str.contains(r'^(2 RB|1 RB, [23] TE|6 OL)').fill_null(False).to_numpy()
+    defenders_in_box = np.clip(np.round(rng.normal(styles['box'][defteam] + 0.8 * heavy - 0.3 * is_pass, 0.9)), 3, 11)
+
+    coverage = np.where(is_pass | (rng.random(n) < 0.1), _team_choice(rng, list(COVERAGE_TYPES), styles['coverage'], defteam), None)
+    man_zone = np.where(_strings(coverage).is_in(MAN_COVERAGES).to_numpy(), 'MAN_COVERAGE', 'ZONE_COVERAGE')
+    man_zone = np.where((coverage == None) | (coverage == 'PREVENT'), None, man_zone)  # noqa: E711
+
+    pass_rushers = np.where(is_pass, _team_choice(rng, list(PASS_RUSHERS), styles['pass_rushers'], defteam), None)
+    time_to_throw = np.where(thrown & (rng.random(n) < 0.96), rng.gamma(6, styles['time_to_throw'][posteam] / 6), np.nan)
+
+    participation = pbp.select(
+        nflverse_game_id=pl.col('game_id'),
+        old_game_id=pl.col('old_game_id'),
+        play_id=pl.col('play_id').cast(pl.Int32),
+    ).with_columns(
+        offense_formation=_strings(offense_formation),
+        offense_personnel=_strings(offense_personnel),
+        defense_personnel=_strings(defense_personnel),
+        defenders_in_box=pl.Series(defenders_in_box).cast(pl.Int32),
+        defense_man_zone_type=_strings(man_zone),
+        defense_coverage_type=_strings(coverage),
+        time_to_throw=pl.Series(time_to_throw).fill_nan(None),
+        number_of_pass_rushers=pl.Series(pass_rushers.tolist(), dtype=pl.Int32),
+    )
+
+    # Some plays are never charted
+    participation = participation.filter(pl.Series(rng.random(n) < 0.985))
+
+    return pbp, participation
+
+
+def synthetic_seasons(seasons: list[int], seed: int = SEED) -> tuple[pl.DataFrame, pl.DataFrame]:
+    ''' Raw pbp and participation for `seasons` (participation only from PARTICIPATION_START_YEAR on, as in nflverse) '''
+
+    pbps, participations = [], []
+    for season in seasons:
+        pbp, participation = synthetic_season(season, seed=seed)
+        pbps.append(pbp)
+        if season >= prep_data.PARTICIPATION_START_YEAR:
+            participations.append(participation)
+
+    participation = pl.concat(participations) if participations else pl.DataFrame(schema=prep_data.RAW_PARTICIPATION_SCHEMA)
+    return pl.concat(pbps), participation
+
+
+def write_synthetic_cache(seasons: list[int], seed: int = SEED) -> list:
+    '''
+    Enriches synthetic seasons and writes them to the season cache (data_cache.CACHE_DIR), so every loader reads them
+    instead of downloading. Point CACHE_DIR somewhere else first to keep them apart from real data.
+    '''
+
+    paths = []
+    for season in seasons:
+        pbp, participation = synthetic_season(season, seed=seed)
+        paths.append(data_cache.write_cached('pbp', season, prep_data.enrich_pbp(pbp)))
+        if season >= prep_data.PARTICIPATION_START_YEAR:
+            paths.append(data_cache.write_cached('participation', season, prep_data.enrich_participation(participation)))
+
+    return paths